@@ -0,0 +1,97 @@
+import http.client
+import ssl
+import threading
+from ssl import SSLContext
+from typing import Dict, Optional, Protocol, Tuple
+from urllib.parse import urlsplit
+
+# (status, lower-cased headers, body)
+TransportResponse = Tuple[int, Dict[str, str], bytes]
+
+
+class JWKSTransport(Protocol):
+    def get(self, url: str, headers: Dict[str, str]) -> TransportResponse: ...
+
+
+class HTTPTransport:
+    """Default JWKS transport: stdlib ``http.client`` with keep-alive.
+
+    One persistent connection is kept per (scheme, host, port), so repeated
+    fetches skip the TCP and TLS handshakes. Requests on a connection are
+    serialized. A keep-alive connection the server already closed is retried
+    once on a fresh connection.
+    """
+
+    def __init__(
+        self, timeout: float = 30, ssl_context: Optional[SSLContext] = None
+    ) -> None:
+        self.timeout = timeout
+        self.ssl_context = ssl_context
+        self._connections: Dict[Tuple[str, str, int], http.client.HTTPConnection] = {}
+        self._lock = threading.Lock()
+
+    def _connection(
+        self, scheme: str, host: str, port: Optional[int]
+    ) -> http.client.HTTPConnection:
+        if scheme == "https":
+            key = (scheme, host, port or http.client.HTTPS_PORT)
+        elif scheme == "http":
+            key = (scheme, host, port or http.client.HTTP_PORT)
+        else:
+            raise http.client.InvalidURL(f'Unsupported URL scheme "{scheme}"')
+
+        conn = self._connections.get(key)
+        if conn is None:
+            if scheme == "https":
+                conn = http.client.HTTPSConnection(
+                    host,
+                    key[2],
+                    timeout=self.timeout,
+                    context=self.ssl_context or ssl.create_default_context(),
+                )
+            else:
+                conn = http.client.HTTPConnection(host, key[2], timeout=self.timeout)
+            self._connections[key] = conn
+        return conn
+
+    def get(self, url: str, headers: Dict[str, str]) -> TransportResponse:
+        parts = urlsplit(url)
+        path = parts.path or "/"
+        if parts.query:
+            path += "?" + parts.query
+
+        with self._lock:
+            conn = self._connection(parts.scheme, parts.hostname or "", parts.port)
+            try:
+                response, body = self._request(conn, path, headers)
+            except (ConnectionResetError, BrokenPipeError):
+                # Idle keep-alive connection dropped by the server
+                # (http.client.RemoteDisconnected is a ConnectionResetError).
+                response, body = self._request(conn, path, headers)
+
+            if response.will_close:
+                # Reopened automatically by the next request.
+                conn.close()
+            return (
+                response.status,
+                {k.lower(): v for k, v in response.getheaders()},
+                body,
+            )
+
+    @staticmethod
+    def _request(
+        conn: http.client.HTTPConnection, path: str, headers: Dict[str, str]
+    ) -> Tuple[http.client.HTTPResponse, bytes]:
+        try:
+            conn.request("GET", path, headers=headers)
+            response = conn.getresponse()
+            return response, response.read()
+        except BaseException:
+            conn.close()
+            raise
+
+    def close(self) -> None:
+        with self._lock:
+            for conn in self._connections.values():
+                conn.close()
+            self._connections.clear()
@@ -0,0 +1,142 @@
+#!/usr/bin/env python3
+"""
+Prueba de concurrencia del motor de reservas contra DynamoDB Local.
+
+    docker run -d -p 8000:8000 amazon/dynamodb-local
+    python scripts/stress_reservas.py --stock 50 --compradores 200 --shards 4
+
+Lanza N compradores concurrentes contra un producto con stock limitado y
+verifica que no haya sobreventa, que confirmar/expirar sean consistentes y
+que el stock final cuadre.
+"""
+import argparse
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Apuntar boto3 a DynamoDB Local antes de importar los módulos de utils
+os.environ.setdefault('AWS_ENDPOINT_URL_DYNAMODB', os.environ.get('DYNAMODB_ENDPOINT', 'http://localhost:8000'))
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'local')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'local')
+os.environ.setdefault('COMPRAS_TABLE', 'p_compras-stress')
+os.environ.setdefault('PRODUCTOS_TABLE', 'p_productos-stress')
+os.environ.pop('CACHE_URL', None)
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'utils'))
+
+from dynamodb import StockInsuficienteError, COMPRAS_TABLE, obtener_compra, get_compras_table
+from productos import PRODUCTOS_TABLE, producto_key, configurar_stock_sharded, obtener_stock
+from reservas import crear_reserva, confirmar_reserva, liberar_reserva, reserva_key
+from resilience import dynamodb_con_plazo
+
+dynamodb = dynamodb_con_plazo()
+
+TENANT = 'tenant-stress'
+CODIGO = 'PROD-FLASH'
+
+def crear_tablas():
+    client = dynamodb.meta.client
+    existentes = client.list_tables()['TableNames']
+    for nombre in (COMPRAS_TABLE, PRODUCTOS_TABLE):
+        if nombre in existentes:
+            client.delete_table(TableName=nombre)
+            client.get_waiter('table_not_exists').wait(TableName=nombre)
+        client.create_table(
+            TableName=nombre,
+            AttributeDefinitions=[
+                {'AttributeName': 'tenant_id', 'AttributeType': 'S'},
+                {'AttributeName': 'SK', 'AttributeType': 'S'}
+            ],
+            KeySchema=[
+                {'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                {'AttributeName': 'SK', 'KeyType': 'RANGE'}
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        client.get_waiter('table_exists').wait(TableName=nombre)
+
+def sembrar_producto(stock, shards):
+    dynamodb.Table(PRODUCTOS_TABLE).put_item(Item={
+        **producto_key(TENANT, CODIGO),
+        'codigo': CODIGO,
+        'nombre': 'Producto flash',
+        'precio': 10,
+        'stock': stock
+    })
+    if shards > 1:
+        configurar_stock_sharded(TENANT, CODIGO, shards)
+
+def reservar(i):
+    body = {
+        'productos': [{'codigo': CODIGO, 'cantidad': 1}],
+        'direccion_entrega': 'Av. Siempre Viva 742',
+        'metodo_pago': 'TARJETA'
+    }
+    try:
+        return crear_reserva(TENANT, f'user-{i}', body), f'user-{i}'
+    except StockInsuficienteError:
+        return None, f'user-{i}'
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stock', type=int, default=50)
+    parser.add_argument('--compradores', type=int, default=200)
+    parser.add_argument('--hilos', type=int, default=32)
+    parser.add_argument('--shards', type=int, default=1)
+    args = parser.parse_args()
+
+    crear_tablas()
+    sembrar_producto(args.stock, args.shards)
+
+    inicio = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        resultados = list(executor.map(reservar, range(args.compradores)))
+    duracion = time.perf_counter() - inicio
+
+    reservas = [(r, user) for r, user in resultados if r]
+    exitosas = len(reservas)
+    stock_restante = obtener_stock(TENANT, CODIGO)
+    print(f"Reservas exitosas: {exitosas}/{args.compradores} en {duracion:.2f}s "
+          f"({args.compradores / duracion:.0f} req/s), stock restante: {stock_restante}")
+
+    errores = []
+    if exitosas != min(args.stock, args.compradores):
+        errores.append(f'se esperaban {min(args.stock, args.compradores)} reservas exitosas')
+    if stock_restante != args.stock - exitosas or stock_restante < 0:
+        errores.append('el stock restante no cuadra (sobreventa o pérdida)')
+
+    # Confirmar la mitad y expirar el resto (simulando el borrado por TTL)
+    mitad = exitosas // 2
+    table = get_compras_table()
+    for reserva, user in reservas[:mitad]:
+        confirmar_reserva(TENANT, user, reserva['reserva_id'])
+    holds = [table.get_item(Key=reserva_key(TENANT, reserva['reserva_id']), ConsistentRead=True)['Item']
+             for reserva, _ in reservas[mitad:]]
+    # Cada hold se libera dos veces en paralelo (stream y barrido a la vez): solo una repone
+    with ThreadPoolExecutor(max_workers=args.hilos) as executor:
+        liberadas = sum(executor.map(liberar_reserva, holds + holds))
+    if liberadas != len(holds):
+        errores.append(f'{liberadas} liberaciones reportadas para {len(holds)} reservas')
+
+    stock_final = obtener_stock(TENANT, CODIGO)
+    print(f"Confirmadas: {mitad}, expiradas: {exitosas - mitad}, stock final: {stock_final}")
+    if stock_final != args.stock - mitad:
+        errores.append(f'stock final {stock_final}, se esperaba {args.stock - mitad}')
+
+    estados = {}
+    for reserva, _ in reservas:
+        compra = obtener_compra(TENANT, reserva['compra_id'], consistent_read=True, use_cache=False)
+        estados[compra['estado']] = estados.get(compra['estado'], 0) + 1
+    print(f"Estados de compras: {estados}")
+    if estados.get('COMPLETADA', 0) != mitad or estados.get('EXPIRADA', 0) != exitosas - mitad:
+        errores.append('estados de compra inconsistentes')
+
+    if errores:
+        print('FALLO: ' + '; '.join(errores))
+        sys.exit(1)
+    print('OK')
+
+if __name__ == '__main__':
+    main()
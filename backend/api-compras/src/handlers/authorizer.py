@@ -0,0 +1,56 @@
+import os
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from auth import decode_token, user_context_from_payload
+from resilience import ServicioNoDisponible, set_lambda_context
+
+def build_policy(principal_id: str, effect: str, method_arn: str, context=None):
+    """
+    Política IAM para API Gateway. Se autoriza toda la API (stage/*/*) porque el
+    resultado se cachea por token y se reutiliza en las demás rutas.
+    """
+    api_arn = '/'.join(method_arn.split('/')[:2]) + '/*/*'
+    policy = {
+        'principalId': principal_id,
+        'policyDocument': {
+            'Version': '2012-10-17',
+            'Statement': [{
+                'Action': 'execute-api:Invoke',
+                'Effect': effect,
+                'Resource': api_arn
+            }]
+        }
+    }
+    if context:
+        policy['context'] = context
+    return policy
+
+def lambda_handler(event, context):
+    """
+    Authorizer TOKEN de API Gateway: valida el JWT una vez por token y TTL de cache
+    y entrega el user_context a los handlers en requestContext.authorizer
+    """
+    set_lambda_context(context)
+    try:
+        payload = decode_token(event.get('authorizationToken'))
+    except ValueError as e:
+        print(f"Token rechazado: {e}")
+        # API Gateway responde 401 solo con este mensaje exacto
+        raise Exception('Unauthorized')
+    except ServicioNoDisponible as e:
+        # JWKS inalcanzable: el token no es inválido, no se puede verificar. Cualquier otro
+        # error es AUTHORIZER_FAILURE (no se cachea), que serverless.yml responde como 503
+        print(f"No se pudo verificar el token: {e}")
+        raise Exception('ServicioNoDisponible')
+
+    user_context = user_context_from_payload(payload)
+    # Los valores del contexto deben ser string, número o booleano
+    contexto = {k: v for k, v in user_context.items() if v is not None}
+    # El resultado queda cacheado más allá del vencimiento: require_auth compara exp
+    if payload.get('exp') is not None:
+        contexto['exp'] = int(payload['exp'])
+    return build_policy(str(user_context.get('user_id')), 'Allow', event['methodArn'], contexto)
@@ -1,38 +1,59 @@
+import base64
 import json
-import boto3
 import os
 import csv
 from datetime import datetime
 from io import StringIO
 
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from resilience import PlazoAgotado, ServicioNoDisponible, set_lambda_context, verificar_plazo, s3_con_plazo
+
+from decimal import Decimal
+from dynamodb import cache_compartido, invalidar_compra_cache, decodificar_productos
+from reservas import liberar_reserva
+
 # Configuración de S3
-s3_client = boto3.client('s3')
 BUCKET_NAME = os.environ.get('COMPRAS_BUCKET', 'compras-data-dev')
+# Tiempo mínimo para exportar un registro (varias llamadas a S3)
+STREAM_MARGEN_REGISTRO_MS = int(os.environ.get('STREAM_MARGEN_REGISTRO_MS', '2000'))
 
 def lambda_handler(event, context):
     """
     Handler para procesar cambios en DynamoDB Streams de compras
     Exporta los datos como CSV/JSON a S3 para análisis con Athena
     """
-    try:
-        print(f"Processing {len(event['Records'])} records")
+    set_lambda_context(context)
+    print(f"Processing {len(event['Records'])} records")
+    
+    for posicion, record in enumerate(event['Records']):
+        # Sin tiempo suficiente: el stream reintenta desde este registro
+        try:
+            verificar_plazo('compras_stream', STREAM_MARGEN_REGISTRO_MS)
+        except PlazoAgotado as e:
+            print(f"{e}; {len(event['Records']) - posicion} records left for retry")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
         
-        for record in event['Records']:
-            # Solo procesar eventos INSERT y MODIFY
+        try:
+            # INSERT/MODIFY se exportan; REMOVE libera reservas expiradas por TTL
             if record['eventName'] in ['INSERT', 'MODIFY']:
                 process_compra_record(record)
-        
-        return {
-            'statusCode': 200,
-            'body': json.dumps('Successfully processed all records')
-        }
+            elif record['eventName'] == 'REMOVE':
+                process_reserva_removida(record)
+        except Exception as e:
+            # Con ReportBatchItemFailures una respuesta sin fallas cuenta como éxito:
+            # se reporta este registro para que el stream reintente desde aquí
+            print(f"Error processing stream record: {e}")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
     
-    except Exception as e:
-        print(f"Error processing stream records: {e}")
-        return {
-            'statusCode': 500,
-            'body': json.dumps(f'Error: {str(e)}')
-        }
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Successfully processed all records'),
+        'batchItemFailures': []
+    }
 
 def process_compra_record(record):
     """Procesa un registro individual de compra"""
@@ -46,8 +67,21 @@ def process_compra_record(record):
         # Convertir datos de DynamoDB a formato Python
         compra = convert_dynamodb_to_python(compra_data)
         
+        # Restaurar productos guardados comprimidos o desbordados a S3
+        if compra.get('productos_codec'):
+            compra = decodificar_productos(compra)
+            compra['productos'] = [
+                {k: decimal_to_number(v) for k, v in producto.items()}
+                for producto in compra['productos']
+            ]
+        
         # Solo procesar si es un registro de compra
         if compra.get('SK', '').startswith('COMPRA#'):
+            # Descartar copias cacheadas anteriores al cambio (p.ej. actualizar_estado_compra).
+            # El cache en memoria de este contenedor no es el de la API: ahí solo rige el TTL
+            if record['eventName'] == 'MODIFY' and cache_compartido():
+                invalidar_compra_cache(compra.get('tenant_id'), compra.get('compra_id'), compra.get('updated_at'))
+            
             # Exportar como JSON
             export_to_json(compra)
             
@@ -56,9 +90,31 @@ def process_compra_record(record):
             
             print(f"Exported compra {compra.get('compra_id')} to S3")
     
+    except (ServicioNoDisponible, PlazoAgotado):
+        # Sin los productos desbordados no hay nada que exportar: reintentar el registro
+        raise
     except Exception as e:
         print(f"Error processing individual record: {e}")
 
+def process_reserva_removida(record):
+    """
+    Devuelve al stock las reservas borradas (TTL) sin haberse confirmado.
+    Los errores se propagan para que el registro se reintente.
+    """
+    old_image = record['dynamodb'].get('OldImage')
+    if not old_image or not old_image.get('SK', {}).get('S', '').startswith('RESERVA#'):
+        return
+    
+    reserva = convert_dynamodb_to_python(old_image)
+    if liberar_reserva(reserva):
+        print(f"Released expired reserva {reserva.get('reserva_id')}")
+
+def decimal_to_number(value):
+    """Convierte Decimal a int/float para que json.dumps pueda exportarlo"""
+    if isinstance(value, Decimal):
+        return int(value) if value == value.to_integral_value() else float(value)
+    return value
+
 def convert_dynamodb_to_python(item):
     """Convierte un item de DynamoDB al formato Python estándar"""
     def convert_value(value):
@@ -66,6 +122,8 @@ def convert_dynamodb_to_python(item):
             return value['S']
         elif 'N' in value:
             return float(value['N']) if '.' in value['N'] else int(value['N'])
+        elif 'B' in value:
+            return base64.b64decode(value['B'])
         elif 'BOOL' in value:
             return value['BOOL']
         elif 'L' in value:
@@ -105,7 +163,7 @@ def export_to_json(compra):
         }
         
         # Subir a S3
-        s3_client.put_object(
+        s3_con_plazo().put_object(
             Bucket=BUCKET_NAME,
             Key=key,
             Body=json.dumps(export_data, ensure_ascii=False, indent=2),
@@ -141,7 +199,7 @@ def export_to_csv(compra):
         # Verificar si el archivo ya existe para agregar header
         file_exists = True
         try:
-            s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+            s3_con_plazo().head_object(Bucket=BUCKET_NAME, Key=key)
         except:
             file_exists = False
         
@@ -160,7 +218,7 @@ def export_to_csv(compra):
             # Append al archivo existente
             try:
                 # Obtener contenido existente
-                response = s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
+                response = s3_con_plazo().get_object(Bucket=BUCKET_NAME, Key=key)
                 existing_content = response['Body'].read().decode('utf-8')
                 
                 # Combinar contenido
@@ -171,7 +229,7 @@ def export_to_csv(compra):
             new_content = csv_content
         
         # Subir archivo actualizado
-        s3_client.put_object(
+        s3_con_plazo().put_object(
             Bucket=BUCKET_NAME,
             Key=key,
             Body=new_content,
@@ -215,7 +273,7 @@ def export_productos_detail(compra):
         # Verificar si el archivo ya existe
         file_exists = True
         try:
-            s3_client.head_object(Bucket=BUCKET_NAME, Key=key)
+            s3_con_plazo().head_object(Bucket=BUCKET_NAME, Key=key)
         except:
             file_exists = False
         
@@ -231,7 +289,7 @@ def export_productos_detail(compra):
         
         if file_exists:
             try:
-                response = s3_client.get_object(Bucket=BUCKET_NAME, Key=key)
+                response = s3_con_plazo().get_object(Bucket=BUCKET_NAME, Key=key)
                 existing_content = response['Body'].read().decode('utf-8')
                 new_content = existing_content + csv_content
             except:
@@ -239,7 +297,7 @@ def export_productos_detail(compra):
         else:
             new_content = csv_content
         
-        s3_client.put_object(
+        s3_con_plazo().put_object(
             Bucket=BUCKET_NAME,
             Key=key,
             Body=new_content,
@@ -0,0 +1,42 @@
+import os
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from auth import require_auth, create_response, get_tenant_id, get_user_id, service_unavailable_response
+from dynamodb import obtener_compra
+from checkout import CheckoutError
+from reservas import confirmar_reserva
+from resilience import ServicioNoDisponible
+
+def lambda_handler(event, context):
+    @require_auth
+    def _handler(event, context):
+        try:
+            tenant_id = get_tenant_id(event)
+            user_id = get_user_id(event)
+            reserva_id = (event.get('pathParameters') or {}).get('reserva_id')
+
+            if not tenant_id or not user_id or not reserva_id:
+                return create_response(400, {'success': False, 'error': 'Datos insuficientes'})
+
+            compra_id = confirmar_reserva(tenant_id, user_id, reserva_id)
+            compra = obtener_compra(tenant_id, compra_id, consistent_read=True, use_cache=False)
+
+            return create_response(200, {
+                'success': True,
+                'message': 'Reserva confirmada',
+                'data': compra
+            })
+
+        except CheckoutError as e:
+            return create_response(e.status_code, {'success': False, 'error': e.message})
+        except ServicioNoDisponible as e:
+            return service_unavailable_response(e)
+        except Exception as e:
+            print(f"Error interno: {e}")
+            return create_response(500, {'success': False, 'error': 'Error interno del servidor'})
+
+    return _handler(event, context)
@@ -0,0 +1,144 @@
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+from botocore.exceptions import ClientError
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from auth import require_auth, create_response, get_tenant_id, get_user_id, service_unavailable_response
+from dynamodb import registrar_compra_transaccional, StockInsuficienteError
+from productos import obtener_catalogo
+from checkout import (CheckoutError, validar_datos_compra, calcular_cantidades, validar_productos,
+                      construir_compra, formatear_compra_creada, shards_por_producto)
+from idempotency import idempotent, marcar_efectos_confirmados
+from resilience import ServicioNoDisponible
+
+MAX_COMPRAS_BATCH = int(os.environ.get('MAX_COMPRAS_BATCH', '500'))
+BATCH_WRITE_WORKERS = int(os.environ.get('BATCH_WRITE_WORKERS', '16'))
+
+def _resultado_error(indice, status_code, error):
+    return {'indice': indice, 'success': False, 'status': status_code, 'error': error}
+
+def _registrar(indice, compra_item, cantidades, shards):
+    """Confirma una compra (su propia transacción con condiciones de stock)"""
+    try:
+        registrar_compra_transaccional(compra_item, cantidades, shards)
+        return {'indice': indice, 'success': True, 'status': 201, 'data': formatear_compra_creada(compra_item)}
+    except StockInsuficienteError as e:
+        return _resultado_error(indice, 400, str(e))
+    except ServicioNoDisponible:
+        return _resultado_error(indice, 503, 'Servicio temporalmente no disponible, reintente')
+    except ClientError as e:
+        print(f"Error al registrar compra {indice}: {e}")
+        return _resultado_error(indice, 500, 'Error al registrar la compra')
+    except Exception as e:
+        # Otras compras del lote ya pueden estar confirmadas: el fallo es solo de esta fila
+        print(f"Error inesperado al registrar compra {indice}: {e!r}")
+        return _resultado_error(indice, 500, 'Error al registrar la compra')
+
+def lambda_handler(event, context):
+    @require_auth
+    @idempotent
+    def _handler(event, context):
+        try:
+            # El JWT se valida una sola vez para todo el lote
+            tenant_id = get_tenant_id(event)
+            user_id = get_user_id(event)
+
+            if not tenant_id or not user_id:
+                return create_response(400, {
+                    'success': False,
+                    'error': 'Información de usuario inválida'
+                })
+
+            if isinstance(event.get('body'), str):
+                body = json.loads(event['body'])
+            else:
+                body = event.get('body', {})
+
+            compras = body.get('compras')
+            if not isinstance(compras, list) or len(compras) == 0:
+                return create_response(400, {
+                    'success': False,
+                    'error': 'Debe incluir una lista compras no vacía'
+                })
+
+            if len(compras) > MAX_COMPRAS_BATCH:
+                return create_response(400, {
+                    'success': False,
+                    'error': f'Máximo {MAX_COMPRAS_BATCH} compras por lote'
+                })
+
+            # Validar cada compra por separado; los errores no detienen el lote
+            resultados = [None] * len(compras)
+            validas = []
+            for indice, compra in enumerate(compras):
+                try:
+                    productos, direccion_entrega, metodo_pago = validar_datos_compra(compra or {})
+                    cantidades = calcular_cantidades(productos)
+                    validas.append((indice, productos, direccion_entrega, metodo_pago, cantidades))
+                except CheckoutError as e:
+                    resultados[indice] = _resultado_error(indice, e.status_code, e.message)
+                except (AttributeError, TypeError):
+                    resultados[indice] = _resultado_error(indice, 400, 'Formato de compra inválido')
+
+            # Resolver el catálogo de todas las compras en una sola pasada
+            codigos = {codigo for *_, cantidades in validas for codigo in cantidades}
+            try:
+                catalogo = obtener_catalogo(tenant_id, list(codigos)) if codigos else {}
+            except ClientError as e:
+                print(f"Error al buscar productos: {e}")
+                return create_response(500, {
+                    'success': False,
+                    'error': 'Error al validar productos'
+                })
+
+            pendientes = []
+            for indice, productos, direccion_entrega, metodo_pago, cantidades in validas:
+                try:
+                    productos_validados, total = validar_productos(productos, catalogo)
+                except CheckoutError as e:
+                    resultados[indice] = _resultado_error(indice, e.status_code, e.message)
+                    continue
+                compra_item = construir_compra(tenant_id, user_id, productos_validados, total,
+                                               direccion_entrega, metodo_pago)
+                pendientes.append((indice, compra_item, cantidades, shards_por_producto(catalogo, cantidades)))
+
+            # Cada compra es una transacción independiente (stock condicional);
+            # se ejecutan en paralelo sobre el cliente de DynamoDB (thread-safe)
+            if pendientes:
+                # Desde aquí puede haber compras confirmadas: la clave ya no se libera
+                marcar_efectos_confirmados(event)
+                with ThreadPoolExecutor(max_workers=min(BATCH_WRITE_WORKERS, len(pendientes))) as executor:
+                    for resultado in executor.map(lambda p: _registrar(*p), pendientes):
+                        resultados[resultado['indice']] = resultado
+
+            exitosas = sum(1 for r in resultados if r['success'])
+            return create_response(200, {
+                'success': exitosas == len(resultados),
+                'data': {
+                    'total': len(resultados),
+                    'exitosas': exitosas,
+                    'fallidas': len(resultados) - exitosas,
+                    'resultados': resultados
+                }
+            })
+
+        except json.JSONDecodeError:
+            return create_response(400, {
+                'success': False,
+                'error': 'JSON inválido'
+            })
+        except ServicioNoDisponible as e:
+            return service_unavailable_response(e)
+        except Exception as e:
+            print(f"Error interno: {e}")
+            return create_response(500, {
+                'success': False,
+                'error': 'Error interno del servidor'
+            })
+
+    return _handler(event, context)
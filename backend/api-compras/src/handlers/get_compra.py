@@ -1,12 +1,11 @@
 import os
 import json
-import boto3
-from boto3.dynamodb.conditions import Key
-from botocore.exceptions import ClientError
 import sys
 sys.path.append('/opt/python')
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
-from auth import require_auth, create_response, get_tenant_id, get_user_id
+from auth import require_auth, create_response, get_tenant_id, get_user_id, service_unavailable_response
+from dynamodb import obtener_compra
+from resilience import ServicioNoDisponible
 
 def lambda_handler(event, context):
     @require_auth
@@ -17,18 +16,15 @@ def lambda_handler(event, context):
             compra_id = event.get('pathParameters', {}).get('compra_id')
             if not tenant_id or not user_id or not compra_id:
                 return create_response(400, {'success': False, 'error': 'Datos insuficientes'})
-            dynamodb = boto3.resource('dynamodb')
-            compras_table = dynamodb.Table(os.environ.get('COMPRAS_TABLE', 'compras-dev'))
-            response = compras_table.get_item(
-                Key={
-                    'tenant_id': tenant_id,
-                    'SK': f'COMPRA#{compra_id}'
-                }
-            )
-            item = response.get('Item')
+            # ?consistent=true fuerza lectura fuerte y omite el cache del contenedor
+            query_params = event.get('queryStringParameters') or {}
+            consistent = str(query_params.get('consistent', 'false')).lower() == 'true'
+            item = obtener_compra(tenant_id, compra_id, consistent_read=consistent or None, use_cache=not consistent)
             if not item:
                 return create_response(404, {'success': False, 'error': 'Compra no encontrada'})
             return create_response(200, {'success': True, 'data': item})
+        except ServicioNoDisponible as e:
+            return service_unavailable_response(e)
         except Exception as e:
             print(f"Error interno: {e}")
             return create_response(500, {'success': False, 'error': 'Error interno del servidor'})
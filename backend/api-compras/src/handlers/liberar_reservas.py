@@ -0,0 +1,34 @@
+import json
+import os
+import time
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from resilience import PlazoAgotado, set_lambda_context, verificar_plazo
+
+from reservas import reservas_vencidas, barrer_reserva
+
+def lambda_handler(event, context):
+    """
+    Handler programado: libera las reservas vencidas sin esperar al borrado por TTL
+    (que puede tardar horas) y las borra. Lo que no alcance queda para la próxima corrida.
+    """
+    set_lambda_context(context)
+    liberadas = revisadas = 0
+    try:
+        for reserva in reservas_vencidas(int(time.time())):
+            verificar_plazo('liberar_reservas')
+            revisadas += 1
+            if barrer_reserva(reserva):
+                liberadas += 1
+    except PlazoAgotado as e:
+        print(f"{e}; remaining reservas left for the next run")
+
+    print(f"Released {liberadas} of {revisadas} expired reservas")
+    return {
+        'statusCode': 200,
+        'body': json.dumps({'revisadas': revisadas, 'liberadas': liberadas})
+    }
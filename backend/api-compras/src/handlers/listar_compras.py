@@ -1,6 +1,5 @@
 import json
 import os
-import boto3
 from boto3.dynamodb.conditions import Key
 from botocore.exceptions import ClientError
 
@@ -9,8 +8,10 @@ import sys
 sys.path.append('/opt/python')
 sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
 
-from auth import require_auth, create_response, get_tenant_id, get_user_id
-from dynamodb import listar_compras_usuario
+from auth import require_auth, create_response, get_tenant_id, get_user_id, service_unavailable_response
+from dynamodb import (SOLO_COMPRAS, listar_compras_usuario, build_projection, decodificar_productos, get_compras_table,
+                      indice_compras_usuario, COMPRA_SUMMARY_FIELDS, COMPRAS_TABLE)
+from resilience import ServicioNoDisponible, con_reintentos
 
 def lambda_handler(event, context):
     @require_auth
@@ -30,19 +31,31 @@ def lambda_handler(event, context):
             query_params = event.get('queryStringParameters') or {}
             limit = min(int(query_params.get('limit', 20)), 50)  # Máximo 50
             last_key = query_params.get('lastKey')
+            fields = query_params.get('fields', 'full')
+
+            if fields not in ('summary', 'full'):
+                return create_response(400, {
+                    'success': False,
+                    'error': 'Parámetro fields inválido. Valores permitidos: summary, full'
+                })
+            summary = fields == 'summary'
 
             # Conectar a DynamoDB
-            dynamodb = boto3.resource('dynamodb')
-            compras_table = dynamodb.Table(os.environ.get('COMPRAS_TABLE', 'compras-dev'))
+            compras_table = get_compras_table()
 
             # Preparar query parameters
             query_params_db = {
-                'IndexName': 'UserComprasIndex',
+                'IndexName': indice_compras_usuario(summary),
                 'KeyConditionExpression': Key('tenant_id').eq(tenant_id) & Key('user_id').eq(user_id),
+                'FilterExpression': SOLO_COMPRAS,
                 'ScanIndexForward': False,  # Ordenar por fecha descendente
                 'Limit': limit
             }
 
+            # En modo resumen se lee el GSI que no proyecta la lista de productos
+            if summary:
+                query_params_db.update(build_projection(COMPRA_SUMMARY_FIELDS))
+
             # Agregar paginación si existe
             if last_key:
                 try:
@@ -53,22 +66,28 @@ def lambda_handler(event, context):
 
             # Ejecutar consulta
             try:
-                response = compras_table.query(**query_params_db)
+                response = con_reintentos(COMPRAS_TABLE, compras_table.query, **query_params_db)
                 compras = response.get('Items', [])
 
                 # Formatear compras para respuesta
                 compras_formateadas = []
                 for compra in compras:
-                    compras_formateadas.append({
+                    compra_formateada = {
                         'compra_id': compra.get('compra_id'),
-                        'productos': compra.get('productos', []),
                         'total': float(compra.get('total', 0)),
                         'direccion_entrega': compra.get('direccion_entrega'),
                         'metodo_pago': compra.get('metodo_pago'),
                         'estado': compra.get('estado'),
                         'fecha_compra': compra.get('fecha_compra'),
                         'created_at': compra.get('created_at')
-                    })
+                    }
+                    if summary:
+                        compra_formateada['cantidad_productos'] = int(compra.get('cantidad_productos', 0))
+                    else:
+                        productos = decodificar_productos(compra).get('productos', [])
+                        compra_formateada['productos'] = productos
+                        compra_formateada['cantidad_productos'] = int(compra.get('cantidad_productos', len(productos)))
+                    compras_formateadas.append(compra_formateada)
 
                 # Preparar respuesta con información de paginación
                 respuesta = {
@@ -77,7 +96,8 @@ def lambda_handler(event, context):
                         'compras': compras_formateadas,
                         'count': len(compras_formateadas),
                         'user_id': user_id,
-                        'tenant_id': tenant_id
+                        'tenant_id': tenant_id,
+                        'fields': fields
                     }
                 }
 
@@ -108,6 +128,8 @@ def lambda_handler(event, context):
                         'error': 'Error al buscar compras'
                     })
 
+        except ServicioNoDisponible as e:
+            return service_unavailable_response(e)
         except Exception as e:
             print(f"Error interno: {e}")
             return create_response(500, {
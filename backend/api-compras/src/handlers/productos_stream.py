@@ -0,0 +1,62 @@
+import json
+import os
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from resilience import PlazoAgotado, set_lambda_context, verificar_plazo
+
+from productos import invalidar_catalogo
+
+# Campos del snapshot de catálogo; cambios solo de stock no lo invalidan
+CAMPOS_CATALOGO = ('nombre', 'precio', 'stock_shards')
+
+def lambda_handler(event, context):
+    """
+    Handler para DynamoDB Streams de la tabla de productos
+    Invalida el snapshot de catálogo (precio, nombre) usado en el checkout
+    """
+    set_lambda_context(context)
+    invalidados = 0
+    for posicion, record in enumerate(event['Records']):
+        # Sin tiempo suficiente: el stream reintenta desde este registro
+        try:
+            verificar_plazo('productos_stream')
+        except PlazoAgotado as e:
+            print(f"{e}; {len(event['Records']) - posicion} records left for retry")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+
+        try:
+            if process_producto_record(record):
+                invalidados += 1
+        except Exception as e:
+            # Con ReportBatchItemFailures una respuesta sin fallas cuenta como éxito:
+            # se reporta este registro para que el stream reintente desde aquí
+            print(f"Error processing stream record: {e}")
+            return {'batchItemFailures': [{'itemIdentifier': record['dynamodb']['SequenceNumber']}]}
+
+    print(f"Invalidated {invalidados} of {len(event['Records'])} catalog entries")
+    return {
+        'statusCode': 200,
+        'body': json.dumps('Successfully processed all records'),
+        'batchItemFailures': []
+    }
+
+def process_producto_record(record) -> bool:
+    """Invalida el catálogo si el producto se creó, eliminó o cambió de precio/nombre/shards"""
+    keys = record['dynamodb'].get('Keys', {})
+    sk = keys.get('SK', {}).get('S', '')
+    if not sk.startswith('PRODUCTO#'):
+        return False
+
+    if record['eventName'] == 'MODIFY':
+        old_image = record['dynamodb'].get('OldImage', {})
+        new_image = record['dynamodb'].get('NewImage', {})
+        if all(old_image.get(campo) == new_image.get(campo) for campo in CAMPOS_CATALOGO):
+            return False
+
+    # INSERT también invalida: puede existir un negativo cacheado para el código
+    invalidar_catalogo(keys['tenant_id']['S'], sk.split('#', 1)[1])
+    return True
@@ -0,0 +1,76 @@
+import json
+import os
+from botocore.exceptions import ClientError
+
+# Importar utilidades
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+
+from auth import require_auth, create_response, get_tenant_id, get_user_id, service_unavailable_response
+from dynamodb import StockInsuficienteError
+from checkout import CheckoutError
+from idempotency import idempotent, marcar_efectos_confirmados
+from reservas import crear_reserva
+from resilience import ServicioNoDisponible
+
+def lambda_handler(event, context):
+    @require_auth
+    @idempotent
+    def _handler(event, context):
+        try:
+            tenant_id = get_tenant_id(event)
+            user_id = get_user_id(event)
+
+            if not tenant_id or not user_id:
+                return create_response(400, {
+                    'success': False,
+                    'error': 'Información de usuario inválida'
+                })
+
+            if isinstance(event.get('body'), str):
+                body = json.loads(event['body'])
+            else:
+                body = event.get('body', {})
+
+            try:
+                reserva = crear_reserva(tenant_id, user_id, body)
+            except StockInsuficienteError as e:
+                return create_response(400, {
+                    'success': False,
+                    'error': str(e)
+                })
+            except ClientError as e:
+                print(f"Error al crear reserva: {e}")
+                return create_response(500, {
+                    'success': False,
+                    'error': 'Error al reservar productos'
+                })
+            marcar_efectos_confirmados(event)
+
+            return create_response(201, {
+                'success': True,
+                'message': 'Reserva creada exitosamente',
+                'data': reserva
+            })
+
+        except CheckoutError as e:
+            return create_response(e.status_code, {
+                'success': False,
+                'error': e.message
+            })
+        except json.JSONDecodeError:
+            return create_response(400, {
+                'success': False,
+                'error': 'JSON inválido'
+            })
+        except ServicioNoDisponible as e:
+            return service_unavailable_response(e)
+        except Exception as e:
+            print(f"Error interno: {e}")
+            return create_response(500, {
+                'success': False,
+                'error': 'Error interno del servidor'
+            })
+
+    return _handler(event, context)
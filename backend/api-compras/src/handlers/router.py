@@ -0,0 +1,50 @@
+import os
+
+# Importar utilidades y handlers
+import sys
+sys.path.append('/opt/python')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+sys.path.append(os.path.dirname(__file__))
+
+from auth import create_response
+
+import crear_compra
+import crear_compras_batch
+import listar_compras
+import get_compra
+import reservar_compra
+import confirmar_reserva
+
+# Los navegadores reutilizan el preflight durante este tiempo (Chrome lo limita a 7200s)
+CORS_MAX_AGE = os.environ.get('CORS_MAX_AGE', '7200')
+
+# Tabla de rutas (httpMethod, resource) -> handler; los handlers siguen siendo invocables solos
+ROUTES = {
+    ('POST', '/compras'): crear_compra.lambda_handler,
+    ('GET', '/compras'): listar_compras.lambda_handler,
+    ('POST', '/compras/batch'): crear_compras_batch.lambda_handler,
+    ('POST', '/compras/reservas'): reservar_compra.lambda_handler,
+    ('POST', '/compras/reservas/{reserva_id}/confirmar'): confirmar_reserva.lambda_handler,
+    ('GET', '/compras/{compra_id}'): get_compra.lambda_handler,
+}
+RESOURCES = {resource for _, resource in ROUTES}
+
+def lambda_handler(event, context):
+    """
+    Punto de entrada único de la API de compras: despacha por httpMethod/resource
+    y responde el preflight CORS sin pasar por los handlers
+    """
+    method = (event.get('httpMethod') or '').upper()
+    resource = event.get('resource') or event.get('path')
+
+    if method == 'OPTIONS':
+        return create_response(200, {'message': 'CORS preflight'},
+                               extra_headers={'Access-Control-Max-Age': CORS_MAX_AGE})
+
+    handler = ROUTES.get((method, resource))
+    if handler is None:
+        if resource in RESOURCES:
+            return create_response(405, {'success': False, 'error': f'Método {method} no permitido'})
+        return create_response(404, {'success': False, 'error': 'Ruta no encontrada'})
+
+    return handler(event, context)
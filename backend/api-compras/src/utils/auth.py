@@ -1,11 +1,37 @@
 import json
 import jwt
 import os
-from typing import Dict, Any
+import time
+from typing import Dict, Any, Optional
+
+from resilience import ServicioNoDisponible, set_lambda_context
+from revocaciones import esta_revocado
 
 JWT_SECRET = os.environ.get('JWT_SECRET', 'mi-jwt-secret-super-seguro-y-secreto')
+# Llavero HS256 {"kid": "secreto"} (JSON), rotado desde api-usuarios; los tokens sin kid usan JWT_SECRET
+JWT_SECRETS = json.loads(os.environ.get('JWT_SECRETS', '') or '{}')
+# JWKS de api-usuarios: los tokens EdDSA/ES256 se verifican con la clave pública de su kid
+JWKS_URL = os.environ.get('JWKS_URL', '')
+JWKS_LIFESPAN = int(os.environ.get('JWKS_LIFESPAN', '300'))
+# Vencido el lifespan se sigue usando el JWKS hasta JWKS_MAX_STALE s más mientras se refresca
+# en segundo plano (una caída del endpoint no tumba la validación)
+JWKS_MAX_STALE = int(os.environ.get('JWKS_MAX_STALE', '3600'))
+# Mínimo entre refetches por kid desconocido: el kid viene de un header sin verificar
+JWKS_MIN_REFRESH_S = float(os.environ.get('JWKS_MIN_REFRESH_S', '10'))
+# Aceptar tokens HS256 firmados con JWT_SECRET (emitidos antes de migrar a claves asimétricas)
+JWT_ACEPTAR_HS256 = os.environ.get('JWT_ACEPTAR_HS256', 'true').lower() == 'true'
+ALGORITMOS_ASIMETRICOS = ('EdDSA', 'ES256')
+
+# Cliente por contenedor: cachea el JWKS y cada clave por kid; un kid nuevo (rotación) fuerza un refetch
+jwks_client = jwt.PyJWKClient(
+    JWKS_URL, cache_keys=True, lifespan=JWKS_LIFESPAN,
+    max_stale=JWKS_MAX_STALE, min_refresh_interval=JWKS_MIN_REFRESH_S
+) if JWKS_URL else None
+# Con el authorizer de API Gateway activo, require_auth usa su contexto en lugar de decodificar el JWT
+TRUST_AUTHORIZER = os.environ.get('JWT_AUTHORIZER', 'false').lower() == 'true'
 
-def create_response(status_code: int, body: Dict[str, Any], cors: bool = True) -> Dict[str, Any]:
+def create_response(status_code: int, body: Dict[str, Any], cors: bool = True,
+                    extra_headers: Optional[Dict[str, str]] = None) -> Dict[str, Any]:
     """Crea una respuesta HTTP estándar con headers CORS"""
     headers = {
         'Content-Type': 'application/json'
@@ -14,57 +40,125 @@ def create_response(status_code: int, body: Dict[str, Any], cors: bool = True) -
     if cors:
         headers.update({
             'Access-Control-Allow-Origin': '*',
-            'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Tenant-Id,X-Amz-Date,X-Api-Key,X-Amz-Security-Token',
+            'Access-Control-Allow-Headers': 'Content-Type,Authorization,X-Tenant-Id,X-Amz-Date,X-Api-Key,X-Amz-Security-Token,Idempotency-Key',
             'Access-Control-Allow-Methods': 'GET,POST,PUT,DELETE,OPTIONS'
         })
     
+    if extra_headers:
+        headers.update(extra_headers)
+    
     return {
         'statusCode': status_code,
         'headers': headers,
         'body': json.dumps(body, ensure_ascii=False, default=str)
     }
 
-def validate_jwt(event: Dict[str, Any]) -> Dict[str, Any]:
-    """Valida el token JWT y retorna el payload"""
+def decode_token(auth_header: Optional[str]) -> Dict[str, Any]:
+    """Valida el valor del header Authorization (con o sin 'Bearer ') y retorna el payload"""
     try:
-        auth_header = event.get('headers', {}).get('Authorization') or event.get('headers', {}).get('authorization')
         if not auth_header:
             raise ValueError('Token de autorización requerido')
         
         token = auth_header.replace('Bearer ', '') if auth_header.startswith('Bearer ') else auth_header
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        key, algorithms = verification_key(token)
+        payload = jwt.decode(token, key, algorithms=algorithms)
         
         return payload
     except jwt.ExpiredSignatureError:
         raise ValueError('Token expirado')
-    except jwt.InvalidTokenError:
+    except jwt.PyJWKClientConnectionError as e:
+        raise ServicioNoDisponible('jwks', str(e))
+    except jwt.PyJWTError:
         raise ValueError('Token inválido')
 
+def hs256_secret(kid: Optional[str]) -> str:
+    """Secreto HS256 del kid del header"""
+    if kid is None:
+        return JWT_SECRET
+    secret = JWT_SECRETS.get(kid)
+    if secret is None:
+        raise jwt.InvalidTokenError(f'kid desconocido: {kid}')
+    return secret
+
+def verification_key(token: str):
+    """Clave y algoritmo permitido según el header del token (cada clave solo acepta el suyo)"""
+    header = jwt.get_unverified_header(token)
+    alg = header.get('alg')
+    if alg in ALGORITMOS_ASIMETRICOS and jwks_client is not None:
+        signing_key = jwks_client.get_signing_key_from_jwt(token)
+        return signing_key.key, [signing_key.algorithm_name]
+    if alg == 'HS256' and (JWT_ACEPTAR_HS256 or jwks_client is None):
+        return hs256_secret(header.get('kid')), ['HS256']
+    raise jwt.InvalidTokenError(f'Algoritmo no aceptado: {alg}')
+
+def validate_jwt(event: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida el token JWT y retorna el payload"""
+    headers = event.get('headers') or {}
+    return decode_token(headers.get('Authorization') or headers.get('authorization'))
+
+def user_context_from_payload(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """Contexto de usuario que reciben los handlers"""
+    return {
+        'user_id': payload.get('user_id'),
+        'email': payload.get('email'),
+        'tenant_id': payload.get('tenant_id'),
+        'jti': payload.get('jti')
+    }
+
+def authorizer_user_context(event: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    """Contexto de usuario que dejó el authorizer de API Gateway, si está habilitado y presente"""
+    if not TRUST_AUTHORIZER:
+        return None
+    authorizer = (event.get('requestContext') or {}).get('authorizer') or {}
+    # Sin exp (token sin vencimiento o contexto anterior) se valida el JWT en el handler
+    if not authorizer.get('user_id') or authorizer.get('exp') is None:
+        return None
+    # API Gateway cachea el resultado hasta resultTtlInSeconds aunque el token venza antes
+    if int(authorizer['exp']) <= time.time():
+        raise ValueError('Token expirado')
+    return user_context_from_payload(authorizer)
+
 def require_auth(handler):
     """Decorador para proteger endpoints con JWT"""
     def wrapper(event, context):
+        # El plazo se cuenta desde que API Gateway recibió la request
+        set_lambda_context(context, event)
+        
         # Manejar CORS preflight
         if event.get('httpMethod') == 'OPTIONS':
             return create_response(200, {'message': 'CORS preflight'})
         
         try:
-            # Validar JWT
-            payload = validate_jwt(event)
-            event['user_context'] = {
-                'user_id': payload.get('user_id'),
-                'email': payload.get('email'),
-                'tenant_id': payload.get('tenant_id')
-            }
+            # El authorizer ya validó el token (resultado cacheado por API Gateway);
+            # sin él, validar el JWT aquí
+            user_context = authorizer_user_context(event)
+            if user_context is None:
+                user_context = user_context_from_payload(validate_jwt(event))
+            # También con el authorizer: su resultado queda cacheado aunque el token se revoque
+            if esta_revocado(user_context.get('jti')):
+                raise ValueError('Token revocado')
+            event['user_context'] = user_context
             
             # Ejecutar handler original
             return handler(event, context)
         except ValueError as e:
             return create_response(401, {'success': False, 'error': str(e)})
+        except ServicioNoDisponible as e:
+            # Fallas fuera del handler (p.ej. el registro de idempotencia)
+            return service_unavailable_response(e)
         except Exception as e:
             return create_response(500, {'success': False, 'error': 'Error interno del servidor'})
     
     return wrapper
 
+def service_unavailable_response(error: ServicioNoDisponible) -> Dict[str, Any]:
+    """Respuesta 503 cuando DynamoDB está limitando o el circuito está abierto"""
+    print(f"Servicio no disponible: {error}")
+    return create_response(503, {
+        'success': False,
+        'error': 'Servicio temporalmente no disponible, reintente en unos segundos'
+    }, extra_headers={'Retry-After': '1'})
+
 def get_tenant_id(event: Dict[str, Any]) -> str:
     """Obtiene el tenant_id desde el contexto del usuario"""
     user_context = event.get('user_context', {})
@@ -0,0 +1,318 @@
+import json
+import os
+import socket
+import threading
+import time
+from collections import OrderedDict
+from decimal import Decimal
+from typing import Any, Dict, Hashable, List, Optional
+from urllib.parse import urlparse
+
+# Valor que se guarda para cachear resultados negativos (p.ej. producto inexistente)
+NOT_FOUND = '__NOT_FOUND__'
+
+
+class TTLCache:
+    """Cache LRU en memoria con expiración por TTL (vive mientras viva el contenedor)"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30):
+        self.max_size = max_size
+        self.ttl = ttl
+        self._data = OrderedDict()  # key -> (expires_at, version, value)
+        self._lock = threading.Lock()
+
+    def get(self, key: Hashable) -> Optional[Any]:
+        """Retorna el valor cacheado o None si no existe o expiró"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return None
+            expires_at, _, value = entry
+            if expires_at <= time.monotonic():
+                del self._data[key]
+                return None
+            self._data.move_to_end(key)
+            return value
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None, version: Optional[str] = None) -> None:
+        """Guarda un valor; version (p.ej. updated_at) permite invalidar por antigüedad"""
+        expires_at = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires_at, version, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.max_size:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable) -> None:
+        with self._lock:
+            self._data.pop(key, None)
+
+    def invalidate_if_stale(self, key: Hashable, version: str) -> bool:
+        """Elimina la entrada si su versión es anterior a la indicada"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None:
+                return False
+            cached_version = entry[1]
+            if cached_version is None or cached_version < version:
+                del self._data[key]
+                return True
+            return False
+
+    def clear(self) -> None:
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self) -> int:
+        return len(self._data)
+
+
+class CacheBackend:
+    """Interfaz común de los backends de cache (claves str, TTL en segundos)"""
+
+    # True si todos los contenedores ven las mismas entradas (una invalidación los alcanza a todos)
+    compartido = False
+
+    def get(self, key: str) -> Optional[Any]:
+        return self.get_many([key]).get(key)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        raise NotImplementedError
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, version: Optional[str] = None) -> None:
+        raise NotImplementedError
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        for key, value in items.items():
+            self.set(key, value, ttl=ttl)
+
+    def delete(self, key: str) -> None:
+        raise NotImplementedError
+
+    def invalidate_if_stale(self, key: str, version: str) -> bool:
+        raise NotImplementedError
+
+
+class MemoryCache(CacheBackend):
+    """Backend en memoria del contenedor. Solo expira por TTL: las invalidaciones hechas
+    desde otro contenedor (p.ej. el stream) no lo alcanzan"""
+
+    def __init__(self, max_size: int = 1024, ttl: float = 30):
+        self._cache = TTLCache(max_size=max_size, ttl=ttl)
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        result = {}
+        for key in keys:
+            value = self._cache.get(key)
+            if value is not None:
+                result[key] = value
+        return result
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, version: Optional[str] = None) -> None:
+        self._cache.set(key, value, ttl=ttl, version=version)
+
+    def delete(self, key: str) -> None:
+        self._cache.delete(key)
+
+    def invalidate_if_stale(self, key: str, version: str) -> bool:
+        return self._cache.invalidate_if_stale(key, version)
+
+
+def _encode_value(value: Any) -> Any:
+    """Convierte Decimal (lo que retorna boto3) a un marcador serializable en JSON"""
+    if isinstance(value, Decimal):
+        return {'__d': str(value)}
+    if isinstance(value, dict):
+        return {k: _encode_value(v) for k, v in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [_encode_value(v) for v in value]
+    return value
+
+
+def _decode_object(obj: Dict[str, Any]) -> Any:
+    if len(obj) == 1 and '__d' in obj:
+        return Decimal(obj['__d'])
+    return obj
+
+
+def dumps(value: Any, version: Optional[str] = None) -> bytes:
+    return json.dumps({'v': version, 'd': _encode_value(value)}, separators=(',', ':')).encode('utf-8')
+
+
+def loads(raw: bytes) -> Dict[str, Any]:
+    return json.loads(raw.decode('utf-8'), object_hook=_decode_object)
+
+
+class RespError(Exception):
+    """Error retornado por el servidor (respuesta '-ERR ...')"""
+
+
+class RespConnection:
+    """Cliente mínimo del protocolo Redis (RESP2) con soporte de pipelining"""
+
+    def __init__(self, host: str, port: int = 6379, db: int = 0, password: Optional[str] = None,
+                 timeout: float = 0.25):
+        self.host = host
+        self.port = port
+        self.db = db
+        self.password = password
+        self.timeout = timeout
+        self._sock = None
+        self._file = None
+        self._lock = threading.Lock()
+
+    def _connect(self) -> None:
+        sock = socket.create_connection((self.host, self.port), timeout=self.timeout)
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self._sock = sock
+        self._file = sock.makefile('rb')
+        setup = []
+        if self.password:
+            setup.append(['AUTH', self.password])
+        if self.db:
+            setup.append(['SELECT', str(self.db)])
+        if setup:
+            self._send(setup)
+            for reply in [self._read_reply() for _ in setup]:
+                if isinstance(reply, RespError):
+                    raise reply
+
+    def close(self) -> None:
+        try:
+            if self._file:
+                self._file.close()
+            if self._sock:
+                self._sock.close()
+        finally:
+            self._sock = None
+            self._file = None
+
+    @staticmethod
+    def _encode_command(args: List[Any]) -> bytes:
+        parts = [b'*%d\r\n' % len(args)]
+        for arg in args:
+            if not isinstance(arg, bytes):
+                arg = str(arg).encode('utf-8')
+            parts.append(b'$%d\r\n%s\r\n' % (len(arg), arg))
+        return b''.join(parts)
+
+    def _send(self, commands: List[List[Any]]) -> None:
+        self._sock.sendall(b''.join(self._encode_command(cmd) for cmd in commands))
+
+    def _read_reply(self) -> Any:
+        line = self._file.readline()
+        if not line:
+            raise ConnectionError('Conexión cerrada por el servidor de cache')
+        prefix, payload = line[:1], line[1:-2]
+        if prefix == b'+':
+            return payload.decode('utf-8')
+        if prefix == b'-':
+            return RespError(payload.decode('utf-8'))
+        if prefix == b':':
+            return int(payload)
+        if prefix == b'$':
+            length = int(payload)
+            if length == -1:
+                return None
+            data = self._file.read(length + 2)
+            return data[:-2]
+        if prefix == b'*':
+            length = int(payload)
+            if length == -1:
+                return None
+            return [self._read_reply() for _ in range(length)]
+        raise ConnectionError(f'Respuesta RESP inválida: {line!r}')
+
+    def pipeline(self, commands: List[List[Any]]) -> List[Any]:
+        """Envía todos los comandos en un solo write y lee las respuestas en orden"""
+        with self._lock:
+            for attempt in range(2):
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._send(commands)
+                    return [self._read_reply() for _ in commands]
+                except (OSError, ConnectionError):
+                    self.close()
+                    if attempt == 1:
+                        raise
+        return []
+
+
+class RedisCache(CacheBackend):
+    """Backend compartido entre contenedores sobre el protocolo Redis.
+
+    Los errores de conexión se tratan como cache miss: el cache nunca debe
+    hacer fallar una request.
+    """
+
+    compartido = True
+
+    def __init__(self, connection: RespConnection, ttl: float = 30, prefix: str = ''):
+        self.connection = connection
+        self.ttl = ttl
+        self.prefix = prefix
+
+    @classmethod
+    def from_url(cls, url: str, ttl: float = 30, prefix: str = '') -> 'RedisCache':
+        parsed = urlparse(url)
+        db = int(parsed.path.lstrip('/') or 0)
+        connection = RespConnection(parsed.hostname or 'localhost', parsed.port or 6379, db=db,
+                                    password=parsed.password)
+        return cls(connection, ttl=ttl, prefix=prefix)
+
+    def _key(self, key: str) -> str:
+        return f"{self.prefix}{key}"
+
+    def _ttl_ms(self, ttl: Optional[float]) -> int:
+        return max(1, int((self.ttl if ttl is None else ttl) * 1000))
+
+    def _pipeline(self, commands: List[List[Any]]) -> Optional[List[Any]]:
+        try:
+            return self.connection.pipeline(commands)
+        except (OSError, ConnectionError) as e:
+            print(f"Cache no disponible: {e}")
+            return None
+
+    def get_many(self, keys: List[str]) -> Dict[str, Any]:
+        if not keys:
+            return {}
+        replies = self._pipeline([['MGET'] + [self._key(k) for k in keys]])
+        if not replies or not isinstance(replies[0], list):
+            return {}
+        result = {}
+        for key, raw in zip(keys, replies[0]):
+            if raw is not None:
+                result[key] = loads(raw)['d']
+        return result
+
+    def set(self, key: str, value: Any, ttl: Optional[float] = None, version: Optional[str] = None) -> None:
+        self._pipeline([['SET', self._key(key), dumps(value, version), 'PX', self._ttl_ms(ttl)]])
+
+    def set_many(self, items: Dict[str, Any], ttl: Optional[float] = None) -> None:
+        if not items:
+            return
+        ttl_ms = self._ttl_ms(ttl)
+        self._pipeline([['SET', self._key(k), dumps(v), 'PX', ttl_ms] for k, v in items.items()])
+
+    def delete(self, key: str) -> None:
+        self._pipeline([['DEL', self._key(key)]])
+
+    def invalidate_if_stale(self, key: str, version: str) -> bool:
+        replies = self._pipeline([['GET', self._key(key)]])
+        if not replies or replies[0] is None or isinstance(replies[0], RespError):
+            return False
+        cached_version = loads(replies[0]).get('v')
+        if cached_version is None or cached_version < version:
+            self.delete(key)
+            return True
+        return False
+
+
+def get_cache_backend(ttl: float = 30, max_size: int = 1024) -> CacheBackend:
+    """Crea el backend configurado: Redis si CACHE_URL está definido, memoria en otro caso"""
+    cache_url = os.environ.get('CACHE_URL')
+    if cache_url:
+        prefix = f"{os.environ.get('STAGE', 'dev')}:"
+        return RedisCache.from_url(cache_url, ttl=ttl, prefix=prefix)
+    return MemoryCache(max_size=max_size, ttl=ttl)
@@ -0,0 +1,118 @@
+from datetime import datetime
+from decimal import Decimal
+from typing import Dict, List, Any, Optional, Tuple
+
+from dynamodb import MAX_TRANSACT_ITEMS
+from ids import uuid7
+
+class CheckoutError(Exception):
+    """Error de validación del checkout con su código HTTP"""
+    def __init__(self, status_code: int, message: str):
+        super().__init__(message)
+        self.status_code = status_code
+        self.message = message
+
+def validar_datos_compra(body: Dict[str, Any]) -> Tuple[List[Dict[str, Any]], str, str]:
+    """Valida los campos requeridos de una compra. Retorna (productos, direccion_entrega, metodo_pago)"""
+    productos = body.get('productos', [])
+    direccion_entrega = body.get('direccion_entrega')
+    metodo_pago = body.get('metodo_pago')
+
+    if not productos or not direccion_entrega or not metodo_pago:
+        raise CheckoutError(400, 'Campos requeridos: productos, direccion_entrega, metodo_pago')
+
+    if not isinstance(productos, list) or len(productos) == 0:
+        raise CheckoutError(400, 'Debe incluir al menos un producto en la compra')
+
+    for item in productos:
+        if not item.get('codigo') or item.get('cantidad', 1) <= 0:
+            raise CheckoutError(400, 'Código de producto y cantidad válida requeridos')
+
+    return productos, direccion_entrega, metodo_pago
+
+def calcular_cantidades(productos: List[Dict[str, Any]]) -> Dict[str, int]:
+    """Cantidad total por producto (la transacción no admite el mismo item dos veces)"""
+    cantidades = {}
+    for item in productos:
+        cantidades[item['codigo']] = cantidades.get(item['codigo'], 0) + item.get('cantidad', 1)
+
+    if len(cantidades) + 1 > MAX_TRANSACT_ITEMS:
+        raise CheckoutError(400, f'Máximo {MAX_TRANSACT_ITEMS - 1} productos distintos por compra')
+
+    return cantidades
+
+def validar_productos(productos: List[Dict[str, Any]],
+                      catalogo: Dict[str, Optional[Dict[str, Any]]]) -> Tuple[List[Dict[str, Any]], Decimal]:
+    """Valida productos contra el snapshot de catálogo y calcula el total"""
+    total_compra = Decimal('0')
+    productos_validados = []
+
+    for item in productos:
+        codigo_producto = item.get('codigo')
+        cantidad = item.get('cantidad', 1)
+
+        producto = catalogo.get(codigo_producto)
+        if producto is None:
+            raise CheckoutError(404, f'Producto {codigo_producto} no encontrado')
+
+        # Calcular subtotal
+        precio_unitario = Decimal(str(producto['precio']))
+        subtotal = precio_unitario * Decimal(str(cantidad))
+        total_compra += subtotal
+
+        productos_validados.append({
+            'codigo': codigo_producto,
+            'nombre': producto['nombre'],
+            'precio_unitario': precio_unitario,
+            'cantidad': cantidad,
+            'subtotal': subtotal
+        })
+
+    return productos_validados, total_compra
+
+def shards_por_producto(catalogo: Dict[str, Optional[Dict[str, Any]]], cantidades: Dict[str, int]) -> Dict[str, int]:
+    """Productos con inventario sharded según el snapshot de catálogo"""
+    return {
+        codigo: int(catalogo[codigo].get('stock_shards', 0))
+        for codigo in cantidades
+        if catalogo.get(codigo) and int(catalogo[codigo].get('stock_shards', 0)) > 0
+    }
+
+def construir_compra(tenant_id: str, user_id: str, productos_validados: List[Dict[str, Any]], total: Decimal,
+                     direccion_entrega: str, metodo_pago: str, estado: str = 'COMPLETADA') -> Dict[str, Any]:
+    """Arma el item COMPRA# listo para guardar"""
+    now = datetime.utcnow()
+    compra_id = uuid7(now)
+    timestamp = now.isoformat()
+
+    return {
+        'tenant_id': tenant_id,
+        'SK': f'COMPRA#{compra_id}',
+        'compra_id': compra_id,
+        'user_id': user_id,
+        'fecha_compra': timestamp,
+        'productos': productos_validados,
+        'cantidad_productos': len(productos_validados),
+        'total': total,
+        'direccion_entrega': direccion_entrega,
+        'metodo_pago': metodo_pago,
+        'estado': estado,
+        'created_at': timestamp,
+        'updated_at': timestamp
+    }
+
+def formatear_compra_creada(compra_item: Dict[str, Any]) -> Dict[str, Any]:
+    """Datos de respuesta de una compra recién creada"""
+    return {
+        'compra_id': compra_item['compra_id'],
+        'total': float(compra_item['total']),
+        'productos': [
+            {
+                **prod,
+                'precio_unitario': float(prod['precio_unitario']),
+                'subtotal': float(prod['subtotal'])
+            } for prod in compra_item['productos']
+        ],
+        'estado': compra_item['estado'],
+        'created_at': compra_item['created_at']
+    }
@@ -1,25 +1,189 @@
-import boto3
+import json
 import os
+import random
+import zlib
+from decimal import Decimal
 from typing import Dict, List, Any, Optional
 from boto3.dynamodb.conditions import Key, Attr
-import uuid
-from datetime import datetime
+from botocore.exceptions import ClientError
+from datetime import datetime, timezone
 
-# Configuración de DynamoDB
-dynamodb = boto3.resource('dynamodb')
+from cache import get_cache_backend
+from productos import PRODUCTOS_TABLE, producto_key, stock_shard_key, shards_actuales, invalidar_catalogo
+from ids import uuid7, uuid7_min, uuid7_max
+from resilience import PlazoAgotado, ServicioNoDisponible, con_reintentos, dynamodb_con_plazo, s3_con_plazo
+from hedging import lectura_cubierta
+
+# Configuración de DynamoDB (el resource se elige según el plazo restante de la invocación)
 COMPRAS_TABLE = os.environ.get('COMPRAS_TABLE', 'p_compras-dev')
 
+# Configuración de S3 (desborde de carritos muy grandes)
+COMPRAS_BUCKET = os.environ.get('COMPRAS_BUCKET', 'compras-data-dev')
+
+# Codec de productos: por encima del umbral (bytes del JSON empaquetado) se guardan
+# comprimidos en 'productos_z'; si aun así superan el límite de desborde van a S3
+PRODUCTOS_CODEC = 'zlib-v1'
+PRODUCTOS_COMPRESS_THRESHOLD = int(os.environ.get('PRODUCTOS_COMPRESS_THRESHOLD', '2048'))
+PRODUCTOS_S3_THRESHOLD = int(os.environ.get('PRODUCTOS_S3_THRESHOLD', str(256 * 1024)))
+PRODUCTO_CAMPOS = ('codigo', 'nombre', 'precio_unitario', 'cantidad', 'subtotal')
+
+# Cache de compras individuales, clave compra:<tenant_id>:<compra_id>.
+# Con el backend en memoria (sin CACHE_URL) una compra modificada en otro contenedor
+# puede verse hasta COMPRAS_CACHE_TTL segundos desactualizada; solo el tier compartido
+# recibe las invalidaciones del stream
+COMPRAS_CACHE_TTL = int(os.environ.get('COMPRAS_CACHE_TTL', '30'))
+COMPRAS_CACHE_SIZE = int(os.environ.get('COMPRAS_CACHE_SIZE', '1024'))
+COMPRAS_CONSISTENT_READ = os.environ.get('COMPRAS_CONSISTENT_READ', 'false').lower() == 'true'
+compras_cache = get_cache_backend(ttl=COMPRAS_CACHE_TTL, max_size=COMPRAS_CACHE_SIZE)
+
+# Atributos de cabecera que se devuelven en el modo resumen (sin 'productos')
+COMPRA_SUMMARY_FIELDS = [
+    'compra_id', 'total', 'estado', 'metodo_pago', 'direccion_entrega',
+    'fecha_compra', 'created_at', 'cantidad_productos'
+]
+# GSI con solo esos atributos (INCLUDE): una query se cobra por el tamaño del item en el
+# índice, así que el resumen lee ahí en lugar de UserComprasIndex (ALL, con productos)
+COMPRAS_RESUMEN_INDEX = 'UserComprasResumenIndex'
+
+def indice_compras_usuario(summary: bool) -> str:
+    """GSI para listar compras de un usuario según el modo"""
+    return COMPRAS_RESUMEN_INDEX if summary else 'UserComprasIndex'
+
+# UserComprasIndex solo debería contener compras; el filtro descarta otros items con user_id
+# (registros de idempotencia y reservas escritos antes de owner_user_id)
+SOLO_COMPRAS = Attr('SK').begins_with('COMPRA#')
+
 def get_compras_table():
     """Obtiene la tabla de compras"""
-    return dynamodb.Table(COMPRAS_TABLE)
+    return dynamodb_con_plazo().Table(COMPRAS_TABLE)
+
+def get_item_cubierto(table_name: str, key: Dict[str, Any], consistent_read: bool = False,
+                      **kwargs) -> Dict[str, Any]:
+    """
+    GetItem con reintentos y, si DDB_HEDGE está activo, cubierto con un duplicado cuando
+    tarda más que el p95 reciente. Las lecturas fuertes nunca se duplican.
+    """
+    table = dynamodb_con_plazo().Table(table_name)
+    if consistent_read:
+        return con_reintentos(table_name, table.get_item, Key=key, ConsistentRead=True, **kwargs)
+    return lectura_cubierta(f'{table_name}:get_item', con_reintentos, table_name, table.get_item,
+                            Key=key, ConsistentRead=False, **kwargs)
+
+# TransactWriteItems admite hasta 100 acciones (1 Put de la compra + updates de stock)
+MAX_TRANSACT_ITEMS = 100
+
+class StockInsuficienteError(Exception):
+    """La escritura condicional de stock falló para un producto"""
+    def __init__(self, codigo: str):
+        super().__init__(f'Stock insuficiente para producto {codigo}')
+        self.codigo = codigo
+
+def build_projection(fields: List[str]) -> Dict[str, Any]:
+    """Construye ProjectionExpression con alias para evitar palabras reservadas"""
+    names = {f"#f{i}": field for i, field in enumerate(fields)}
+    return {
+        'ProjectionExpression': ', '.join(names.keys()),
+        'ExpressionAttributeNames': names
+    }
+
+def _empaquetar_productos(productos: List[Dict[str, Any]]) -> bytes:
+    """Serializa los productos como filas posicionales (sin repetir nombres de campo)"""
+    rows = [[str(p.get(campo)) if isinstance(p.get(campo), Decimal) else p.get(campo)
+             for campo in PRODUCTO_CAMPOS] for p in productos]
+    return json.dumps(rows, ensure_ascii=False, separators=(',', ':'), default=str).encode('utf-8')
+
+def _desempaquetar_productos(raw: bytes) -> List[Dict[str, Any]]:
+    rows = json.loads(zlib.decompress(raw).decode('utf-8'))
+    productos = []
+    for row in rows:
+        producto = dict(zip(PRODUCTO_CAMPOS, row))
+        for campo in ('precio_unitario', 'subtotal'):
+            if producto.get(campo) is not None:
+                producto[campo] = Decimal(str(producto[campo]))
+        if producto.get('cantidad') is not None:
+            producto['cantidad'] = Decimal(str(producto['cantidad']))
+        productos.append(producto)
+    return productos
+
+def codificar_productos(compra_item: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Retorna una copia del item lista para guardar. Carritos pequeños quedan igual;
+    los grandes se guardan comprimidos y los enormes se desbordan a S3.
+    """
+    packed = _empaquetar_productos(compra_item.get('productos', []))
+    if len(packed) < PRODUCTOS_COMPRESS_THRESHOLD:
+        return compra_item
+    
+    item = {k: v for k, v in compra_item.items() if k != 'productos'}
+    item['productos_codec'] = PRODUCTOS_CODEC
+    compressed = zlib.compress(packed, 6)
+    if len(compressed) >= PRODUCTOS_S3_THRESHOLD:
+        s3_key = f"productos/{item['tenant_id']}/{item['compra_id']}.zlib"
+        s3_con_plazo().put_object(Bucket=COMPRAS_BUCKET, Key=s3_key, Body=compressed,
+                                  ContentType='application/octet-stream')
+        item['productos_s3_key'] = s3_key
+    else:
+        item['productos_z'] = compressed
+    return item
+
+def descartar_desborde(item: Dict[str, Any]) -> None:
+    """
+    Borra el objeto S3 de productos de una compra cuya escritura falló (mejor esfuerzo).
+    Solo si la compra no existe: un reintento tras un commit ambiguo falla por la condición
+    attribute_not_exists(SK) aunque la compra sí quedó guardada.
+    """
+    s3_key = item.get('productos_s3_key')
+    if not s3_key:
+        return
+    try:
+        existe = get_compras_table().get_item(Key={'tenant_id': item['tenant_id'], 'SK': item['SK']},
+                                              ProjectionExpression='SK', ConsistentRead=True)
+        if 'Item' not in existe:
+            s3_con_plazo().delete_object(Bucket=COMPRAS_BUCKET, Key=s3_key)
+    except Exception as e:
+        print(f"No se pudo descartar el desborde {s3_key}: {e}")
+
+def guardar_compra_codificada(compra_item: Dict[str, Any], escribir) -> Any:
+    """
+    Codifica la compra y llama a escribir(item_codificado). El desborde a S3 se sube antes
+    (la compra nunca queda apuntando a un objeto inexistente) y se borra si la escritura falla
+    de forma definitiva; con un plazo agotado el resultado es incierto y el objeto se conserva.
+    """
+    item = codificar_productos(compra_item)
+    try:
+        return escribir(item)
+    except (ServicioNoDisponible, PlazoAgotado):
+        raise
+    except Exception:
+        descartar_desborde(item)
+        raise
+
+def decodificar_productos(item: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Restaura 'productos' en un item leído de DynamoDB (o de un stream ya convertido)"""
+    if not item or item.get('productos_codec') != PRODUCTOS_CODEC:
+        return item
+    
+    if item.get('productos_s3_key'):
+        response = s3_con_plazo().get_object(Bucket=COMPRAS_BUCKET, Key=item['productos_s3_key'])
+        raw = response['Body'].read()
+    elif item.get('productos_z') is not None:
+        raw = item['productos_z']
+        raw = raw.value if hasattr(raw, 'value') else raw  # boto3 Binary
+    else:
+        return item  # Proyección sin productos (modo resumen)
+    
+    decoded = {k: v for k, v in item.items() if k not in ('productos_codec', 'productos_z', 'productos_s3_key')}
+    decoded['productos'] = _desempaquetar_productos(bytes(raw))
+    return decoded
 
 def crear_compra_record(tenant_id: str, user_id: str, compra_data: Dict[str, Any]) -> Dict[str, Any]:
     """Crea un registro de compra en DynamoDB"""
     table = get_compras_table()
     
-    # Generar ID único para la compra
-    compra_id = str(uuid.uuid4())
-    timestamp = datetime.utcnow().isoformat()
+    # Generar ID único y ordenado por tiempo para la compra
+    now = datetime.utcnow()
+    compra_id = uuid7(now)
+    timestamp = now.isoformat()
     
     item = {
         'tenant_id': tenant_id,
@@ -28,6 +192,7 @@ def crear_compra_record(tenant_id: str, user_id: str, compra_data: Dict[str, Any
         'user_id': user_id,
         'fecha_compra': timestamp,
         'productos': compra_data['productos'],  # Lista de productos con cantidades
+        'cantidad_productos': len(compra_data['productos']),
         'total': compra_data['total'],
         'estado': compra_data.get('estado', 'COMPLETADA'),
         'metodo_pago': compra_data.get('metodo_pago', 'TARJETA'),
@@ -36,21 +201,158 @@ def crear_compra_record(tenant_id: str, user_id: str, compra_data: Dict[str, Any
         'updated_at': timestamp
     }
     
-    table.put_item(Item=item)
+    guardar_compra_codificada(item, lambda codificado: con_reintentos(COMPRAS_TABLE, table.put_item, Item=codificado))
     return item
 
-def listar_compras_usuario(tenant_id: str, user_id: str, limit: int = 20, last_key: Optional[str] = None) -> Dict[str, Any]:
+def _update_stock(tenant_id: str, codigo: str, cantidad: int, timestamp: str, shard: Optional[int]) -> Dict[str, Any]:
+    """Acción de la transacción que descuenta stock del producto o de uno de sus shards"""
+    if shard is None:
+        return {
+            'Update': {
+                'TableName': PRODUCTOS_TABLE,
+                'Key': producto_key(tenant_id, codigo),
+                'UpdateExpression': 'SET stock = stock - :cantidad, updated_at = :timestamp',
+                'ConditionExpression': 'attribute_exists(SK) AND stock >= :cantidad',
+                'ExpressionAttributeValues': {
+                    ':cantidad': cantidad,
+                    ':timestamp': timestamp
+                }
+            }
+        }
+    return {
+        'Update': {
+            'TableName': PRODUCTOS_TABLE,
+            'Key': stock_shard_key(tenant_id, codigo, shard),
+            'UpdateExpression': 'SET stock = stock - :cantidad',
+            'ConditionExpression': 'attribute_exists(SK) AND stock >= :cantidad',
+            'ExpressionAttributeValues': {':cantidad': cantidad}
+        }
+    }
+
+def transaccion_con_stock(acciones, tenant_id: str, cantidades: Dict[str, int],
+                          timestamp: str, shards: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Ejecuta las acciones dadas (lista, o función que recibe {codigo: shard elegido}
+    y retorna la lista) junto con el descuento condicional de stock
+    (stock >= cantidad) en una sola transacción. Para productos sharded
+    (shards[codigo] = N) se descuenta de un shard al azar y, si no alcanza,
+    se reintenta con los demás shards. Si un producto tratado como no sharded
+    falla, se relee stock_shards: el snapshot de catálogo pudo ser anterior al
+    cambio de modo (su stock quedó en 0 y las unidades están en los shards).
+    Retorna {codigo: shard usado} para los productos sharded.
+    Lanza StockInsuficienteError si algún producto no tiene stock suficiente.
+    """
+    codigos = list(cantidades.keys())
+    shards = shards or {}
+    
+    # Orden aleatorio de shards por producto para repartir la contención
+    candidatos = {}
+    for codigo in codigos:
+        if shards.get(codigo, 0) > 0:
+            orden = list(range(shards[codigo]))
+            random.shuffle(orden)
+            candidatos[codigo] = orden
+    
+    while True:
+        elegidos = {codigo: orden[0] for codigo, orden in candidatos.items()}
+        previas = acciones(elegidos) if callable(acciones) else list(acciones)
+        transact_items = previas + [
+            _update_stock(tenant_id, codigo, cantidades[codigo], timestamp, elegidos.get(codigo))
+            for codigo in codigos
+        ]
+        try:
+            # El cliente del resource serializa tipos Python nativos
+            con_reintentos('transacciones', dynamodb_con_plazo().meta.client.transact_write_items, TransactItems=transact_items)
+            return elegidos
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            fallidos = [codigo for codigo, reason in zip(codigos, reasons[len(previas):])
+                        if reason.get('Code') == 'ConditionalCheckFailed']
+            if not fallidos:
+                raise
+            # Un shard agotado no implica falta de stock: pasar al siguiente shard
+            for codigo in fallidos:
+                if codigo not in candidatos:
+                    n = shards_actuales(tenant_id, codigo)
+                    if n == 0:
+                        raise StockInsuficienteError(codigo)
+                    invalidar_catalogo(tenant_id, codigo)
+                    candidatos[codigo] = random.sample(range(n), n)
+                elif len(candidatos[codigo]) == 1:
+                    raise StockInsuficienteError(codigo)
+                else:
+                    candidatos[codigo].pop(0)
+
+def devolver_stock(tenant_id: str, cantidades: Dict[str, int], shards_usados: Dict[str, int],
+                   timestamp: str) -> List[Dict[str, Any]]:
+    """
+    Acciones de transacción que reponen stock (al producto o al shard del que se descontó).
+    Un shard borrado junto con su producto no se recrea: su acción falla la condición
+    """
+    acciones = []
+    for codigo, cantidad in cantidades.items():
+        shard = shards_usados.get(codigo)
+        if shard is None:
+            acciones.append({
+                'Update': {
+                    'TableName': PRODUCTOS_TABLE,
+                    'Key': producto_key(tenant_id, codigo),
+                    'UpdateExpression': 'SET stock = stock + :cantidad, updated_at = :timestamp',
+                    'ExpressionAttributeValues': {':cantidad': cantidad, ':timestamp': timestamp}
+                }
+            })
+        else:
+            acciones.append({
+                'Update': {
+                    'TableName': PRODUCTOS_TABLE,
+                    'Key': stock_shard_key(tenant_id, codigo, shard),
+                    'UpdateExpression': 'SET stock = stock + :cantidad',
+                    'ConditionExpression': 'attribute_exists(SK)',
+                    'ExpressionAttributeValues': {':cantidad': cantidad}
+                }
+            })
+    return acciones
+
+def registrar_compra_transaccional(compra_item: Dict[str, Any], cantidades: Dict[str, int],
+                                   shards: Optional[Dict[str, int]] = None) -> Dict[str, int]:
+    """
+    Guarda la compra y descuenta el stock en una sola transacción.
+    El stock solo se valida aquí, con la condición stock >= cantidad.
+    Lanza StockInsuficienteError si algún producto no tiene stock suficiente.
+    """
+    def escribir(item: Dict[str, Any]) -> Dict[str, int]:
+        compra_put = {
+            'Put': {
+                'TableName': COMPRAS_TABLE,
+                'Item': item,
+                'ConditionExpression': 'attribute_not_exists(SK)'
+            }
+        }
+        return transaccion_con_stock([compra_put], compra_item['tenant_id'], cantidades,
+                                     compra_item['created_at'], shards)
+
+    return guardar_compra_codificada(compra_item, escribir)
+
+def listar_compras_usuario(tenant_id: str, user_id: str, limit: int = 20, last_key: Optional[str] = None,
+                           summary: bool = False) -> Dict[str, Any]:
     """Lista las compras de un usuario específico usando el GSI"""
     table = get_compras_table()
     
     try:
         query_params = {
-            'IndexName': 'UserComprasIndex',
+            'IndexName': indice_compras_usuario(summary),
             'KeyConditionExpression': Key('tenant_id').eq(tenant_id) & Key('user_id').eq(user_id),
+            'FilterExpression': SOLO_COMPRAS,
             'ScanIndexForward': False,  # Ordenar por fecha descendente
             'Limit': limit
         }
         
+        # En modo resumen solo se leen los atributos de cabecera
+        if summary:
+            query_params.update(build_projection(COMPRA_SUMMARY_FIELDS))
+        
         # Agregar paginación si existe
         if last_key:
             try:
@@ -60,13 +362,15 @@ def listar_compras_usuario(tenant_id: str, user_id: str, limit: int = 20, last_k
             except:
                 pass  # Ignorar si no se puede decodificar
         
-        response = table.query(**query_params)
+        response = con_reintentos(COMPRAS_TABLE, table.query, **query_params)
         
         return {
-            'Items': response.get('Items', []),
+            'Items': [decodificar_productos(item) for item in response.get('Items', [])],
             'LastEvaluatedKey': response.get('LastEvaluatedKey'),
             'Count': response.get('Count', 0)
         }
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
         print(f"Error listando compras: {e}")
         return {'Items': [], 'Count': 0}
@@ -91,52 +395,148 @@ def listar_compras_tenant(tenant_id: str, limit: int = 50, last_key: Optional[st
             except:
                 pass
         
-        response = table.query(**query_params)
+        response = con_reintentos(COMPRAS_TABLE, table.query, **query_params)
         
         return {
-            'Items': response.get('Items', []),
+            'Items': [decodificar_productos(item) for item in response.get('Items', [])],
             'LastEvaluatedKey': response.get('LastEvaluatedKey'),
             'Count': response.get('Count', 0)
         }
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
         print(f"Error listando compras del tenant: {e}")
         return {'Items': [], 'Count': 0}
 
-def obtener_compra(tenant_id: str, compra_id: str) -> Optional[Dict[str, Any]]:
-    """Obtiene una compra específica"""
+def _fecha_utc(dt: datetime) -> str:
+    """ISO 8601 en UTC sin offset, el formato con que se guarda fecha_compra (datetime.utcnow())"""
+    if dt.tzinfo is not None:
+        dt = dt.astimezone(timezone.utc).replace(tzinfo=None)
+    return dt.isoformat()
+
+def rango_compras_por_fecha(tenant_id: str, desde: datetime, hasta: datetime):
+    """
+    Traduce un rango de fechas a una condición SK BETWEEN sobre la tabla base.
+    Solo cubre compras con compra_id UUIDv7; las antiguas (uuid4) siguen en FechaComprasIndex.
+    """
+    return Key('tenant_id').eq(tenant_id) & Key('SK').between(
+        f"COMPRA#{uuid7_min(desde)}",
+        f"COMPRA#{uuid7_max(hasta)}"
+    )
+
+def listar_compras_por_fecha(tenant_id: str, desde: datetime, hasta: datetime, limit: int = 50,
+                             last_key: Optional[str] = None, descendente: bool = True) -> Dict[str, Any]:
+    """Lista las compras de un tenant en un rango de fechas sin pasar por el GSI"""
     table = get_compras_table()
     
     try:
-        response = table.get_item(
-            Key={
+        query_params = {
+            'KeyConditionExpression': rango_compras_por_fecha(tenant_id, desde, hasta),
+            # Descarta uuid4 antiguos cuyo prefijo cae por azar dentro del rango
+            'FilterExpression': Attr('fecha_compra').between(_fecha_utc(desde), _fecha_utc(hasta)),
+            'ScanIndexForward': not descendente,
+            'Limit': limit
+        }
+        
+        if last_key:
+            try:
+                import json
+                decoded_key = json.loads(last_key)
+                query_params['ExclusiveStartKey'] = decoded_key
+            except:
+                pass
+        
+        response = con_reintentos(COMPRAS_TABLE, table.query, **query_params)
+        
+        return {
+            'Items': [decodificar_productos(item) for item in response.get('Items', [])],
+            'LastEvaluatedKey': response.get('LastEvaluatedKey'),
+            'Count': response.get('Count', 0)
+        }
+    except ServicioNoDisponible:
+        raise
+    except Exception as e:
+        print(f"Error listando compras por fecha: {e}")
+        return {'Items': [], 'Count': 0}
+
+def obtener_compra(tenant_id: str, compra_id: str, consistent_read: Optional[bool] = None,
+                   use_cache: bool = True) -> Optional[Dict[str, Any]]:
+    """Obtiene una compra específica (read-through sobre el cache configurado)"""
+    cache_key = f"compra:{tenant_id}:{compra_id}"
+    if use_cache:
+        cached = compras_cache.get(cache_key)
+        if cached is not None:
+            return cached
+    
+    if consistent_read is None:
+        consistent_read = COMPRAS_CONSISTENT_READ
+    
+    try:
+        response = get_item_cubierto(
+            COMPRAS_TABLE,
+            {
                 'tenant_id': tenant_id,
                 'SK': f"COMPRA#{compra_id}"
-            }
+            },
+            consistent_read=consistent_read
         )
-        return response.get('Item')
+        item = decodificar_productos(response.get('Item'))
+        if item:
+            compras_cache.set(cache_key, item, version=item.get('updated_at'))
+        return item
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
         print(f"Error obteniendo compra: {e}")
         return None
 
-def actualizar_estado_compra(tenant_id: str, compra_id: str, nuevo_estado: str) -> bool:
-    """Actualiza el estado de una compra"""
+def invalidar_compra_cache(tenant_id: str, compra_id: str, updated_at: Optional[str] = None) -> bool:
+    """Invalida la compra cacheada; con updated_at solo si la copia cacheada es más antigua"""
+    cache_key = f"compra:{tenant_id}:{compra_id}"
+    if updated_at is None:
+        compras_cache.delete(cache_key)
+        return True
+    return compras_cache.invalidate_if_stale(cache_key, updated_at)
+
+def cache_compartido() -> bool:
+    """True si invalidar desde otro contenedor (p.ej. el stream) tiene efecto en la API"""
+    return compras_cache.compartido
+
+def accion_estado_compra(tenant_id: str, compra_id: str, nuevo_estado: str, timestamp: str,
+                         estado_actual: Optional[str] = None) -> Dict[str, Any]:
+    """Acción Update del estado de una compra; con estado_actual la transición es condicional"""
+    update = {
+        'TableName': COMPRAS_TABLE,
+        'Key': {
+            'tenant_id': tenant_id,
+            'SK': f"COMPRA#{compra_id}"
+        },
+        'UpdateExpression': 'SET estado = :estado, updated_at = :timestamp',
+        'ExpressionAttributeValues': {
+            ':estado': nuevo_estado,
+            ':timestamp': timestamp
+        }
+    }
+    if estado_actual is not None:
+        update['ConditionExpression'] = 'estado = :estado_actual'
+        update['ExpressionAttributeValues'][':estado_actual'] = estado_actual
+    return {'Update': update}
+
+def actualizar_estado_compra(tenant_id: str, compra_id: str, nuevo_estado: str,
+                             estado_actual: Optional[str] = None) -> bool:
+    """Actualiza el estado de una compra (solo si está en estado_actual, cuando se indica)"""
     table = get_compras_table()
     
     try:
         timestamp = datetime.utcnow().isoformat()
+        update = accion_estado_compra(tenant_id, compra_id, nuevo_estado, timestamp, estado_actual)['Update']
+        update.pop('TableName')
         
-        table.update_item(
-            Key={
-                'tenant_id': tenant_id,
-                'SK': f"COMPRA#{compra_id}"
-            },
-            UpdateExpression='SET estado = :estado, updated_at = :timestamp',
-            ExpressionAttributeValues={
-                ':estado': nuevo_estado,
-                ':timestamp': timestamp
-            }
-        )
+        con_reintentos(COMPRAS_TABLE, table.update_item, **update)
+        invalidar_compra_cache(tenant_id, compra_id, timestamp)
         return True
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
         print(f"Error actualizando estado de compra: {e}")
         return False
@@ -148,14 +548,17 @@ def get_compras_stats(tenant_id: str, user_id: Optional[str] = None) -> Dict[str
     try:
         if user_id:
             # Estadísticas de un usuario específico
-            response = table.query(
+            response = con_reintentos(
+                COMPRAS_TABLE, table.query,
                 IndexName='UserComprasIndex',
                 KeyConditionExpression=Key('tenant_id').eq(tenant_id) & Key('user_id').eq(user_id),
+                FilterExpression=SOLO_COMPRAS,
                 Select='ALL_ATTRIBUTES'
             )
         else:
             # Estadísticas del tenant completo
-            response = table.query(
+            response = con_reintentos(
+                COMPRAS_TABLE, table.query,
                 KeyConditionExpression=Key('tenant_id').eq(tenant_id),
                 FilterExpression=Attr('SK').begins_with('COMPRA#'),
                 Select='ALL_ATTRIBUTES'
@@ -187,6 +590,8 @@ def get_compras_stats(tenant_id: str, user_id: Optional[str] = None) -> Dict[str
             'user_id': user_id
         }
         
+    except ServicioNoDisponible:
+        raise
     except Exception as e:
         print(f"Error obteniendo estadísticas: {e}")
         return {
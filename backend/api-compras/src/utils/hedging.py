@@ -0,0 +1,125 @@
+import os
+import threading
+import time
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ThreadPoolExecutor, TimeoutError, wait
+from typing import Any, Callable, Dict, Optional
+
+# Lecturas cubiertas (hedged): si la lectura no responde dentro del p95 reciente se lanza
+# un duplicado y se usa la primera respuesta. Solo para lecturas eventualmente consistentes.
+HEDGE_ENABLED = os.environ.get('DDB_HEDGE', 'false').lower() == 'true'
+# Porcentaje máximo de lecturas que pueden generar un duplicado
+HEDGE_MAX_PCT = float(os.environ.get('DDB_HEDGE_MAX_PCT', '5'))
+HEDGE_PERCENTIL = float(os.environ.get('DDB_HEDGE_PERCENTIL', '95'))
+# Retardo mientras no hay muestras suficientes, y mínimo para no duplicar lecturas normales
+HEDGE_DELAY_INICIAL_MS = float(os.environ.get('DDB_HEDGE_DELAY_MS', '50'))
+HEDGE_DELAY_MIN_MS = 5.0
+HEDGE_MIN_MUESTRAS = 50
+HEDGE_VENTANA = 512
+HEDGE_WORKERS = int(os.environ.get('DDB_HEDGE_WORKERS', '16'))
+# Crédito acumulable: permite ráfagas cortas de duplicados sin superar el porcentaje en promedio
+HEDGE_CREDITO_MAX = 10.0
+
+_executor = ThreadPoolExecutor(max_workers=HEDGE_WORKERS)
+
+
+class LatenciaRodante:
+    """Ventana de las últimas latencias (ms) con percentil recalculado cada pocas muestras"""
+
+    def __init__(self, ventana: int = HEDGE_VENTANA, recalcular_cada: int = 32):
+        self._muestras = deque(maxlen=ventana)
+        self._recalcular_cada = recalcular_cada
+        self._pendientes = 0
+        self._percentiles: Dict[float, float] = {}
+        self._lock = threading.Lock()
+
+    def registrar(self, ms: float) -> None:
+        with self._lock:
+            self._muestras.append(ms)
+            self._pendientes += 1
+            if self._pendientes >= self._recalcular_cada:
+                self._percentiles = {}
+                self._pendientes = 0
+
+    def percentil(self, p: float) -> Optional[float]:
+        with self._lock:
+            if len(self._muestras) < HEDGE_MIN_MUESTRAS:
+                return None
+            if p not in self._percentiles:
+                ordenadas = sorted(self._muestras)
+                self._percentiles[p] = ordenadas[min(len(ordenadas) - 1, int(len(ordenadas) * p / 100))]
+            return self._percentiles[p]
+
+
+class Hedger:
+    """Cobertura por operación: retardo según el percentil reciente y tope de duplicados"""
+
+    def __init__(self, max_pct: float = HEDGE_MAX_PCT, percentil: float = HEDGE_PERCENTIL):
+        self.max_pct = max_pct
+        self.percentil = percentil
+        self.latencias = LatenciaRodante()
+        self._credito = 1.0
+        self._lock = threading.Lock()
+
+    def delay_ms(self) -> float:
+        valor = self.latencias.percentil(self.percentil)
+        return max(HEDGE_DELAY_MIN_MS, valor if valor is not None else HEDGE_DELAY_INICIAL_MS)
+
+    def _acumular_credito(self) -> None:
+        with self._lock:
+            self._credito = min(HEDGE_CREDITO_MAX, self._credito + self.max_pct / 100)
+
+    def _consumir_credito(self) -> bool:
+        with self._lock:
+            if self._credito < 1:
+                return False
+            self._credito -= 1
+            return True
+
+    def _lanzar(self, fn: Callable, args, kwargs):
+        inicio = time.monotonic()
+        futuro = _executor.submit(fn, *args, **kwargs)
+        futuro.add_done_callback(lambda f: self.latencias.registrar((time.monotonic() - inicio) * 1000))
+        return futuro
+
+    def ejecutar(self, fn: Callable, *args, **kwargs) -> Any:
+        self._acumular_credito()
+        primario = self._lanzar(fn, args, kwargs)
+        try:
+            return primario.result(timeout=self.delay_ms() / 1000)
+        except TimeoutError:
+            pass
+
+        if not self._consumir_credito():
+            return primario.result()
+
+        secundario = self._lanzar(fn, args, kwargs)
+        hechos, pendientes = wait([primario, secundario], return_when=FIRST_COMPLETED)
+        for futuro in hechos:
+            if futuro.exception() is None:
+                return futuro.result()
+        # La primera en terminar falló: se espera a la otra y, si también falla, se propaga
+        for futuro in pendientes:
+            if futuro.exception() is None:
+                return futuro.result()
+        return primario.result()
+
+
+_hedgers: Dict[str, Hedger] = {}
+_hedgers_lock = threading.Lock()
+
+def hedger(operacion: str) -> Hedger:
+    with _hedgers_lock:
+        if operacion not in _hedgers:
+            _hedgers[operacion] = Hedger()
+        return _hedgers[operacion]
+
+
+def lectura_cubierta(operacion: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una lectura idempotente con cobertura si DDB_HEDGE está activo;
+    si no, la ejecuta directamente en el hilo actual.
+    """
+    if not HEDGE_ENABLED:
+        return fn(*args, **kwargs)
+    return hedger(operacion).ejecutar(fn, *args, **kwargs)
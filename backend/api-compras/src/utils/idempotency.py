@@ -0,0 +1,150 @@
+import hashlib
+import json
+import os
+import time
+from functools import wraps
+from typing import Dict, Any, Optional
+
+from botocore.exceptions import ClientError
+
+from auth import create_response, get_tenant_id
+from dynamodb import get_compras_table, COMPRAS_TABLE
+from resilience import con_reintentos
+
+# Registros de deduplicación en la tabla de compras: SK = IDEMPOTENCY#<key>, expiran por TTL
+IDEMPOTENCY_TTL = int(os.environ.get('IDEMPOTENCY_TTL', str(24 * 3600)))
+# Un registro EN_PROCESO huérfano (p.ej. timeout de la Lambda) se puede reclamar tras este plazo
+IDEMPOTENCY_LEASE = int(os.environ.get('IDEMPOTENCY_LEASE', '60'))
+IDEMPOTENCY_HEADER = 'idempotency-key'
+MAX_KEY_LENGTH = 255
+
+def get_idempotency_key(event: Dict[str, Any]) -> Optional[str]:
+    """Obtiene el header Idempotency-Key (sin distinguir mayúsculas)"""
+    for name, value in (event.get('headers') or {}).items():
+        if name.lower() == IDEMPOTENCY_HEADER and value:
+            return value.strip()
+    return None
+
+def _request_hash(event: Dict[str, Any]) -> str:
+    body = event.get('body') or ''
+    if not isinstance(body, str):
+        body = json.dumps(body, sort_keys=True, default=str)
+    return hashlib.sha256(body.encode('utf-8')).hexdigest()
+
+def _key(tenant_id: str, idempotency_key: str) -> Dict[str, str]:
+    return {'tenant_id': tenant_id, 'SK': f'IDEMPOTENCY#{idempotency_key}'}
+
+def iniciar_solicitud(tenant_id: str, idempotency_key: str, request_hash: str, user_id: Optional[str]) -> Optional[Dict[str, Any]]:
+    """
+    Registra la solicitud con un put condicional.
+    Retorna None si es nueva, o el registro existente si la clave ya se usó.
+    """
+    table = get_compras_table()
+    now = int(time.time())
+    try:
+        con_reintentos(
+            COMPRAS_TABLE, table.put_item,
+            Item={
+                **_key(tenant_id, idempotency_key),
+                'estado': 'EN_PROCESO',
+                'request_hash': request_hash,
+                # No 'user_id': el registro entraría en UserComprasIndex y se listaría como compra
+                'owner_user_id': user_id,
+                'ttl': now + IDEMPOTENCY_LEASE
+            },
+            # Los registros expirados pueden seguir en la tabla hasta que DynamoDB los borre
+            ConditionExpression='attribute_not_exists(SK) OR #ttl < :now',
+            ExpressionAttributeNames={'#ttl': 'ttl'},
+            ExpressionAttributeValues={':now': now}
+        )
+        return None
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    response = con_reintentos(COMPRAS_TABLE, table.get_item, Key=_key(tenant_id, idempotency_key), ConsistentRead=True)
+    return response.get('Item') or {'estado': 'EN_PROCESO', 'request_hash': request_hash, 'owner_user_id': user_id}
+
+def completar_solicitud(tenant_id: str, idempotency_key: str, response: Dict[str, Any]) -> None:
+    """Guarda la respuesta final para reproducirla en los reintentos"""
+    con_reintentos(
+        COMPRAS_TABLE, get_compras_table().update_item,
+        Key=_key(tenant_id, idempotency_key),
+        UpdateExpression='SET estado = :estado, status_code = :status, response_body = :body, #ttl = :ttl',
+        ExpressionAttributeNames={'#ttl': 'ttl'},
+        ExpressionAttributeValues={
+            ':estado': 'COMPLETADA',
+            ':status': response['statusCode'],
+            ':body': response['body'],
+            ':ttl': int(time.time()) + IDEMPOTENCY_TTL
+        }
+    )
+
+def liberar_solicitud(tenant_id: str, idempotency_key: str) -> None:
+    """Elimina el registro para que un reintento pueda volver a ejecutarse"""
+    con_reintentos(COMPRAS_TABLE, get_compras_table().delete_item, Key=_key(tenant_id, idempotency_key))
+
+def marcar_efectos_confirmados(event: Dict[str, Any]) -> None:
+    """
+    El handler indica que ya confirmó escrituras: desde aquí un error no libera la clave
+    (un reintento las duplicaría) sino que se guarda como respuesta final
+    """
+    event['idempotency_confirmado'] = True
+
+def idempotent(handler):
+    """
+    Decorador para endpoints POST que honra el header Idempotency-Key.
+    Debe aplicarse debajo de require_auth (usa user_context).
+    Solo se guardan respuestas < 500; los errores del servidor se pueden reintentar,
+    salvo que el handler ya haya confirmado escrituras (marcar_efectos_confirmados).
+    """
+    @wraps(handler)
+    def wrapper(event, context):
+        idempotency_key = get_idempotency_key(event)
+        if not idempotency_key:
+            return handler(event, context)
+
+        if len(idempotency_key) > MAX_KEY_LENGTH:
+            return create_response(400, {'success': False, 'error': 'Idempotency-Key demasiado largo'})
+
+        tenant_id = get_tenant_id(event)
+        user_id = (event.get('user_context') or {}).get('user_id')
+        request_hash = _request_hash(event)
+
+        existente = iniciar_solicitud(tenant_id, idempotency_key, request_hash, user_id)
+        if existente is not None:
+            # Registros anteriores a owner_user_id guardaban el dueño en user_id
+            propietario = existente.get('owner_user_id', existente.get('user_id'))
+            if existente.get('request_hash') != request_hash or propietario != user_id:
+                return create_response(422, {
+                    'success': False,
+                    'error': 'Idempotency-Key ya utilizado con otra solicitud'
+                })
+            if existente.get('estado') != 'COMPLETADA':
+                return create_response(409, {
+                    'success': False,
+                    'error': 'Solicitud en proceso, reintente más tarde'
+                })
+            replay = create_response(int(existente['status_code']), {})
+            replay['body'] = existente['response_body']
+            replay['headers']['Idempotent-Replayed'] = 'true'
+            return replay
+
+        try:
+            response = handler(event, context)
+        except Exception:
+            if not event.get('idempotency_confirmado'):
+                liberar_solicitud(tenant_id, idempotency_key)
+                raise
+            print(f"Error tras confirmar escrituras con Idempotency-Key {idempotency_key}")
+            response = create_response(500, {
+                'success': False,
+                'error': 'Error interno tras registrar la solicitud; no reintente, consulte sus compras'
+            })
+
+        if response.get('statusCode', 500) >= 500 and not event.get('idempotency_confirmado'):
+            liberar_solicitud(tenant_id, idempotency_key)
+        else:
+            completar_solicitud(tenant_id, idempotency_key, response)
+        return response
+
+    return wrapper
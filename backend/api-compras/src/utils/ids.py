@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Optional
+
+# Generador de UUIDv7 (RFC 9562): 48 bits de timestamp en ms + contador + aleatorio.
+# En su forma de texto se ordenan lexicográficamente por tiempo, por lo que
+# SK = COMPRA#<uuid7> sirve también como rango temporal en la tabla base.
+
+_lock = threading.Lock()
+_last_ms = 0
+_counter = 0
+
+_COUNTER_BITS = 12
+_COUNTER_MAX = (1 << _COUNTER_BITS) - 1
+
+
+def _to_ms(dt: datetime) -> int:
+    """Convierte un datetime (naive = UTC, como datetime.utcnow()) a epoch en ms"""
+    if dt.tzinfo is None:
+        dt = dt.replace(tzinfo=timezone.utc)
+    return int(dt.timestamp() * 1000)
+
+
+def _format(ms: int, rand_a: int, rand_b: int) -> str:
+    value = (ms & ((1 << 48) - 1)) << 80
+    value |= 0x7 << 76                 # versión 7
+    value |= (rand_a & 0xFFF) << 64
+    value |= 0b10 << 62                # variante RFC
+    value |= rand_b & ((1 << 62) - 1)
+    h = f"{value:032x}"
+    return f"{h[:8]}-{h[8:12]}-{h[12:16]}-{h[16:20]}-{h[20:]}"
+
+
+def uuid7(dt: Optional[datetime] = None) -> str:
+    """
+    Genera un UUIDv7 monótono dentro del proceso: si dos IDs caen en el mismo
+    milisegundo, el contador de 12 bits garantiza que el segundo sea mayor.
+    """
+    global _last_ms, _counter
+    ms = _to_ms(dt) if dt is not None else time.time_ns() // 1_000_000
+    rand_b = int.from_bytes(os.urandom(8), 'big')
+    with _lock:
+        if ms <= _last_ms:
+            ms = _last_ms
+            _counter += 1
+            if _counter > _COUNTER_MAX:
+                ms += 1
+                _counter = 0
+        else:
+            # Arrancar el contador en un valor aleatorio bajo deja margen para incrementos
+            _counter = int.from_bytes(os.urandom(2), 'big') & 0x7FF
+        _last_ms = ms
+        return _format(ms, _counter, rand_b)
+
+
+def uuid7_min(dt: datetime) -> str:
+    """Menor UUIDv7 posible para el milisegundo de dt"""
+    return _format(_to_ms(dt), 0, 0)
+
+
+def uuid7_max(dt: datetime) -> str:
+    """Mayor UUIDv7 posible para el milisegundo de dt"""
+    return _format(_to_ms(dt), 0xFFF, (1 << 62) - 1)
+
+
+def uuid7_timestamp(value: str) -> Optional[datetime]:
+    """Extrae el instante de un UUIDv7; None si no es versión 7 (p.ej. IDs uuid4 antiguos)"""
+    h = value.replace('-', '')
+    if len(h) != 32 or h[12] != '7':
+        return None
+    return datetime.fromtimestamp(int(h[:12], 16) / 1000, tz=timezone.utc).replace(tzinfo=None)
@@ -0,0 +1,164 @@
+import os
+from boto3.dynamodb.conditions import Key
+from typing import Dict, List, Any, Optional
+
+from cache import get_cache_backend, NOT_FOUND
+from resilience import con_reintentos, dynamodb_con_plazo, esperar_no_procesados
+from hedging import lectura_cubierta
+
+# Configuración de DynamoDB (el resource se elige según el plazo restante de la invocación)
+PRODUCTOS_TABLE = os.environ.get('PRODUCTOS_TABLE', 'p_productos-dev')
+
+# Snapshot de catálogo (precio, nombre) cacheado; el stock nunca se cachea,
+# se garantiza con escrituras condicionales al confirmar la compra
+CATALOGO_FIELDS = ['SK', 'nombre', 'precio', 'stock_shards']
+# Sin CACHE_URL el cache es por contenedor y productos_stream no puede invalidarlo:
+# un cambio de precio solo se ve al vencer el TTL, que por eso es corto
+CATALOGO_CACHE_TTL = int(os.environ.get('CATALOGO_CACHE_TTL', '300' if os.environ.get('CACHE_URL') else '30'))
+PRODUCTOS_NEGATIVE_TTL = int(os.environ.get('PRODUCTOS_NEGATIVE_TTL', '10'))
+CATALOGO_CACHE_SIZE = int(os.environ.get('CATALOGO_CACHE_SIZE', '4096'))
+catalogo_cache = get_cache_backend(ttl=CATALOGO_CACHE_TTL, max_size=CATALOGO_CACHE_SIZE)
+
+# Límite de claves por llamada a BatchGetItem
+BATCH_GET_LIMIT = 100
+
+def get_productos_table():
+    """Obtiene la tabla de productos"""
+    return dynamodb_con_plazo().Table(PRODUCTOS_TABLE)
+
+def producto_key(tenant_id: str, codigo: str) -> Dict[str, str]:
+    return {'tenant_id': tenant_id, 'SK': f'PRODUCTO#{codigo}'}
+
+def catalogo_cache_key(tenant_id: str, codigo: str) -> str:
+    return f"catalogo:{tenant_id}:{codigo}"
+
+def _batch_get_catalogo(tenant_id: str, codigos: List[str]) -> Dict[str, Dict[str, Any]]:
+    """Lee los campos de catálogo con BatchGetItem, reintentando las UnprocessedKeys con backoff"""
+    names = {f"#f{i}": field for i, field in enumerate(CATALOGO_FIELDS)}
+    encontrados = {}
+    for i in range(0, len(codigos), BATCH_GET_LIMIT):
+        request_items = {
+            PRODUCTOS_TABLE: {
+                'Keys': [producto_key(tenant_id, codigo) for codigo in codigos[i:i + BATCH_GET_LIMIT]],
+                'ProjectionExpression': ', '.join(names.keys()),
+                'ExpressionAttributeNames': names
+            }
+        }
+        intento = 0
+        while request_items:
+            if intento:
+                esperar_no_procesados(PRODUCTOS_TABLE, intento)
+            intento += 1
+            # BatchGetItem es eventualmente consistente: se puede cubrir con un duplicado
+            response = lectura_cubierta(f'{PRODUCTOS_TABLE}:catalogo', con_reintentos, PRODUCTOS_TABLE,
+                                        dynamodb_con_plazo().batch_get_item, RequestItems=request_items)
+            for item in response.get('Responses', {}).get(PRODUCTOS_TABLE, []):
+                codigo = item['SK'].split('#', 1)[1]
+                encontrados[codigo] = {
+                    'codigo': codigo,
+                    'nombre': item.get('nombre'),
+                    'precio': item.get('precio'),
+                    'stock_shards': int(item.get('stock_shards', 0))
+                }
+            request_items = response.get('UnprocessedKeys') or None
+    return encontrados
+
+def obtener_catalogo(tenant_id: str, codigos: List[str]) -> Dict[str, Optional[Dict[str, Any]]]:
+    """
+    Resuelve el snapshot de catálogo (codigo, nombre, precio, stock_shards) de varios productos:
+    multi-get en cache y BatchGetItem solo para los faltantes. Los códigos
+    inexistentes se cachean como negativos. Retorna {codigo: snapshot o None}
+    """
+    codigos = list(dict.fromkeys(codigos))  # BatchGetItem no admite claves duplicadas
+    keys = {codigo: catalogo_cache_key(tenant_id, codigo) for codigo in codigos}
+    cached = catalogo_cache.get_many(list(keys.values()))
+
+    resultado = {}
+    faltantes = []
+    for codigo, key in keys.items():
+        if key in cached:
+            value = cached[key]
+            resultado[codigo] = None if value == NOT_FOUND else value
+        else:
+            faltantes.append(codigo)
+
+    if faltantes:
+        encontrados = _batch_get_catalogo(tenant_id, faltantes)
+        catalogo_cache.set_many({keys[c]: snapshot for c, snapshot in encontrados.items()})
+        inexistentes = [c for c in faltantes if c not in encontrados]
+        if inexistentes:
+            catalogo_cache.set_many({keys[c]: NOT_FOUND for c in inexistentes}, ttl=PRODUCTOS_NEGATIVE_TTL)
+        for codigo in faltantes:
+            resultado[codigo] = encontrados.get(codigo)
+
+    return resultado
+
+def invalidar_catalogo(tenant_id: str, codigo: str) -> None:
+    catalogo_cache.delete(catalogo_cache_key(tenant_id, codigo))
+
+# Inventario sharded: el stock de un producto con stock_shards = N se reparte en
+# N items SK = STOCK#<codigo>#<n> (no empiezan con PRODUCTO#, así que los listados
+# y la sincronización con Elasticsearch los ignoran)
+MAX_STOCK_SHARDS = 64
+
+def stock_shard_key(tenant_id: str, codigo: str, shard: int) -> Dict[str, str]:
+    return {'tenant_id': tenant_id, 'SK': f'STOCK#{codigo}#{shard}'}
+
+def shards_actuales(tenant_id: str, codigo: str) -> int:
+    """stock_shards leído de la tabla (el snapshot de catálogo puede estar desactualizado)"""
+    item = con_reintentos(PRODUCTOS_TABLE, get_productos_table().get_item, Key=producto_key(tenant_id, codigo),
+                          ProjectionExpression='stock_shards', ConsistentRead=True).get('Item')
+    return int(item.get('stock_shards', 0)) if item else 0
+
+def obtener_stock(tenant_id: str, codigo: str) -> int:
+    """Stock disponible: suma de shards si el producto está sharded, o el atributo stock"""
+    table = get_productos_table()
+    response = con_reintentos(
+        PRODUCTOS_TABLE, table.query,
+        KeyConditionExpression=Key('tenant_id').eq(tenant_id) & Key('SK').begins_with(f'STOCK#{codigo}#'),
+        ProjectionExpression='stock',
+        ConsistentRead=True
+    )
+    shards = response.get('Items', [])
+    if shards:
+        return sum(int(shard.get('stock', 0)) for shard in shards)
+
+    item = con_reintentos(PRODUCTOS_TABLE, table.get_item, Key=producto_key(tenant_id, codigo),
+                          ProjectionExpression='stock', ConsistentRead=True).get('Item')
+    return int(item.get('stock', 0)) if item else 0
+
+def configurar_stock_sharded(tenant_id: str, codigo: str, shards: int) -> None:
+    """
+    Activa el modo sharded: reparte el stock actual del producto en N contadores
+    y marca el producto con stock_shards = N. Falla si el stock cambió entretanto.
+    """
+    if shards < 2 or shards > MAX_STOCK_SHARDS:
+        raise ValueError(f'shards debe estar entre 2 y {MAX_STOCK_SHARDS}')
+
+    table = get_productos_table()
+    producto = con_reintentos(PRODUCTOS_TABLE, table.get_item, Key=producto_key(tenant_id, codigo),
+                              ConsistentRead=True).get('Item')
+    if not producto:
+        raise ValueError(f'Producto {codigo} no encontrado')
+    if int(producto.get('stock_shards', 0)) > 0:
+        raise ValueError(f'Producto {codigo} ya tiene stock sharded')
+
+    stock = int(producto.get('stock', 0))
+    base, resto = divmod(stock, shards)
+    transact_items = [{
+        'Put': {
+            'TableName': PRODUCTOS_TABLE,
+            'Item': {**stock_shard_key(tenant_id, codigo, n), 'stock': base + (1 if n < resto else 0)}
+        }
+    } for n in range(shards)]
+    transact_items.append({
+        'Update': {
+            'TableName': PRODUCTOS_TABLE,
+            'Key': producto_key(tenant_id, codigo),
+            'UpdateExpression': 'SET stock_shards = :shards, stock = :cero',
+            'ConditionExpression': 'stock = :stock',
+            'ExpressionAttributeValues': {':shards': shards, ':cero': 0, ':stock': stock}
+        }
+    })
+    con_reintentos('transacciones', dynamodb_con_plazo().meta.client.transact_write_items, TransactItems=transact_items)
+    invalidar_catalogo(tenant_id, codigo)
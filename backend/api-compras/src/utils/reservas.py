@@ -0,0 +1,198 @@
+import os
+import random
+import time
+from datetime import datetime
+from typing import Dict, Any, Iterator
+
+from boto3.dynamodb.conditions import Key
+from botocore.exceptions import ClientError
+
+from dynamodb import (COMPRAS_TABLE, MAX_TRANSACT_ITEMS, guardar_compra_codificada, transaccion_con_stock,
+                      devolver_stock, accion_estado_compra, invalidar_compra_cache, get_compras_table)
+from productos import obtener_catalogo
+from checkout import (CheckoutError, validar_datos_compra, calcular_cantidades, validar_productos,
+                      construir_compra, shards_por_producto)
+from ids import uuid7
+from resilience import con_reintentos, dynamodb_con_plazo
+
+# Reservas de stock (checkout en dos fases): SK = RESERVA#<reserva_id>.
+# reservar descuenta stock y crea la compra en estado RESERVADA; confirmar la pasa a
+# COMPLETADA. Si la reserva expira, DynamoDB la borra por TTL y compras_stream
+# devuelve el stock y marca la compra como EXPIRADA.
+RESERVA_TTL = int(os.environ.get('RESERVA_TTL', '900'))
+# El TTL de DynamoDB puede tardar horas en borrar: liberar_reservas barre los holds
+# vencidos por ReservasPorVencimientoIndex (sparse: solo holds ACTIVA), repartidos
+# en particiones para no concentrar las escrituras en una sola clave del índice
+RESERVAS_INDEX = 'ReservasPorVencimientoIndex'
+RESERVAS_PARTICIONES = int(os.environ.get('RESERVAS_PARTICIONES', '8'))
+
+def reserva_key(tenant_id: str, reserva_id: str) -> Dict[str, str]:
+    return {'tenant_id': tenant_id, 'SK': f'RESERVA#{reserva_id}'}
+
+def crear_reserva(tenant_id: str, user_id: str, body: Dict[str, Any]) -> Dict[str, Any]:
+    """Valida la compra igual que crear_compra y retiene el stock durante RESERVA_TTL segundos"""
+    productos, direccion_entrega, metodo_pago = validar_datos_compra(body)
+    cantidades = calcular_cantidades(productos)
+    # La transacción lleva además el hold, no solo la compra
+    if len(cantidades) + 2 > MAX_TRANSACT_ITEMS:
+        raise CheckoutError(400, f'Máximo {MAX_TRANSACT_ITEMS - 2} productos distintos por reserva')
+
+    catalogo = obtener_catalogo(tenant_id, list(cantidades.keys()))
+    productos_validados, total = validar_productos(productos, catalogo)
+    compra_item = construir_compra(tenant_id, user_id, productos_validados, total,
+                                   direccion_entrega, metodo_pago, estado='RESERVADA')
+
+    reserva_id = uuid7()
+    expira_en = int(time.time()) + RESERVA_TTL
+
+    def escribir(compra_codificada: Dict[str, Any]) -> Dict[str, int]:
+        compra_put = {
+            'Put': {
+                'TableName': COMPRAS_TABLE,
+                'Item': compra_codificada,
+                'ConditionExpression': 'attribute_not_exists(SK)'
+            }
+        }
+
+        def acciones(shards_elegidos):
+            # El hold guarda de qué shard salió cada unidad para devolverla al mismo
+            return [compra_put, {
+                'Put': {
+                    'TableName': COMPRAS_TABLE,
+                    'Item': {
+                        **reserva_key(tenant_id, reserva_id),
+                        'reserva_id': reserva_id,
+                        'compra_id': compra_item['compra_id'],
+                        # Sin 'user_id': el hold no debe entrar en UserComprasIndex
+                        'owner_user_id': user_id,
+                        'cantidades': cantidades,
+                        'shards_usados': shards_elegidos,
+                        'estado': 'ACTIVA',
+                        'expira_en': expira_en,
+                        'reserva_particion': str(random.randrange(RESERVAS_PARTICIONES)),
+                        'ttl': expira_en,
+                        'created_at': compra_item['created_at']
+                    },
+                    'ConditionExpression': 'attribute_not_exists(SK)'
+                }
+            }]
+
+        return transaccion_con_stock(acciones, tenant_id, cantidades, compra_item['created_at'],
+                                     shards_por_producto(catalogo, cantidades))
+
+    guardar_compra_codificada(compra_item, escribir)
+
+    return {
+        'reserva_id': reserva_id,
+        'compra_id': compra_item['compra_id'],
+        'expira_en': expira_en,
+        'total': float(total),
+        'estado': 'RESERVADA'
+    }
+
+def confirmar_reserva(tenant_id: str, user_id: str, reserva_id: str) -> str:
+    """Convierte una reserva vigente en compra COMPLETADA. Retorna el compra_id"""
+    table = get_compras_table()
+    reserva = con_reintentos(COMPRAS_TABLE, table.get_item, Key=reserva_key(tenant_id, reserva_id),
+                             ConsistentRead=True).get('Item')
+    if not reserva or reserva.get('owner_user_id', reserva.get('user_id')) != user_id:
+        raise CheckoutError(404, 'Reserva no encontrada')
+
+    compra_id = reserva['compra_id']
+    timestamp = datetime.utcnow().isoformat()
+    now = int(time.time())
+    try:
+        con_reintentos('transacciones', dynamodb_con_plazo().meta.client.transact_write_items, TransactItems=[
+            {
+                'Update': {
+                    'TableName': COMPRAS_TABLE,
+                    'Key': reserva_key(tenant_id, reserva_id),
+                    'UpdateExpression': 'SET estado = :confirmada, updated_at = :timestamp REMOVE reserva_particion',
+                    'ConditionExpression': ('estado = :activa AND expira_en > :now AND '
+                                            '(owner_user_id = :user_id OR user_id = :user_id)'),
+                    'ExpressionAttributeValues': {
+                        ':confirmada': 'CONFIRMADA',
+                        ':activa': 'ACTIVA',
+                        ':timestamp': timestamp,
+                        ':now': now,
+                        ':user_id': user_id
+                    }
+                }
+            },
+            accion_estado_compra(tenant_id, compra_id, 'COMPLETADA', timestamp, estado_actual='RESERVADA')
+        ])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        if reserva.get('estado') == 'CONFIRMADA':
+            raise CheckoutError(409, 'Reserva ya confirmada')
+        if int(reserva.get('expira_en', 0)) <= now:
+            raise CheckoutError(410, 'Reserva expirada')
+        raise CheckoutError(409, 'La reserva cambió de estado, consulte la compra')
+
+    invalidar_compra_cache(tenant_id, compra_id, timestamp)
+    return compra_id
+
+def liberar_reserva(reserva: Dict[str, Any]) -> bool:
+    """
+    Devuelve el stock de una reserva no confirmada y marca su compra como EXPIRADA.
+    Es idempotente: si la compra ya no está RESERVADA la transacción no aplica nada.
+    """
+    if reserva.get('estado') != 'ACTIVA':
+        return False
+
+    tenant_id = reserva['tenant_id']
+    timestamp = datetime.utcnow().isoformat()
+    cantidades = {codigo: int(cantidad) for codigo, cantidad in reserva.get('cantidades', {}).items()}
+    shards_usados = {codigo: int(shard) for codigo, shard in (reserva.get('shards_usados') or {}).items()}
+    expirar = accion_estado_compra(tenant_id, reserva['compra_id'], 'EXPIRADA', timestamp, estado_actual='RESERVADA')
+    reponer = devolver_stock(tenant_id, cantidades, shards_usados, timestamp)
+    while True:
+        try:
+            con_reintentos('transacciones', dynamodb_con_plazo().meta.client.transact_write_items,
+                           TransactItems=[expirar] + reponer)
+            break
+        except ClientError as e:
+            if e.response['Error']['Code'] != 'TransactionCanceledException':
+                raise
+            reasons = e.response.get('CancellationReasons', [])
+            # Shards borrados con su producto: esas unidades ya no se reponen
+            borrados = {i for i, reason in enumerate(reasons[1:]) if reason.get('Code') == 'ConditionalCheckFailed'}
+            if not reasons or reasons[0].get('Code') == 'ConditionalCheckFailed' or not borrados:
+                return False
+            reponer = [accion for i, accion in enumerate(reponer) if i not in borrados]
+
+    invalidar_compra_cache(tenant_id, reserva['compra_id'], timestamp)
+    return True
+
+def reservas_vencidas(ahora: int) -> Iterator[Dict[str, Any]]:
+    """Holds ACTIVA con expira_en <= ahora, de todas las particiones del índice"""
+    table = get_compras_table()
+    for particion in range(RESERVAS_PARTICIONES):
+        params = {
+            'IndexName': RESERVAS_INDEX,
+            'KeyConditionExpression': Key('reserva_particion').eq(str(particion)) & Key('expira_en').lte(ahora)
+        }
+        while True:
+            page = con_reintentos(COMPRAS_TABLE, table.query, **params)
+            yield from page.get('Items', [])
+            if 'LastEvaluatedKey' not in page:
+                break
+            params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+def barrer_reserva(reserva: Dict[str, Any]) -> bool:
+    """
+    Libera un hold vencido y lo borra. El REMOVE resultante llega a compras_stream,
+    que vuelve a llamar a liberar_reserva sin efecto (la compra ya no está RESERVADA).
+    """
+    liberada = liberar_reserva(reserva)
+    try:
+        con_reintentos(COMPRAS_TABLE, get_compras_table().delete_item,
+                       Key=reserva_key(reserva['tenant_id'], reserva['reserva_id']),
+                       ConditionExpression='estado = :activa',
+                       ExpressionAttributeValues={':activa': 'ACTIVA'})
+    except ClientError as e:
+        # Confirmada entre la consulta y el borrado: ya salió del índice
+        if e.response['Error']['Code'] != 'ConditionalCheckFailedException':
+            raise
+    return liberada
@@ -0,0 +1,236 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+import boto3
+from botocore.config import Config
+from botocore.exceptions import (ClientError, ConnectionClosedError, ConnectTimeoutError,
+                                 EndpointConnectionError, ReadTimeoutError)
+
+# Los reintentos los maneja este módulo; botocore hace un solo intento por llamada
+# para no multiplicar reintentos (y carga) cuando DynamoDB está limitando
+BOTO_CONFIG = Config(retries={'total_max_attempts': 1, 'mode': 'standard'})
+
+MAX_INTENTOS = int(os.environ.get('DDB_MAX_INTENTOS', '6'))
+BACKOFF_BASE_MS = int(os.environ.get('DDB_BACKOFF_BASE_MS', '25'))
+BACKOFF_CAP_MS = int(os.environ.get('DDB_BACKOFF_CAP_MS', '1000'))
+# Margen que se reserva para responder antes de que la Lambda expire
+MARGEN_MS = int(os.environ.get('DDB_MARGEN_MS', '500'))
+# Presupuesto cuando no hay contexto de Lambda (scripts, stream sin contexto)
+PRESUPUESTO_SIN_CONTEXTO_MS = 5000
+# API Gateway corta la integración a los 29s contados desde que recibió la request
+GATEWAY_TIMEOUT_MS = int(os.environ.get('GATEWAY_TIMEOUT_MS', '29000'))
+# Timeouts por llamada (s) disponibles; se elige el mayor que cabe en el plazo restante
+TIMEOUTS_LLAMADA_S = (1, 2, 5, 10, 25)
+
+CIRCUITO_UMBRAL = int(os.environ.get('DDB_CIRCUITO_UMBRAL', '8'))
+CIRCUITO_ABIERTO_MS = int(os.environ.get('DDB_CIRCUITO_ABIERTO_MS', '5000'))
+
+CODIGOS_REINTENTABLES = {
+    'ProvisionedThroughputExceededException',
+    'ThrottlingException',
+    'RequestLimitExceeded',
+    'InternalServerError',
+    'ServiceUnavailable',
+    'TransactionInProgressException',
+}
+RAZONES_TRANSACCION_REINTENTABLES = {'ThrottlingError', 'TransactionConflict', 'ProvisionedThroughputExceeded'}
+ERRORES_RED = (EndpointConnectionError, ConnectTimeoutError, ReadTimeoutError, ConnectionClosedError)
+
+
+class ServicioNoDisponible(Exception):
+    """DynamoDB está limitando o caído: se agotaron los reintentos o el circuito está abierto"""
+    def __init__(self, recurso: str, motivo: str):
+        super().__init__(f'{recurso} no disponible: {motivo}')
+        self.recurso = recurso
+        self.motivo = motivo
+
+
+class PlazoAgotado(ServicioNoDisponible):
+    """No queda tiempo para completar la llamada antes del corte de API Gateway o de la Lambda"""
+
+
+# Contexto de la invocación actual (un contenedor atiende una invocación a la vez)
+_lambda_context = None
+# Instante (epoch ms) en que API Gateway dejará de esperar la respuesta
+_limite_gateway_ms = None
+
+def set_lambda_context(context: Any, event: Optional[Dict[str, Any]] = None) -> None:
+    """Registra el plazo de la invocación; con un evento HTTP también el corte de API Gateway"""
+    global _lambda_context, _limite_gateway_ms
+    _lambda_context = context
+    _limite_gateway_ms = None
+    inicio = ((event or {}).get('requestContext') or {}).get('requestTimeEpoch')
+    if inicio:
+        _limite_gateway_ms = int(inicio) + GATEWAY_TIMEOUT_MS
+
+
+def remaining_ms() -> Optional[int]:
+    """Milisegundos restantes de la invocación, o None si no hay contexto"""
+    restantes = []
+    if _lambda_context is not None and hasattr(_lambda_context, 'get_remaining_time_in_millis'):
+        restantes.append(_lambda_context.get_remaining_time_in_millis())
+    if _limite_gateway_ms is not None:
+        restantes.append(int(_limite_gateway_ms - time.time() * 1000))
+    return min(restantes) if restantes else None
+
+
+def verificar_plazo(recurso: str, minimo_ms: int = MARGEN_MS) -> None:
+    """Lanza PlazoAgotado si ya no queda tiempo útil para llamar al recurso"""
+    restante = remaining_ms()
+    if restante is not None and restante < minimo_ms:
+        raise PlazoAgotado(recurso, f'quedan {restante} ms')
+
+
+def timeout_llamada() -> int:
+    """Mayor timeout por llamada (s) que cabe en el plazo restante menos el margen"""
+    restante = remaining_ms()
+    if restante is None:
+        return TIMEOUTS_LLAMADA_S[-1]
+    disponible = (restante - MARGEN_MS) / 1000
+    candidatos = [t for t in TIMEOUTS_LLAMADA_S if t <= disponible]
+    return candidatos[-1] if candidatos else TIMEOUTS_LLAMADA_S[0]
+
+
+# Clientes/resources de boto3 por timeout; se crean una vez por contenedor y se reutilizan
+_clientes: Dict[tuple, Any] = {}
+_clientes_lock = threading.Lock()
+
+def _con_timeout(tipo: str, servicio: str) -> Any:
+    timeout = timeout_llamada()
+    clave = (tipo, servicio, timeout)
+    with _clientes_lock:
+        if clave not in _clientes:
+            config = BOTO_CONFIG.merge(Config(connect_timeout=min(timeout, 2), read_timeout=timeout))
+            factory = boto3.resource if tipo == 'resource' else boto3.client
+            _clientes[clave] = factory(servicio, config=config)
+        return _clientes[clave]
+
+
+def dynamodb_con_plazo() -> Any:
+    """Resource de DynamoDB cuyo read_timeout no excede el plazo restante"""
+    return _con_timeout('resource', 'dynamodb')
+
+
+def s3_con_plazo() -> Any:
+    """Cliente de S3 cuyo read_timeout no excede el plazo restante"""
+    return _con_timeout('client', 's3')
+
+
+def es_reintentable(error: Exception) -> bool:
+    """Clasifica el error: throttling/transitorio (reintentable) o fatal"""
+    if isinstance(error, ERRORES_RED):
+        return True
+    if not isinstance(error, ClientError):
+        return False
+    code = error.response.get('Error', {}).get('Code')
+    if code in CODIGOS_REINTENTABLES:
+        return True
+    if code == 'TransactionCanceledException':
+        # Reintentable solo si ninguna razón es una condición fallida
+        codes = [r.get('Code') for r in error.response.get('CancellationReasons', [])
+                 if r.get('Code') not in (None, 'None')]
+        return bool(codes) and all(c in RAZONES_TRANSACCION_REINTENTABLES for c in codes)
+    return False
+
+
+class CircuitBreaker:
+    """Circuito por recurso: se abre tras CIRCUITO_UMBRAL fallas transitorias seguidas"""
+
+    def __init__(self, umbral: int = CIRCUITO_UMBRAL, abierto_ms: int = CIRCUITO_ABIERTO_MS):
+        self.umbral = umbral
+        self.abierto_ms = abierto_ms
+        self._fallas = 0
+        self._abierto_hasta = 0.0
+        self._prueba_en_curso = False
+        self._lock = threading.Lock()
+
+    def permitir(self) -> bool:
+        with self._lock:
+            if self._fallas < self.umbral:
+                return True
+            if time.monotonic() * 1000 < self._abierto_hasta:
+                return False
+            # Semiabierto: deja pasar una sola llamada de prueba
+            if self._prueba_en_curso:
+                return False
+            self._prueba_en_curso = True
+            return True
+
+    def registrar_exito(self) -> None:
+        with self._lock:
+            self._fallas = 0
+            self._prueba_en_curso = False
+
+    def registrar_falla(self) -> None:
+        with self._lock:
+            self._fallas += 1
+            self._prueba_en_curso = False
+            if self._fallas >= self.umbral:
+                self._abierto_hasta = time.monotonic() * 1000 + self.abierto_ms
+
+
+_circuitos: Dict[str, CircuitBreaker] = {}
+_circuitos_lock = threading.Lock()
+
+def circuito(recurso: str) -> CircuitBreaker:
+    with _circuitos_lock:
+        if recurso not in _circuitos:
+            _circuitos[recurso] = CircuitBreaker()
+        return _circuitos[recurso]
+
+
+def con_reintentos(recurso: str, fn: Callable, *args, **kwargs) -> Any:
+    """
+    Ejecuta una llamada a DynamoDB con reintentos ante throttling/errores transitorios,
+    usando backoff exponencial con jitter decorrelacionado y sin pasarse del tiempo
+    restante de la Lambda. Los errores fatales se propagan sin reintentar.
+    Lanza ServicioNoDisponible si el circuito del recurso está abierto o se agota el presupuesto,
+    y PlazoAgotado si no queda tiempo para otro intento.
+    """
+    breaker = circuito(recurso)
+    inicio = time.monotonic()
+    espera_ms = BACKOFF_BASE_MS
+
+    for intento in range(1, MAX_INTENTOS + 1):
+        verificar_plazo(recurso)
+        if not breaker.permitir():
+            raise ServicioNoDisponible(recurso, 'circuito abierto')
+        try:
+            resultado = fn(*args, **kwargs)
+            breaker.registrar_exito()
+            return resultado
+        except Exception as e:
+            if not es_reintentable(e):
+                # Las condiciones fallidas y errores de validación no indican sobrecarga
+                breaker.registrar_exito()
+                raise
+            breaker.registrar_falla()
+            ultimo_error = e
+
+        # Jitter decorrelacionado: sleep = min(cap, random(base, sleep_anterior * 3))
+        espera_ms = min(BACKOFF_CAP_MS, random.uniform(BACKOFF_BASE_MS, espera_ms * 3))
+        restante = remaining_ms()
+        if restante is None:
+            restante = PRESUPUESTO_SIN_CONTEXTO_MS - (time.monotonic() - inicio) * 1000
+        if intento == MAX_INTENTOS or restante - espera_ms < MARGEN_MS:
+            break
+        time.sleep(espera_ms / 1000)
+
+    print(f"DynamoDB {recurso}: reintentos agotados ({ultimo_error})")
+    raise ServicioNoDisponible(recurso, 'reintentos agotados') from ultimo_error
+
+
+def esperar_no_procesados(recurso: str, intento: int) -> None:
+    """
+    Backoff exponencial con jitter antes de reenviar las UnprocessedKeys/UnprocessedItems
+    de un batch (DynamoDB las devuelve cuando limita, sin lanzar error).
+    Lanza ServicioNoDisponible tras MAX_INTENTOS y PlazoAgotado si no queda tiempo para esperar.
+    """
+    if intento >= MAX_INTENTOS:
+        raise ServicioNoDisponible(recurso, 'items no procesados tras reintentos')
+    espera_ms = random.uniform(0, min(BACKOFF_CAP_MS, BACKOFF_BASE_MS * (2 ** intento)))
+    verificar_plazo(recurso, MARGEN_MS + int(espera_ms))
+    time.sleep(espera_ms / 1000)
@@ -0,0 +1,26 @@
+import os
+from typing import Optional
+
+from filtro_revocaciones import FiltroRevocaciones
+from resilience import con_reintentos, dynamodb_con_plazo, s3_con_plazo
+
+# Filtro Bloom de jti revocados que publica api-usuarios (compilar_revocaciones)
+REVOCACIONES_BUCKET = os.environ.get('REVOCACIONES_BUCKET', '')
+REVOCACIONES_KEY = os.environ.get('REVOCACIONES_KEY', 'revocaciones/bloom.bin')
+TOKENS_REVOCADOS_TABLE = os.environ.get('TOKENS_REVOCADOS_TABLE', 'p_tokens_revocados-dev')
+
+_filtro = FiltroRevocaciones(REVOCACIONES_BUCKET, REVOCACIONES_KEY, s3_con_plazo)
+
+
+def _revocado_en_tabla(jti: str) -> bool:
+    table = dynamodb_con_plazo().Table(TOKENS_REVOCADOS_TABLE)
+    response = con_reintentos(TOKENS_REVOCADOS_TABLE, table.get_item, Key={'jti': jti},
+                              ProjectionExpression='jti')
+    return 'Item' in response
+
+
+def esta_revocado(jti: Optional[str]) -> bool:
+    """True si el jti fue revocado. El filtro descarta en memoria; solo sus positivos van a DynamoDB"""
+    if not jti or not REVOCACIONES_BUCKET:
+        return False
+    return _filtro.revocado(jti, _revocado_en_tabla)
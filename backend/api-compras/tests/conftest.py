@@ -0,0 +1,70 @@
+import os
+import sys
+
+# Los handlers agregan src/utils al path en runtime; los tests hacen lo mismo
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'handlers'))
+sys.path.insert(0, os.path.join(RAIZ, 'layers', 'jwt-layer', 'python'))
+sys.path.insert(0, os.path.join(RAIZ, '..', 'shared-layer', 'python'))
+
+# Credenciales falsas: ningún test debe llegar a AWS
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.pop('CACHE_URL', None)
+
+import pytest
+
+
+@pytest.fixture
+def aws():
+    """DynamoDB y S3 simulados (moto) con las tablas de compras y productos"""
+    import boto3
+    from moto import mock_aws
+
+    import dynamodb as dynamodb_utils
+    import resilience
+
+    with mock_aws():
+        resilience._clientes.clear()
+        resilience._circuitos.clear()
+        dynamodb = boto3.resource('dynamodb')
+        dynamodb.create_table(
+            TableName=os.environ.get('COMPRAS_TABLE', 'p_compras-dev'),
+            AttributeDefinitions=[{'AttributeName': n, 'AttributeType': 'S'}
+                                  for n in ('tenant_id', 'SK', 'user_id', 'fecha_compra', 'reserva_particion')]
+                                 + [{'AttributeName': 'expira_en', 'AttributeType': 'N'}],
+            KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                       {'AttributeName': 'SK', 'KeyType': 'RANGE'}],
+            GlobalSecondaryIndexes=[
+                {'IndexName': 'UserComprasIndex',
+                 'KeySchema': [{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                               {'AttributeName': 'user_id', 'KeyType': 'RANGE'}],
+                 'Projection': {'ProjectionType': 'ALL'}},
+                {'IndexName': 'UserComprasResumenIndex',
+                 'KeySchema': [{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                               {'AttributeName': 'user_id', 'KeyType': 'RANGE'}],
+                 'Projection': {'ProjectionType': 'INCLUDE',
+                                'NonKeyAttributes': list(dynamodb_utils.COMPRA_SUMMARY_FIELDS)}},
+                {'IndexName': 'FechaComprasIndex',
+                 'KeySchema': [{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                               {'AttributeName': 'fecha_compra', 'KeyType': 'RANGE'}],
+                 'Projection': {'ProjectionType': 'ALL'}},
+                {'IndexName': 'ReservasPorVencimientoIndex',
+                 'KeySchema': [{'AttributeName': 'reserva_particion', 'KeyType': 'HASH'},
+                               {'AttributeName': 'expira_en', 'KeyType': 'RANGE'}],
+                 'Projection': {'ProjectionType': 'ALL'}},
+            ],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        dynamodb.create_table(
+            TableName=os.environ.get('PRODUCTOS_TABLE', 'p_productos-dev'),
+            AttributeDefinitions=[{'AttributeName': n, 'AttributeType': 'S'} for n in ('tenant_id', 'SK')],
+            KeySchema=[{'AttributeName': 'tenant_id', 'KeyType': 'HASH'},
+                       {'AttributeName': 'SK', 'KeyType': 'RANGE'}],
+            BillingMode='PAY_PER_REQUEST'
+        )
+        boto3.client('s3').create_bucket(Bucket=os.environ.get('COMPRAS_BUCKET', 'compras-data-dev'))
+        yield dynamodb
+        resilience._clientes.clear()
@@ -0,0 +1,60 @@
+import time
+
+import pytest
+
+import auth
+import authorizer
+from resilience import ServicioNoDisponible
+
+METHOD_ARN = 'arn:aws:execute-api:us-east-1:123456789012:abc123/dev/GET/compras'
+
+
+def test_jwks_inalcanzable_no_se_reporta_como_token_invalido(monkeypatch):
+    def jwks_caido(token):
+        raise ServicioNoDisponible('jwks', 'timed out')
+
+    monkeypatch.setattr(authorizer, 'decode_token', jwks_caido)
+    with pytest.raises(Exception) as error:
+        authorizer.lambda_handler({'authorizationToken': 'Bearer x', 'methodArn': METHOD_ARN}, None)
+    # 'Unauthorized' sería un 401 cacheado; cualquier otro mensaje es AUTHORIZER_FAILURE (503)
+    assert str(error.value) == 'ServicioNoDisponible'
+
+
+def test_token_invalido_es_unauthorized():
+    with pytest.raises(Exception) as error:
+        authorizer.lambda_handler({'authorizationToken': 'Bearer no-es-un-jwt', 'methodArn': METHOD_ARN}, None)
+    assert str(error.value) == 'Unauthorized'
+
+
+def test_token_valido_autoriza_toda_la_api():
+    import jwt
+    token = jwt.encode({'user_id': 'u1', 'tenant_id': 't1', 'email': 'u1@example.com'},
+                       'mi-jwt-secret-super-seguro-y-secreto', algorithm='HS256')
+    policy = authorizer.lambda_handler({'authorizationToken': f'Bearer {token}', 'methodArn': METHOD_ARN}, None)
+    assert policy['principalId'] == 'u1'
+    assert policy['policyDocument']['Statement'][0]['Resource'] == 'arn:aws:execute-api:us-east-1:123456789012:abc123/dev/*/*'
+    assert policy['context'] == {'user_id': 'u1', 'tenant_id': 't1', 'email': 'u1@example.com'}
+
+
+def _evento_con_contexto(exp):
+    return {'httpMethod': 'GET', 'requestContext': {'authorizer': {
+        'user_id': 'u1', 'tenant_id': 't1', 'email': 'u1@example.com', 'exp': str(exp)}}}
+
+
+def test_contexto_incluye_exp():
+    import jwt
+    exp = int(time.time()) + 600
+    token = jwt.encode({'user_id': 'u1', 'tenant_id': 't1', 'exp': exp},
+                       'mi-jwt-secret-super-seguro-y-secreto', algorithm='HS256')
+    policy = authorizer.lambda_handler({'authorizationToken': f'Bearer {token}', 'methodArn': METHOD_ARN}, None)
+    assert policy['context']['exp'] == exp
+
+
+def test_contexto_cacheado_de_un_token_vencido_se_rechaza(aws, monkeypatch):
+    monkeypatch.setattr(auth, 'TRUST_AUTHORIZER', True)
+    handler = auth.require_auth(lambda event, context: {'statusCode': 200, 'user': event['user_context']})
+
+    assert handler(_evento_con_contexto(int(time.time()) + 60), None)['statusCode'] == 200
+    respuesta = handler(_evento_con_contexto(int(time.time()) - 1), None)
+    assert respuesta['statusCode'] == 401
+    assert 'Token expirado' in respuesta['body']
@@ -0,0 +1,150 @@
+import socket
+import socketserver
+import threading
+import time
+from decimal import Decimal
+
+import pytest
+
+from cache import RedisCache, RespConnection
+
+
+class _EstadoResp:
+    def __init__(self):
+        self.datos = {}  # clave -> (valor, vence_en)
+        self.comandos = []
+        self.conexiones = 0
+        # Conexiones a cerrar al recibir su siguiente comando (keep-alive caído)
+        self.cortes = 0
+
+
+def _leer_comando(rfile):
+    linea = rfile.readline()
+    if not linea:
+        return None
+    assert linea[:1] == b'*'
+    args = []
+    for _ in range(int(linea[1:-2])):
+        largo = int(rfile.readline()[1:-2])
+        args.append(rfile.read(largo + 2)[:-2])
+    return args
+
+
+def _bulk(valor):
+    return b'$-1\r\n' if valor is None else b'$%d\r\n%s\r\n' % (len(valor), valor)
+
+
+@pytest.fixture
+def resp():
+    """Servidor RESP2 local con MGET/GET/SET PX/DEL en lugar de Redis"""
+    estado = _EstadoResp()
+
+    class Handler(socketserver.StreamRequestHandler):
+        def _get(self, clave):
+            valor, vence_en = estado.datos.get(clave, (None, None))
+            if vence_en is not None and vence_en <= time.monotonic():
+                estado.datos.pop(clave, None)
+                return None
+            return valor
+
+        def handle(self):
+            estado.conexiones += 1
+            while True:
+                args = _leer_comando(self.rfile)
+                if args is None:
+                    return
+                if estado.cortes:
+                    estado.cortes -= 1
+                    return
+                comando = args[0].decode().upper()
+                estado.comandos.append([comando] + args[1:])
+                if comando == 'MGET':
+                    respuesta = b'*%d\r\n' % (len(args) - 1) + b''.join(_bulk(self._get(c)) for c in args[1:])
+                elif comando == 'GET':
+                    respuesta = _bulk(self._get(args[1]))
+                elif comando == 'SET':
+                    vence_en = None
+                    if len(args) == 5 and args[3].upper() == b'PX':
+                        vence_en = time.monotonic() + int(args[4]) / 1000
+                    estado.datos[args[1]] = (args[2], vence_en)
+                    respuesta = b'+OK\r\n'
+                elif comando == 'DEL':
+                    respuesta = b':%d\r\n' % sum(estado.datos.pop(c, None) is not None for c in args[1:])
+                else:
+                    respuesta = b'-ERR comando no soportado\r\n'
+                self.wfile.write(respuesta)
+
+    servidor = socketserver.ThreadingTCPServer(('127.0.0.1', 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    estado.puerto = servidor.server_address[1]
+    yield estado
+    servidor.shutdown()
+    servidor.server_close()
+
+
+@pytest.fixture
+def cache(resp):
+    cache = RedisCache(RespConnection('127.0.0.1', resp.puerto, timeout=1), ttl=30, prefix='dev:')
+    yield cache
+    cache.connection.close()
+
+
+def test_set_many_y_get_many_van_en_un_solo_viaje(cache, resp, monkeypatch):
+    envios = []
+    enviar = cache.connection._send
+    monkeypatch.setattr(cache.connection, '_send', lambda comandos: envios.append(len(comandos)) or enviar(comandos))
+
+    cache.set_many({'a': {'precio': Decimal('9.90')}, 'b': {'nombre': 'x'}})
+    resultado = cache.get_many(['a', 'b', 'c'])
+
+    # Los SET salen en un solo write; las tres lecturas en un solo MGET
+    assert envios == [2, 1]
+    assert resp.comandos[-1] == ['MGET', b'dev:a', b'dev:b', b'dev:c']
+    assert resultado == {'a': {'precio': Decimal('9.90')}, 'b': {'nombre': 'x'}}
+
+
+def test_set_envia_ttl_en_milisegundos_y_expira(cache, resp):
+    cache.set('corto', 1, ttl=0.05)
+
+    assert resp.comandos[-1] == ['SET', b'dev:corto', resp.comandos[-1][2], b'PX', b'50']
+    assert cache.get('corto') == 1
+    time.sleep(0.1)
+    assert cache.get('corto') is None
+
+
+def test_delete(cache, resp):
+    cache.set('k', 'v')
+    cache.delete('k')
+
+    assert resp.comandos[-1] == ['DEL', b'dev:k']
+    assert cache.get('k') is None
+
+
+def test_conexion_caida_se_reintenta_una_vez(cache, resp):
+    cache.set('k', 'v')
+    resp.cortes = 1
+
+    assert cache.get('k') == 'v'
+    assert resp.conexiones == 2
+
+
+def test_solo_se_reconecta_una_vez_y_luego_es_cache_miss(cache, resp):
+    cache.set('k', 'v')
+    resp.cortes = 10
+
+    assert cache.get('k') is None
+    # La conexión original más un único reintento
+    assert resp.conexiones == 2
+
+
+def test_servidor_inalcanzable_es_cache_miss():
+    sock = socket.socket()
+    sock.bind(('127.0.0.1', 0))
+    puerto = sock.getsockname()[1]
+    sock.close()
+    cache = RedisCache(RespConnection('127.0.0.1', puerto, timeout=0.2))
+
+    cache.set('k', 'v')
+    assert cache.get_many(['k']) == {}
+    assert cache.invalidate_if_stale('k', '2030') is False
@@ -0,0 +1,31 @@
+import compras_stream
+import productos_stream
+
+
+def test_stream_reporta_el_registro_con_error_inesperado(monkeypatch):
+    registros = [
+        {'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': '1', 'NewImage': {}}},
+        {'eventName': 'INSERT', 'dynamodb': {'SequenceNumber': '2', 'NewImage': {}}},
+    ]
+    procesados = []
+
+    def falla_en_el_segundo(record):
+        if record['dynamodb']['SequenceNumber'] == '2':
+            raise RuntimeError('falla inesperada')
+        procesados.append(record['dynamodb']['SequenceNumber'])
+
+    monkeypatch.setattr(compras_stream, 'process_compra_record', falla_en_el_segundo)
+    response = compras_stream.lambda_handler({'Records': registros}, None)
+    assert response['batchItemFailures'] == [{'itemIdentifier': '2'}]
+    assert procesados == ['1']
+
+
+def test_productos_stream_reporta_el_registro_con_error(monkeypatch):
+    registros = [{'eventName': 'MODIFY', 'dynamodb': {'SequenceNumber': '7'}}]
+
+    def caido(record):
+        raise RuntimeError('cache no disponible')
+
+    monkeypatch.setattr(productos_stream, 'process_producto_record', caido)
+    response = productos_stream.lambda_handler({'Records': registros}, None)
+    assert response['batchItemFailures'] == [{'itemIdentifier': '7'}]
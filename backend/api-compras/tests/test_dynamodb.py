@@ -0,0 +1,97 @@
+from datetime import datetime, timedelta, timezone
+
+import pytest
+
+import dynamodb
+
+
+def test_rango_por_fecha_acepta_datetimes_con_zona(aws):
+    compra = dynamodb.crear_compra_record('t1', 'u1', {'productos': [], 'total': 0})
+    ahora = datetime.now(timezone.utc)
+
+    # Un rango aware (+00:00 o -05:00) debe compararse igual que uno naive en UTC
+    for zona in (timezone.utc, timezone(timedelta(hours=-5))):
+        desde = (ahora - timedelta(minutes=5)).astimezone(zona)
+        hasta = (ahora + timedelta(minutes=5)).astimezone(zona)
+        items = dynamodb.listar_compras_por_fecha('t1', desde, hasta)['Items']
+        assert [i['compra_id'] for i in items] == [compra['compra_id']]
+
+    naive = datetime.utcnow()
+    items = dynamodb.listar_compras_por_fecha('t1', naive - timedelta(minutes=5), naive + timedelta(minutes=5))['Items']
+    assert len(items) == 1
+
+
+def _compra_desbordada(monkeypatch):
+    # Umbrales en 0: cualquier carrito se comprime y se desborda a S3
+    monkeypatch.setattr(dynamodb, 'PRODUCTOS_COMPRESS_THRESHOLD', 0)
+    monkeypatch.setattr(dynamodb, 'PRODUCTOS_S3_THRESHOLD', 0)
+    now = datetime.utcnow()
+    compra_id = dynamodb.uuid7(now)
+    return {
+        'tenant_id': 't1', 'SK': f'COMPRA#{compra_id}', 'compra_id': compra_id, 'user_id': 'u1',
+        'fecha_compra': now.isoformat(), 'created_at': now.isoformat(), 'updated_at': now.isoformat(),
+        'productos': [{'codigo': 'P1', 'cantidad': 1, 'precio_unitario': 10, 'subtotal': 10}],
+        'total': 10, 'estado': 'COMPLETADA'
+    }
+
+
+def _objetos_desbordados():
+    import boto3
+    response = boto3.client('s3').list_objects_v2(Bucket=dynamodb.COMPRAS_BUCKET, Prefix='productos/')
+    return [o['Key'] for o in response.get('Contents', [])]
+
+
+def test_desborde_se_borra_si_la_transaccion_falla(aws, monkeypatch):
+    compra = _compra_desbordada(monkeypatch)
+    # Sin el producto en la tabla la condición de stock falla y la transacción se cancela
+    with pytest.raises(dynamodb.StockInsuficienteError):
+        dynamodb.registrar_compra_transaccional(compra, {'P1': 1})
+    assert _objetos_desbordados() == []
+
+
+def test_desborde_se_conserva_si_la_compra_se_guarda(aws, monkeypatch):
+    aws.Table(dynamodb.PRODUCTOS_TABLE).put_item(Item={'tenant_id': 't1', 'SK': 'PRODUCTO#P1', 'stock': 5})
+    compra = _compra_desbordada(monkeypatch)
+    dynamodb.registrar_compra_transaccional(compra, {'P1': 1})
+
+    assert _objetos_desbordados() == [f"productos/t1/{compra['compra_id']}.zlib"]
+    guardada = dynamodb.obtener_compra('t1', compra['compra_id'], consistent_read=True)
+    assert guardada['productos'][0]['codigo'] == 'P1'
+
+
+def _sembrar_sharded(aws, stock, shards):
+    from productos import configurar_stock_sharded
+    aws.Table(dynamodb.PRODUCTOS_TABLE).put_item(Item={'tenant_id': 't1', 'SK': 'PRODUCTO#P1', 'codigo': 'P1', 'stock': stock})
+    configurar_stock_sharded('t1', 'P1', shards)
+
+
+def test_compra_sharded_descuenta_de_un_shard(aws):
+    from productos import obtener_stock
+    _sembrar_sharded(aws, 4, 2)
+
+    # Cada shard tiene 2: la tercera compra agota uno y pasa al otro
+    for _ in range(4):
+        usados = dynamodb.transaccion_con_stock([], 't1', {'P1': 1}, '2030', {'P1': 2})
+        assert usados['P1'] in (0, 1)
+    assert obtener_stock('t1', 'P1') == 0
+    with pytest.raises(dynamodb.StockInsuficienteError):
+        dynamodb.transaccion_con_stock([], 't1', {'P1': 1}, '2030', {'P1': 2})
+
+
+def test_snapshot_anterior_al_sharding_usa_los_shards(aws):
+    _sembrar_sharded(aws, 3, 2)
+
+    # El catálogo aún dice no sharded: el item del producto tiene stock 0 y se relee stock_shards
+    usados = dynamodb.transaccion_con_stock([], 't1', {'P1': 1}, '2030')
+
+    assert usados['P1'] in (0, 1)
+
+
+def test_devolver_a_un_shard_borrado_no_lo_recrea(aws):
+    from botocore.exceptions import ClientError
+    _sembrar_sharded(aws, 2, 2)
+    aws.Table(dynamodb.PRODUCTOS_TABLE).delete_item(Key={'tenant_id': 't1', 'SK': 'STOCK#P1#1'})
+
+    with pytest.raises(ClientError):
+        aws.meta.client.transact_write_items(TransactItems=dynamodb.devolver_stock('t1', {'P1': 1}, {'P1': 1}, '2030'))
+    assert 'Item' not in aws.Table(dynamodb.PRODUCTOS_TABLE).get_item(Key={'tenant_id': 't1', 'SK': 'STOCK#P1#1'})
@@ -0,0 +1,58 @@
+import json
+
+import pytest
+
+import dynamodb
+import idempotency
+from idempotency import idempotent, marcar_efectos_confirmados
+
+
+def _evento(body, key='clave-1'):
+    return {
+        'headers': {'Idempotency-Key': key, 'X-Tenant-Id': 't1'},
+        'body': json.dumps(body),
+        'user_context': {'user_id': 'u1', 'tenant_id': 't1', 'email': 'u1@example.com'}
+    }
+
+
+def _registro(aws, key='clave-1'):
+    table = aws.Table(dynamodb.COMPRAS_TABLE)
+    return table.get_item(Key={'tenant_id': 't1', 'SK': f'IDEMPOTENCY#{key}'}).get('Item')
+
+
+def test_registro_no_aparece_como_compra_del_usuario(aws):
+    handler = idempotent(lambda event, context: {'statusCode': 201, 'headers': {}, 'body': '{}'})
+    handler(_evento({'a': 1}), None)
+
+    registro = _registro(aws)
+    assert registro['owner_user_id'] == 'u1'
+    assert 'user_id' not in registro
+    assert dynamodb.listar_compras_usuario('t1', 'u1')['Items'] == []
+    assert dynamodb.get_compras_stats('t1', 'u1')['total_compras'] == 0
+
+
+def test_error_antes_de_escribir_libera_la_clave(aws):
+    def handler(event, context):
+        raise RuntimeError('falla')
+
+    with pytest.raises(RuntimeError):
+        idempotent(handler)(_evento({'a': 1}), None)
+    assert _registro(aws) is None
+
+
+def test_error_tras_confirmar_escrituras_no_libera_la_clave(aws):
+    ejecuciones = []
+
+    def handler(event, context):
+        ejecuciones.append(1)
+        marcar_efectos_confirmados(event)
+        raise RuntimeError('falla después de confirmar compras')
+
+    response = idempotent(handler)(_evento({'a': 1}), None)
+    assert response['statusCode'] == 500
+    assert _registro(aws)['estado'] == 'COMPLETADA'
+
+    # El reintento reproduce la respuesta en lugar de volver a crear las compras
+    replay = idempotent(handler)(_evento({'a': 1}), None)
+    assert replay['headers']['Idempotent-Replayed'] == 'true'
+    assert len(ejecuciones) == 1
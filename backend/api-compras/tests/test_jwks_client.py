@@ -0,0 +1,131 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import jwt
+import pytest
+from cryptography.hazmat.primitives.asymmetric import ed25519
+from jwt.algorithms import OKPAlgorithm
+
+
+def _jwk(kid):
+    datos = OKPAlgorithm.to_jwk(ed25519.Ed25519PrivateKey.generate().public_key(), as_dict=True)
+    datos.update(kid=kid, alg='EdDSA', use='sig')
+    return datos
+
+
+class _EstadoJwks:
+    def __init__(self):
+        self.keys = [_jwk('a')]
+        self.requests = []
+        self.conexiones = set()
+        # Bloquea las respuestas mientras está limpio (simula un JWKS colgado)
+        self.liberar = threading.Event()
+        self.liberar.set()
+        # Solo la siguiente request queda colgada hasta liberar_colgada
+        self.colgar_siguiente = False
+        self.liberar_colgada = threading.Event()
+
+    @property
+    def etag(self):
+        return '"%s"' % ','.join(k['kid'] for k in self.keys)
+
+
+@pytest.fixture
+def jwks():
+    """Endpoint JWKS local (keep-alive, ETag/304) en lugar de api-usuarios"""
+    estado = _EstadoJwks()
+
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = 'HTTP/1.1'
+
+        def do_GET(self):
+            estado.requests.append(self.headers.get('If-None-Match'))
+            estado.conexiones.add(self.client_address)
+            if estado.colgar_siguiente:
+                estado.colgar_siguiente = False
+                estado.liberar_colgada.wait(10)
+            estado.liberar.wait(10)
+            if self.headers.get('If-None-Match') == estado.etag:
+                self.send_response(304)
+                self.send_header('ETag', estado.etag)
+                self.send_header('Content-Length', '0')
+                self.end_headers()
+                return
+            body = json.dumps({'keys': estado.keys}).encode()
+            self.send_response(200)
+            self.send_header('ETag', estado.etag)
+            self.send_header('Content-Length', str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def log_message(self, *args):
+            pass
+
+    servidor = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    servidor.daemon_threads = True
+    threading.Thread(target=servidor.serve_forever, daemon=True).start()
+    estado.url = f'http://127.0.0.1:{servidor.server_port}/jwks'
+    yield estado
+    estado.liberar.set()
+    estado.liberar_colgada.set()
+    servidor.shutdown()
+    servidor.server_close()
+
+
+def test_jwks_sin_cambios_es_304_sobre_la_misma_conexion(jwks):
+    client = jwt.PyJWKClient(jwks.url)
+    primero = client.get_jwk_set(refresh=True)
+    for _ in range(5):
+        actual = client.get_jwk_set(refresh=True)
+
+    assert jwks.requests == [None] + [jwks.etag] * 5
+    assert len(jwks.conexiones) == 1
+    # El 304 reutiliza el PyJWKSet ya construido
+    assert actual is primero
+
+
+def test_llamadas_concurrentes_en_frio_hacen_una_sola_descarga(jwks):
+    client = jwt.PyJWKClient(jwks.url, cache_keys=True)
+    jwks.liberar.clear()
+    hilos = [threading.Thread(target=client.get_signing_key, args=('a',)) for _ in range(20)]
+    for hilo in hilos:
+        hilo.start()
+    time.sleep(0.2)
+    jwks.liberar.set()
+    for hilo in hilos:
+        hilo.join()
+
+    assert len(jwks.requests) == 1
+
+
+def test_jwks_vencido_se_sirve_mientras_se_refresca_en_segundo_plano(jwks):
+    client = jwt.PyJWKClient(jwks.url, lifespan=1, max_stale=60)
+    client.get_signing_key('a')
+    time.sleep(1.1)
+
+    jwks.liberar.clear()
+    inicio = time.monotonic()
+    assert client.get_signing_key('a').key_id == 'a'
+    assert time.monotonic() - inicio < 0.5
+    jwks.liberar.set()
+
+
+def test_kid_nuevo_no_espera_un_refresco_en_segundo_plano_colgado(jwks):
+    client = jwt.PyJWKClient(jwks.url, lifespan=1, max_stale=60, background_timeout=5)
+    client.get_signing_key('a')
+    time.sleep(1.1)
+
+    # El refresco en segundo plano queda colgado en el servidor
+    jwks.colgar_siguiente = True
+    client.get_signing_key('a')
+    time.sleep(0.1)
+    jwks.keys.append(_jwk('b'))
+
+    inicio = time.monotonic()
+    assert client.get_signing_key('b').key_id == 'b'
+    assert time.monotonic() - inicio < 1
+    # El fetch del kid nuevo fue por otra conexión mientras el refresco seguía colgado
+    assert len(jwks.conexiones) == 2
+    jwks.liberar_colgada.set()
@@ -0,0 +1,69 @@
+import json
+from decimal import Decimal
+
+import jwt
+import pytest
+
+import dynamodb
+import listar_compras
+from checkout import construir_compra
+
+TOKEN = jwt.encode({'user_id': 'u1', 'tenant_id': 't1', 'email': 'u1@example.com'},
+                   'mi-jwt-secret-super-seguro-y-secreto', algorithm='HS256')
+
+
+@pytest.fixture
+def compras(aws):
+    productos = [{'codigo': f'P{i}', 'nombre': f'Producto {i}', 'precio_unitario': Decimal('10'),
+                  'cantidad': 1, 'subtotal': Decimal('10')} for i in range(3)]
+    table = aws.Table(dynamodb.COMPRAS_TABLE)
+    for _ in range(2):
+        table.put_item(Item=construir_compra('t1', 'u1', productos, Decimal('30'), 'Calle 1', 'tarjeta'))
+    return aws
+
+
+@pytest.fixture
+def queries(compras):
+    """Parámetros de cada Query tal como salen hacia DynamoDB"""
+    enviadas = []
+
+    def capturar(params, **kwargs):
+        enviadas.append(json.loads(params['body']))
+
+    eventos = dynamodb.get_compras_table().meta.client.meta.events
+    eventos.register('before-call.dynamodb.Query', capturar)
+    yield enviadas
+    eventos.unregister('before-call.dynamodb.Query', capturar)
+
+
+def _listar(fields):
+    evento = {'httpMethod': 'GET', 'headers': {'Authorization': f'Bearer {TOKEN}'},
+              'queryStringParameters': {'fields': fields}}
+    respuesta = listar_compras.lambda_handler(evento, None)
+    assert respuesta['statusCode'] == 200
+    return json.loads(respuesta['body'])['data']['compras']
+
+
+def test_resumen_devuelve_solo_los_campos_de_cabecera(queries):
+    compras = _listar('summary')
+
+    assert len(compras) == 2
+    for compra in compras:
+        assert set(compra) == set(dynamodb.COMPRA_SUMMARY_FIELDS)
+        assert compra['cantidad_productos'] == 3
+    # Se lee el GSI INCLUDE (sin productos), no el que proyecta el item completo
+    assert queries[0]['IndexName'] == dynamodb.COMPRAS_RESUMEN_INDEX
+
+
+def test_full_incluye_productos(queries):
+    compras = _listar('full')
+
+    assert [len(compra['productos']) for compra in compras] == [3, 3]
+    assert queries[0]['IndexName'] == 'UserComprasIndex'
+
+
+def test_listar_compras_usuario_en_resumen_no_trae_productos(compras):
+    items = dynamodb.listar_compras_usuario('t1', 'u1', summary=True)['Items']
+
+    assert len(items) == 2
+    assert all('productos' not in item for item in items)
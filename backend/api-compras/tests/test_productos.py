@@ -0,0 +1,60 @@
+import pytest
+
+import productos
+import resilience
+from resilience import ServicioNoDisponible
+
+
+class DynamoDBStandIn:
+    """Responde BatchGetItem dejando claves sin procesar, como DynamoDB cuando limita"""
+
+    def __init__(self, sin_procesar_por_llamada, max_llamadas_con_resto=None):
+        self.sin_procesar_por_llamada = sin_procesar_por_llamada
+        self.max_llamadas_con_resto = max_llamadas_con_resto
+        self.llamadas = []
+
+    def batch_get_item(self, RequestItems):
+        self.llamadas.append(RequestItems)
+        pedido = RequestItems[productos.PRODUCTOS_TABLE]
+        keys = pedido['Keys']
+        con_resto = self.max_llamadas_con_resto is None or len(self.llamadas) <= self.max_llamadas_con_resto
+        corte = len(keys) - self.sin_procesar_por_llamada if con_resto else len(keys)
+        corte = max(corte, 0)
+        response = {'Responses': {productos.PRODUCTOS_TABLE: [
+            {'SK': key['SK'], 'nombre': key['SK'], 'precio': 10} for key in keys[:corte]
+        ]}}
+        if keys[corte:]:
+            response['UnprocessedKeys'] = {productos.PRODUCTOS_TABLE: {**pedido, 'Keys': keys[corte:]}}
+        return response
+
+
+@pytest.fixture
+def esperas(monkeypatch):
+    registradas = []
+    monkeypatch.setattr(resilience.time, 'sleep', registradas.append)
+    resilience._circuitos.clear()
+    return registradas
+
+
+def test_unprocessed_keys_se_reintentan_con_backoff(monkeypatch, esperas):
+    stand_in = DynamoDBStandIn(sin_procesar_por_llamada=2, max_llamadas_con_resto=3)
+    monkeypatch.setattr(productos, 'dynamodb_con_plazo', lambda: stand_in)
+    codigos = [f'P{i}' for i in range(10)]
+
+    encontrados = productos._batch_get_catalogo('t1', codigos)
+
+    assert set(encontrados) == set(codigos)
+    assert len(stand_in.llamadas) == 4
+    # Una espera antes de cada reenvío, acotada por el tope exponencial del intento
+    assert len(esperas) == 3
+    for intento, espera in enumerate(esperas, start=1):
+        assert 0 <= espera <= min(resilience.BACKOFF_CAP_MS, resilience.BACKOFF_BASE_MS * 2 ** intento) / 1000
+
+
+def test_unprocessed_keys_permanentes_no_giran_sin_fin(monkeypatch, esperas):
+    stand_in = DynamoDBStandIn(sin_procesar_por_llamada=1)
+    monkeypatch.setattr(productos, 'dynamodb_con_plazo', lambda: stand_in)
+
+    with pytest.raises(ServicioNoDisponible):
+        productos._batch_get_catalogo('t1', ['P1', 'P2'])
+    assert len(stand_in.llamadas) == resilience.MAX_INTENTOS
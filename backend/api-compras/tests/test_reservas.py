@@ -0,0 +1,163 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+import compras_stream
+import dynamodb
+import liberar_reservas
+import reservas
+from checkout import CheckoutError
+from dynamodb import StockInsuficienteError
+from resilience import ServicioNoDisponible
+
+CODIGO = 'PROD-FLASH'
+BODY = {
+    'productos': [{'codigo': CODIGO, 'cantidad': 1}],
+    'direccion_entrega': 'Av. Siempre Viva 742',
+    'metodo_pago': 'TARJETA'
+}
+
+
+@pytest.fixture
+def peticiones_atomicas(monkeypatch):
+    """
+    moto no es thread-safe: se serializan sus peticiones, así que los hilos solo
+    intercalan el trabajo del cliente (catálogo, armado, reintentos) y nunca dos
+    escrituras a la vez. La carrera real se prueba con scripts/stress_reservas.py
+    contra DynamoDB Local o una tabla de dev.
+    """
+    from moto.core.botocore_stubber import BotocoreStubber
+    original = BotocoreStubber.__call__
+    lock = threading.Lock()
+
+    def atomico(self, *args, **kwargs):
+        with lock:
+            return original(self, *args, **kwargs)
+
+    monkeypatch.setattr(BotocoreStubber, '__call__', atomico)
+
+
+def _sembrar(aws, tenant_id, stock):
+    aws.Table(dynamodb.PRODUCTOS_TABLE).put_item(Item={
+        'tenant_id': tenant_id, 'SK': f'PRODUCTO#{CODIGO}', 'codigo': CODIGO,
+        'nombre': 'Producto flash', 'precio': 10, 'stock': stock
+    })
+
+
+def _stock(aws, tenant_id):
+    item = aws.Table(dynamodb.PRODUCTOS_TABLE).get_item(
+        Key={'tenant_id': tenant_id, 'SK': f'PRODUCTO#{CODIGO}'}, ConsistentRead=True)['Item']
+    return int(item['stock'])
+
+
+def _hold(aws, tenant_id, reserva_id):
+    return aws.Table(dynamodb.COMPRAS_TABLE).get_item(
+        Key=reservas.reserva_key(tenant_id, reserva_id), ConsistentRead=True).get('Item')
+
+
+def _estado_compra(tenant_id, compra_id):
+    return dynamodb.obtener_compra(tenant_id, compra_id, consistent_read=True, use_cache=False)['estado']
+
+
+def _vencer(aws, tenant_id, reserva_id):
+    aws.Table(dynamodb.COMPRAS_TABLE).update_item(
+        Key=reservas.reserva_key(tenant_id, reserva_id),
+        UpdateExpression='SET expira_en = :vencida',
+        ExpressionAttributeValues={':vencida': int(time.time()) - 1})
+
+
+def test_reservas_intercaladas_cuadran_el_stock(aws, peticiones_atomicas):
+    stock, compradores = 20, 60
+    _sembrar(aws, 't-flash', stock)
+
+    def reservar(i):
+        try:
+            return reservas.crear_reserva('t-flash', f'user-{i}', BODY), f'user-{i}'
+        except StockInsuficienteError:
+            return None, f'user-{i}'
+
+    with ThreadPoolExecutor(max_workers=16) as executor:
+        resultados = [(r, user) for r, user in executor.map(reservar, range(compradores)) if r]
+
+    assert len(resultados) == stock
+    assert _stock(aws, 't-flash') == 0
+
+    # Confirmar la mitad y liberar el resto dos veces (reintento del stream): el stock cuadra
+    mitad = len(resultados) // 2
+    for reserva, user in resultados[:mitad]:
+        reservas.confirmar_reserva('t-flash', user, reserva['reserva_id'])
+    for reserva, _ in resultados[mitad:]:
+        hold = _hold(aws, 't-flash', reserva['reserva_id'])
+        assert reservas.liberar_reserva(hold) is True
+        assert reservas.liberar_reserva(hold) is False
+
+    assert _stock(aws, 't-flash') == stock - mitad
+    estados = [_estado_compra('t-flash', r['compra_id']) for r, _ in resultados]
+    assert estados.count('COMPLETADA') == mitad
+    assert estados.count('EXPIRADA') == len(resultados) - mitad
+
+
+def test_hold_no_aparece_como_compra_del_usuario(aws):
+    _sembrar(aws, 't-gsi', 5)
+    reserva = reservas.crear_reserva('t-gsi', 'u1', BODY)
+
+    hold = _hold(aws, 't-gsi', reserva['reserva_id'])
+    assert hold['owner_user_id'] == 'u1' and 'user_id' not in hold
+    compras = dynamodb.listar_compras_usuario('t-gsi', 'u1')['Items']
+    assert [c['compra_id'] for c in compras] == [reserva['compra_id']]
+
+    with pytest.raises(CheckoutError) as error:
+        reservas.confirmar_reserva('t-gsi', 'otro', reserva['reserva_id'])
+    assert error.value.status_code == 404
+    reservas.confirmar_reserva('t-gsi', 'u1', reserva['reserva_id'])
+    # Confirmada sale del índice de vencimientos
+    assert 'reserva_particion' not in _hold(aws, 't-gsi', reserva['reserva_id'])
+
+
+def test_barrido_libera_reservas_vencidas(aws):
+    _sembrar(aws, 't-barrido', 5)
+    vencida = reservas.crear_reserva('t-barrido', 'u1', BODY)
+    vigente = reservas.crear_reserva('t-barrido', 'u2', BODY)
+    _vencer(aws, 't-barrido', vencida['reserva_id'])
+
+    response = liberar_reservas.lambda_handler({}, None)
+
+    assert response['statusCode'] == 200
+    assert _hold(aws, 't-barrido', vencida['reserva_id']) is None
+    assert _hold(aws, 't-barrido', vigente['reserva_id']) is not None
+    assert _estado_compra('t-barrido', vencida['compra_id']) == 'EXPIRADA'
+    assert _stock(aws, 't-barrido') == 4
+
+
+def _evento_remove(hold, secuencia):
+    from boto3.dynamodb.types import TypeSerializer
+    serializer = TypeSerializer()
+    return {
+        'eventName': 'REMOVE',
+        'dynamodb': {
+            'SequenceNumber': secuencia,
+            'Keys': {'tenant_id': {'S': hold['tenant_id']}, 'SK': {'S': hold['SK']}},
+            'OldImage': {k: serializer.serialize(v) for k, v in hold.items()}
+        }
+    }
+
+
+def test_stream_reporta_la_reserva_que_no_pudo_liberar(aws, monkeypatch):
+    _sembrar(aws, 't-stream', 5)
+    reserva = reservas.crear_reserva('t-stream', 'u1', BODY)
+    hold = _hold(aws, 't-stream', reserva['reserva_id'])
+
+    def caido(reserva):
+        raise ServicioNoDisponible('transacciones', 'circuito abierto')
+
+    monkeypatch.setattr(compras_stream, 'liberar_reserva', caido)
+    response = compras_stream.lambda_handler({'Records': [_evento_remove(hold, '100')]}, None)
+    assert response['batchItemFailures'] == [{'itemIdentifier': '100'}]
+
+    monkeypatch.undo()
+    response = compras_stream.lambda_handler({'Records': [_evento_remove(hold, '100')]}, None)
+    assert response['batchItemFailures'] == []
+    assert _estado_compra('t-stream', reserva['compra_id']) == 'EXPIRADA'
+
@@ -1,5 +1,6 @@
 const { createResponse, requireAuth } = require('../utils/auth');
 const { updateItem, getItem, getTable } = require('../utils/dynamodb');
+const { MAX_STOCK_SHARDS, esSharded, stockDisponible, ajustarStockSharded, configurarShards } = require('../utils/stock');
 
 const corsHeaders = {
     'Access-Control-Allow-Origin': '*',
@@ -41,7 +42,7 @@ const baseHandler = async (event, context) => {
         const camposPermitidos = ['nombre', 'descripcion', 'precio', 'categoria', 'stock', 'imagen_url', 'tags'];
         const camposEnviados = Object.keys(body).filter(key => camposPermitidos.includes(key));
 
-        if (camposEnviados.length === 0) {
+        if (camposEnviados.length === 0 && body.stock_shards === undefined) {
             return createResponse(400, { success: false, error: 'Debe enviar al menos un campo válido para actualizar' });
         }
 
@@ -79,6 +80,41 @@ const baseHandler = async (event, context) => {
             }
         }
 
+        if (body.stock_shards !== undefined) {
+            if (!Number.isInteger(body.stock_shards) || body.stock_shards < 2 || body.stock_shards > MAX_STOCK_SHARDS) {
+                return createResponse(400, { success: false, error: `stock_shards debe ser un entero entre 2 y ${MAX_STOCK_SHARDS}` });
+            }
+            if (esSharded(existingProduct.data) && existingProduct.data.stock_shards !== body.stock_shards) {
+                return createResponse(400, { success: false, error: 'El stock del producto ya está repartido en shards' });
+            }
+        }
+
+        // Activar el stock sharded: el stock actual se reparte en los items STOCK#<codigo>#<n>
+        let sharded = esSharded(existingProduct.data);
+        if (body.stock_shards !== undefined && !sharded) {
+            try {
+                await configurarShards(existingProduct.data, body.stock_shards);
+            } catch (err) {
+                if (err.code === 'TransactionCanceledException') {
+                    return createResponse(409, { success: false, error: 'El stock cambió mientras se repartía, reintente' });
+                }
+                throw err;
+            }
+            sharded = true;
+        }
+
+        // Con stock sharded el nuevo stock se reparte entre los shards, no en el item del producto
+        if (sharded && body.stock !== undefined) {
+            try {
+                await ajustarStockSharded(userContext.tenant_id, codigo, body.stock);
+            } catch (err) {
+                if (err.code === 'TransactionCanceledException') {
+                    return createResponse(409, { success: false, error: 'El stock cambió por ventas concurrentes, reintente' });
+                }
+                throw err;
+            }
+        }
+
         // Construir expresión de actualización
         let updateExpression = 'SET updated_at = :updated_at, updated_by = :updated_by';
         let expressionAttributeValues = {
@@ -87,7 +123,7 @@ const baseHandler = async (event, context) => {
         };
 
         // Agregar campos a actualizar
-        camposEnviados.forEach(campo => {
+        camposEnviados.filter(campo => !(sharded && campo === 'stock')).forEach(campo => {
             updateExpression += `, ${campo} = :${campo}`;
             expressionAttributeValues[`:${campo}`] = body[campo];
         });
@@ -114,7 +150,7 @@ const baseHandler = async (event, context) => {
             descripcion: producto.descripcion,
             precio: producto.precio,
             categoria: producto.categoria,
-            stock: producto.stock,
+            stock: await stockDisponible(producto),
             imagen_url: producto.imagen_url || '',
             tags: producto.tags || [],
             updated_at: producto.updated_at,
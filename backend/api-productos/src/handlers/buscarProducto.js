@@ -1,5 +1,6 @@
 const { createResponse, requireAuth } = require('../utils/auth');
 const { getItem, getTable } = require('../utils/dynamodb');
+const { stockDisponible } = require('../utils/stock');
 
 /**
  * @typedef {import('../utils/types').Product} Product
@@ -91,7 +92,8 @@ const baseHandler = async (event, context) => {
             descripcion: producto.descripcion,
             precio: producto.precio,
             categoria: producto.categoria,
-            stock: producto.stock,
+            // Con stock sharded el total está repartido en los items STOCK#<codigo>#<n>
+            stock: await stockDisponible(producto),
             imagen_url: producto.imagen_url || '',
             tags: producto.tags || [],
             activo: producto.activo,
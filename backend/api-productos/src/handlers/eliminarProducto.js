@@ -1,5 +1,6 @@
 const { createResponse, requireAuth } = require('../utils/auth');
-const { updateItem, getItem, getTable } = require('../utils/dynamodb');
+const { updateItem, getItem, getTable, transactWrite } = require('../utils/dynamodb');
+const { esSharded, accionesBorrarShards } = require('../utils/stock');
 
 
 
@@ -69,10 +70,26 @@ const baseHandler = async (event, context) => {
             ':deleted_at': new Date().toISOString()
         };
 
-        const result = await updateItem(table, key, updateExpression, expressionAttributeValues);
+        if (esSharded(existingProduct.data)) {
+            // Los shards de stock se borran en la misma transacción que desactiva el producto;
+            // api-compras no repone sobre un shard borrado (attribute_exists(SK))
+            await transactWrite([
+                {
+                    Update: {
+                        TableName: process.env.PRODUCTOS_TABLE,
+                        Key: key,
+                        UpdateExpression: updateExpression,
+                        ExpressionAttributeValues: expressionAttributeValues
+                    }
+                },
+                ...accionesBorrarShards(existingProduct.data)
+            ]);
+        } else {
+            const result = await updateItem(table, key, updateExpression, expressionAttributeValues);
 
-        if (result.error) {
-            return createResponse(500, { success: false, error: result.error });
+            if (result.error) {
+                return createResponse(500, { success: false, error: result.error });
+            }
         }
 
         // Respuesta uniforme
@@ -1,5 +1,6 @@
 const { createResponse, requireAuth } = require('../utils/auth');
 const { getTable } = require('../utils/dynamodb');
+const { conStockDisponible } = require('../utils/stock');
 
 /**
  * @typedef {import('../utils/types').Product} Product
@@ -90,7 +91,9 @@ const baseHandler = async (event, context) => {
         const result = await table.query(queryParams).promise();
 
         // Formatear respuesta
-        const productos = result.Items.map(producto => ({
+        // Los productos sharded suman sus shards (lecturas en paralelo)
+        const items = await conStockDisponible(result.Items);
+        const productos = items.map(producto => ({
             codigo: producto.codigo,
             nombre: producto.nombre,
             descripcion: producto.descripcion,
@@ -1,4 +1,5 @@
 const http = require('http');
+const { leerShards, sumar } = require('../utils/stock');
 
 const ES_URL = process.env.ELASTICSEARCH_URL;
 
@@ -22,6 +23,15 @@ const syncToElasticsearch = async (record) => {
     const tenantId = dynamodb.Keys.tenant_id.S;
     const sortKey = dynamodb.Keys.SK?.S;
     
+    // Una venta sobre stock sharded modifica un item STOCK#<codigo>#<n>: se reindexa solo el stock
+    if (sortKey && sortKey.startsWith('STOCK#') && eventName !== 'REMOVE') {
+        const codigo = sortKey.split('#')[1];
+        const stock = sumar(await leerShards(tenantId, codigo));
+        console.log(`Updating stock of product ${codigo} in ES`);
+        await updateInES(`productos_${tenantId.toLowerCase()}`, codigo, { stock });
+        return;
+    }
+
     // Solo procesar productos (SK que empiece con "PRODUCTO#")
     if (!sortKey || !sortKey.startsWith('PRODUCTO#')) {
         console.log('Skipping non-product record');
@@ -47,7 +57,9 @@ const syncToElasticsearch = async (record) => {
                     descripcion: newImage.descripcion?.S,
                     categoria: newImage.categoria?.S,
                     precio: parseFloat(newImage.precio?.N || 0),
-                    stock: parseInt(newImage.stock?.N || 0),
+                    stock: parseInt(newImage.stock_shards?.N || 0) > 0
+                        ? sumar(await leerShards(tenantId, productoId))
+                        : parseInt(newImage.stock?.N || 0),
                     imagen_url: newImage.imagen_url?.S || '',
                     tags: newImage.tags?.SS || [],
                     creado_en: newImage.creado_en?.S,
@@ -65,9 +77,18 @@ const syncToElasticsearch = async (record) => {
     }
 };
 
-const indexToES = async (indexName, docId, document) => {
-    const url = `${ES_URL}/${indexName}/_doc/${docId}`;
-    
+const indexToES = (indexName, docId, document) =>
+    writeToES('PUT', `${ES_URL}/${indexName}/_doc/${docId}`, document);
+
+// Actualización parcial: un documento aún no indexado se ignora (lo creará el item PRODUCTO#)
+const updateInES = (indexName, docId, campos) =>
+    writeToES('POST', `${ES_URL}/${indexName}/_update/${docId}`, { doc: campos })
+        .catch((error) => {
+            if (!/ES responded with 404/.test(error.message)) throw error;
+            console.log(`Product ${docId} not indexed yet, skipping stock update`);
+        });
+
+const writeToES = async (method, url, document) => {
     return new Promise((resolve, reject) => {
         const data = JSON.stringify(document);
         const urlObj = new URL(url);
@@ -75,8 +96,8 @@ const indexToES = async (indexName, docId, document) => {
         const options = {
             hostname: urlObj.hostname,
             port: urlObj.port,
-            path: urlObj.pathname,
-            method: 'PUT',
+            path: urlObj.pathname + urlObj.search,
+            method,
             headers: {
                 'Content-Type': 'application/json',
                 'Content-Length': data.length
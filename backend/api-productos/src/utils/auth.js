@@ -1,5 +1,11 @@
 const jwt = require('jsonwebtoken');
+const { JWKS_URL, ALGORITMOS_ASIMETRICOS, verificarConJwks } = require('./jwks');
+const { estaRevocado } = require('./revocaciones');
 const JWT_SECRET = process.env.JWT_SECRET;
+// Llavero HS256 {"kid": "secreto"} (JSON); los tokens sin kid usan JWT_SECRET
+const JWT_SECRETS = JSON.parse(process.env.JWT_SECRETS || '{}');
+// Aceptar tokens HS256 emitidos antes de migrar a claves asimétricas (ver rotar_clave_jwt.py)
+const JWT_ACEPTAR_HS256 = (process.env.JWT_ACEPTAR_HS256 || 'true').toLowerCase() === 'true';
 
 /**
  * Crea una respuesta HTTP estándar con headers CORS
@@ -18,15 +24,41 @@ const createResponse = (statusCode, body) => {
 };
 
 /**
- * Valida un token JWT y retorna el contexto del usuario
+ * Secreto HS256 según el kid del header
  */
-const validateJWT = (event) => {
+const secretForToken = (token) => {
+    const kid = jwt.decode(token, { complete: true })?.header?.kid;
+    if (kid === undefined) return JWT_SECRET;
+    const secret = JWT_SECRETS[kid];
+    if (!secret) throw new jwt.JsonWebTokenError('kid desconocido');
+    return secret;
+};
+
+/**
+ * Rechaza un token cuyo jti fue revocado (filtro Bloom de S3; la tabla solo ante un positivo)
+ */
+const checkRevoked = async (payload) => {
+    if (await estaRevocado(payload.jti)) throw { status: 401, message: 'Token revocado' };
+};
+
+/**
+ * Valida un token JWT y retorna el contexto del usuario. Los tokens EdDSA/ES256 se
+ * verifican con el JWKS de api-usuarios; los HS256 con el llavero mientras se acepten
+ */
+const validateJWT = async (event) => {
     const authHeader = event.headers?.Authorization || event.headers?.authorization;
     if (!authHeader) throw { status: 401, message: 'Token de autorización requerido' };
     const token = authHeader.startsWith('Bearer ') ? authHeader.split(' ')[1] : authHeader;
     try {
-        return jwt.verify(token, JWT_SECRET);
+        const alg = jwt.decode(token, { complete: true })?.header?.alg;
+        if (ALGORITMOS_ASIMETRICOS.includes(alg) && JWKS_URL) return await verificarConJwks(token);
+        if (alg === 'HS256' && (JWT_ACEPTAR_HS256 || !JWKS_URL)) {
+            return jwt.verify(token, secretForToken(token), { algorithms: ['HS256'] });
+        }
+        throw new jwt.JsonWebTokenError('Algoritmo no aceptado');
     } catch (err) {
+        // JWKS inalcanzable: el token no es inválido, no se pudo verificar
+        if (err.status) throw err;
         if (err.name === 'TokenExpiredError') throw { status: 401, message: 'Token expirado' };
         throw { status: 401, message: 'Token inválido' };
     }
@@ -44,7 +76,8 @@ const requireAuth = (handler) => {
 
         try {
             // Validar JWT
-            const payload = validateJWT(event);
+            const payload = await validateJWT(event);
+            await checkRevoked(payload);
             event.userContext = { user_id: payload.user_id, email: payload.email, tenant_id: payload.tenant_id };
 
             // Ejecutar handler original
@@ -69,4 +69,12 @@ async function updateItem(table, key, updateExpression, expressionAttributeValue
   }
 }
 
-module.exports = { getTable, getItem, createItem, updateItem };
+/**
+ * Ejecuta varias escrituras en una sola transacción (todas o ninguna).
+ * @param {Object[]} items  Acciones TransactItems (Put, Update, Delete, ConditionCheck)
+ */
+async function transactWrite(items) {
+  return docClient.transactWrite({ TransactItems: items }).promise();
+}
+
+module.exports = { getTable, getItem, createItem, updateItem, transactWrite };
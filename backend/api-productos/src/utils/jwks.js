@@ -0,0 +1,115 @@
+const crypto = require('crypto');
+
+// JWKS de api-usuarios: los tokens EdDSA/ES256 se verifican con la clave pública de su kid
+const JWKS_URL = process.env.JWKS_URL || '';
+const JWKS_LIFESPAN_MS = Number(process.env.JWKS_LIFESPAN || 300) * 1000;
+// Vencido el lifespan se sigue usando el JWKS hasta JWKS_MAX_STALE s más mientras se refresca
+const JWKS_MAX_STALE_MS = Number(process.env.JWKS_MAX_STALE || 3600) * 1000;
+// Mínimo entre refetches por kid desconocido: el kid viene de un header sin verificar
+const JWKS_MIN_REFRESH_MS = Number(process.env.JWKS_MIN_REFRESH_S || 10) * 1000;
+const JWKS_TIMEOUT_MS = Number(process.env.JWKS_TIMEOUT_MS || 2000);
+
+// Verificación de la firma JWS por algoritmo (ES256 firma r||s, no DER)
+const VERIFICADORES = {
+    EdDSA: (datos, key, firma) => crypto.verify(null, datos, key, firma),
+    ES256: (datos, key, firma) => crypto.verify('sha256', datos, { key, dsaEncoding: 'ieee-p1363' }, firma)
+};
+const ALGORITMOS_ASIMETRICOS = Object.keys(VERIFICADORES);
+
+class TokenInvalido extends Error {
+    constructor(message, name = 'JsonWebTokenError') {
+        super(message);
+        this.name = name;
+    }
+}
+
+// Cache por contenedor: kid -> { alg, key }
+let claves = null;
+let obtenidoEn = 0;
+let ultimoIntento = 0;
+let enCurso = null;
+
+const descargar = async () => {
+    const response = await fetch(JWKS_URL, { signal: AbortSignal.timeout(JWKS_TIMEOUT_MS) });
+    if (!response.ok) throw new Error(`JWKS respondió ${response.status}`);
+    const nuevas = new Map();
+    for (const jwk of (await response.json()).keys || []) {
+        if (!jwk.kid || !VERIFICADORES[jwk.alg]) continue;
+        try {
+            nuevas.set(jwk.kid, { alg: jwk.alg, key: crypto.createPublicKey({ key: jwk, format: 'jwk' }) });
+        } catch (err) {
+            console.log(`JWK ${jwk.kid} ignorada: ${err.message}`);
+        }
+    }
+    claves = nuevas;
+    obtenidoEn = Date.now();
+};
+
+/**
+ * Una sola descarga en curso por contenedor; las llamadas concurrentes esperan la misma
+ */
+const refrescar = () => {
+    if (!enCurso) {
+        ultimoIntento = Date.now();
+        enCurso = descargar().finally(() => { enCurso = null; });
+    }
+    return enCurso;
+};
+
+/**
+ * Clave pública del kid. Un JWKS vencido se refresca en segundo plano mientras no
+ * supere el máximo de staleness; si no se puede descargar y no hay uno usable, 503
+ */
+const claveParaKid = async (kid) => {
+    const edad = Date.now() - obtenidoEn;
+    const usable = claves !== null && edad <= JWKS_LIFESPAN_MS + JWKS_MAX_STALE_MS;
+    const desconocido = claves !== null && !claves.has(kid) && Date.now() - ultimoIntento >= JWKS_MIN_REFRESH_MS;
+    try {
+        if (!usable || desconocido) {
+            await refrescar();
+        } else if (edad > JWKS_LIFESPAN_MS) {
+            refrescar().catch((err) => console.log(`No se pudo refrescar el JWKS: ${err.message}`));
+        }
+    } catch (err) {
+        if (!usable) throw { status: 503, message: 'Servicio de autenticación no disponible, reintente' };
+        console.log(`No se pudo refrescar el JWKS: ${err.message}`);
+    }
+    return claves.get(kid);
+};
+
+const decodificar = (parte) => JSON.parse(Buffer.from(parte, 'base64url').toString('utf8'));
+
+/**
+ * Verifica un token EdDSA/ES256 contra el JWKS y retorna su payload.
+ * Cada clave solo acepta el algoritmo con que se publicó (sin confusión de algoritmos)
+ */
+const verificarConJwks = async (token) => {
+    const partes = token.split('.');
+    if (partes.length !== 3) throw new TokenInvalido('Token mal formado');
+    let header;
+    let payload;
+    try {
+        header = decodificar(partes[0]);
+        payload = decodificar(partes[1]);
+    } catch (err) {
+        throw new TokenInvalido('Token mal formado');
+    }
+
+    const entrada = await claveParaKid(header.kid);
+    if (!entrada || entrada.alg !== header.alg) throw new TokenInvalido('kid desconocido');
+    const datos = Buffer.from(`${partes[0]}.${partes[1]}`);
+    if (!VERIFICADORES[entrada.alg](datos, entrada.key, Buffer.from(partes[2], 'base64url'))) {
+        throw new TokenInvalido('Firma inválida');
+    }
+
+    const ahora = Date.now() / 1000;
+    if (typeof payload.exp === 'number' && ahora >= payload.exp) throw new TokenInvalido('Token expirado', 'TokenExpiredError');
+    if (typeof payload.nbf === 'number' && ahora < payload.nbf) throw new TokenInvalido('Token aún no válido');
+    return payload;
+};
+
+module.exports = {
+    JWKS_URL,
+    ALGORITMOS_ASIMETRICOS,
+    verificarConJwks
+};
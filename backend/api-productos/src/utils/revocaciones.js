@@ -0,0 +1,123 @@
+const crypto = require('crypto');
+const AWS = require('aws-sdk');
+const { getTable, getItem } = require('./dynamodb');
+
+const s3 = new AWS.S3();
+
+// Filtro Bloom de jti revocados que publica api-usuarios (compilar_revocaciones); mismo
+// formato que backend/shared-layer/python/bloom.py
+const REVOCACIONES_BUCKET = process.env.REVOCACIONES_BUCKET || '';
+const REVOCACIONES_KEY = process.env.REVOCACIONES_KEY || 'revocaciones/bloom.bin';
+// jti revocados (logout) que registra api-usuarios; solo se consulta ante un positivo del filtro
+const TOKENS_REVOCADOS_TABLE = process.env.TOKENS_REVOCADOS_TABLE;
+const revocados = TOKENS_REVOCADOS_TABLE ? getTable(TOKENS_REVOCADOS_TABLE) : null;
+// Cada cuánto se revalida el blob (GET condicional con ETag, en segundo plano)
+const REVOCACIONES_REFRESH_MS = Number(process.env.REVOCACIONES_REFRESH_S || 30) * 1000;
+// Un filtro más viejo que esto ya no es confiable: se consulta la tabla en cada request
+const REVOCACIONES_MAX_EDAD_S = Number(process.env.REVOCACIONES_MAX_EDAD_S || 600);
+// Resultados exactos de los positivos del filtro (incluye falsos positivos)
+const MAX_VERIFICADOS = 4096;
+
+const MAGIC = 'BLM2';
+const CABECERA_BYTES = 21; // >4sIBIQ: magic, m, k, n, generado
+
+/**
+ * Lee el blob: { m, k, n, generado, bits }. Lanza si el formato no coincide
+ */
+const leerFiltro = (data) => {
+    if (data.length < CABECERA_BYTES || data.toString('latin1', 0, 4) !== MAGIC) {
+        throw new Error('Blob de filtro Bloom inválido');
+    }
+    const m = data.readUInt32BE(4);
+    const filtro = {
+        m,
+        k: data.readUInt8(8),
+        n: data.readUInt32BE(9),
+        generado: Number(data.readBigUInt64BE(13)),
+        bits: data.subarray(CABECERA_BYTES)
+    };
+    if (filtro.bits.length !== Math.ceil(m / 8)) throw new Error('Blob de filtro Bloom inválido');
+    return filtro;
+};
+
+/**
+ * Doble hashing sobre SHA-256: posición i = (h1 + i * h2) mod m, como _posiciones en bloom.py
+ */
+const contiene = (filtro, elemento) => {
+    const digest = crypto.createHash('sha256').update(elemento, 'utf8').digest();
+    const h1 = digest.readBigUInt64LE(0);
+    const h2 = digest.readBigUInt64LE(8) | 1n;
+    const m = BigInt(filtro.m);
+    for (let i = 0n; i < BigInt(filtro.k); i++) {
+        const pos = Number((h1 + i * h2) % m);
+        if (!(filtro.bits[pos >> 3] & (1 << (pos & 7)))) return false;
+    }
+    return true;
+};
+
+// Estado por contenedor
+let filtro = null;
+let etag = null;
+let verificados = new Map();
+let ultimoIntento = null;
+let enCurso = null;
+
+const descargar = async () => {
+    const params = { Bucket: REVOCACIONES_BUCKET, Key: REVOCACIONES_KEY };
+    if (etag) params.IfNoneMatch = etag;
+    let response;
+    try {
+        response = await s3.getObject(params).promise();
+    } catch (err) {
+        if (err.statusCode === 304 || err.code === 'NotModified') return;
+        throw err;
+    }
+    // Un jti revocado después de verificarlo como falso positivo aparece en el filtro nuevo
+    filtro = leerFiltro(response.Body);
+    verificados = new Map();
+    etag = response.ETag;
+};
+
+/**
+ * Una sola descarga en curso por contenedor; la primera se espera y las siguientes
+ * corren en segundo plano
+ */
+const filtroActual = async () => {
+    const primeraCarga = ultimoIntento === null;
+    if (!enCurso && (primeraCarga || Date.now() - ultimoIntento >= REVOCACIONES_REFRESH_MS)) {
+        ultimoIntento = Date.now();
+        enCurso = descargar()
+            .catch((err) => console.log(`No se pudo cargar el filtro de revocaciones: ${err.message}`))
+            .finally(() => { enCurso = null; });
+        if (primeraCarga) await enCurso;
+    }
+    if (filtro === null || Date.now() / 1000 - filtro.generado > REVOCACIONES_MAX_EDAD_S) return null;
+    return filtro;
+};
+
+/**
+ * Lectura exacta en la tabla; si no responde no se puede decidir (503)
+ */
+const revocadoEnTabla = async (jti) => {
+    const { data, error } = await getItem(revocados, { jti });
+    if (error) throw { status: 503, message: 'Servicio de autenticación no disponible, reintente' };
+    return Boolean(data);
+};
+
+/**
+ * True si el jti fue revocado. El filtro descarta en memoria; solo sus positivos van a DynamoDB
+ */
+const estaRevocado = async (jti) => {
+    if (!revocados || !jti) return false;
+    const actual = REVOCACIONES_BUCKET ? await filtroActual() : null;
+    if (actual === null) return revocadoEnTabla(jti);
+    if (!contiene(actual, jti)) return false;
+
+    if (!verificados.has(jti)) {
+        if (verificados.size >= MAX_VERIFICADOS) verificados.clear();
+        verificados.set(jti, await revocadoEnTabla(jti));
+    }
+    return verificados.get(jti);
+};
+
+module.exports = { leerFiltro, contiene, estaRevocado };
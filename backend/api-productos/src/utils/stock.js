@@ -0,0 +1,156 @@
+const { getTable, transactWrite } = require('./dynamodb');
+
+// Inventario sharded (api-compras descuenta del shard en el checkout): el stock de un
+// producto con stock_shards = N vive en N items SK = STOCK#<codigo>#<n> y su atributo
+// stock queda en 0. Leer, reponer y eliminar deben pasar por aquí.
+const MAX_STOCK_SHARDS = 64;
+// Reintentos de un ajuste cuyos shards cambiaron por ventas concurrentes
+const AJUSTE_REINTENTOS = 3;
+
+const stockShardKey = (tenantId, codigo, n) => ({ tenant_id: tenantId, SK: `STOCK#${codigo}#${n}` });
+
+const esSharded = (producto) => Number(producto.stock_shards || 0) > 0;
+
+/**
+ * Shards del producto con su stock (lectura consistente)
+ */
+const leerShards = async (tenantId, codigo) => {
+    const result = await getTable(process.env.PRODUCTOS_TABLE).query({
+        KeyConditionExpression: 'tenant_id = :tenant_id AND begins_with(SK, :prefix)',
+        ExpressionAttributeValues: { ':tenant_id': tenantId, ':prefix': `STOCK#${codigo}#` },
+        ProjectionExpression: 'SK, stock',
+        ConsistentRead: true
+    }).promise();
+    return result.Items.map((item) => ({ SK: item.SK, stock: Number(item.stock || 0) }));
+};
+
+const sumar = (shards) => shards.reduce((total, shard) => total + shard.stock, 0);
+
+/**
+ * Stock disponible: suma de los shards si el producto está sharded, o su atributo stock
+ */
+const stockDisponible = async (producto) => {
+    if (!esSharded(producto)) return producto.stock;
+    return sumar(await leerShards(producto.tenant_id, producto.codigo));
+};
+
+/**
+ * Copia de los productos con el stock resuelto (los shards se leen en paralelo)
+ */
+const conStockDisponible = (productos) =>
+    Promise.all(productos.map(async (producto) => ({ ...producto, stock: await stockDisponible(producto) })));
+
+/**
+ * Reparte cantidad en n partes lo más parejas posible
+ */
+const repartir = (cantidad, n) => Array.from({ length: n }, (_, i) => Math.floor(cantidad / n) + (i < cantidad % n ? 1 : 0));
+
+/**
+ * Acciones que llevan el total de los shards de leido a objetivo: una reposición se suma
+ * repartida entre todos los shards; una baja se descuenta de los que tienen stock,
+ * con la condición stock >= cantidad para no pisar ventas concurrentes
+ */
+const accionesAjuste = (shards, objetivo) => {
+    const tabla = process.env.PRODUCTOS_TABLE;
+    const delta = objetivo - sumar(shards);
+    if (delta >= 0) {
+        return repartir(delta, shards.length)
+            .map((cantidad, i) => ({ cantidad, shard: shards[i] }))
+            .filter(({ cantidad }) => cantidad > 0)
+            .map(({ cantidad, shard }) => ({
+                Update: {
+                    TableName: tabla,
+                    Key: { tenant_id: shard.tenant_id, SK: shard.SK },
+                    UpdateExpression: 'ADD stock :cantidad',
+                    ConditionExpression: 'attribute_exists(SK)',
+                    ExpressionAttributeValues: { ':cantidad': cantidad }
+                }
+            }));
+    }
+    let restante = -delta;
+    const acciones = [];
+    for (const shard of [...shards].sort((a, b) => b.stock - a.stock)) {
+        if (restante === 0) break;
+        const cantidad = Math.min(shard.stock, restante);
+        restante -= cantidad;
+        acciones.push({
+            Update: {
+                TableName: tabla,
+                Key: { tenant_id: shard.tenant_id, SK: shard.SK },
+                UpdateExpression: 'SET stock = stock - :cantidad',
+                ConditionExpression: 'stock >= :cantidad',
+                ExpressionAttributeValues: { ':cantidad': cantidad }
+            }
+        });
+    }
+    return acciones;
+};
+
+/**
+ * Fija el stock de un producto sharded en nuevoStock repartiendo la diferencia entre sus
+ * shards. Si una venta concurrente cambia un shard entre la lectura y la escritura se
+ * relee y reintenta. Retorna el stock resultante
+ */
+const ajustarStockSharded = async (tenantId, codigo, nuevoStock) => {
+    for (let intento = 1; ; intento++) {
+        const shards = (await leerShards(tenantId, codigo)).map((shard) => ({ ...shard, tenant_id: tenantId }));
+        const acciones = accionesAjuste(shards, nuevoStock);
+        if (acciones.length === 0) return nuevoStock;
+        try {
+            await transactWrite(acciones);
+            return nuevoStock;
+        } catch (err) {
+            if (err.code !== 'TransactionCanceledException' || intento >= AJUSTE_REINTENTOS) throw err;
+        }
+    }
+};
+
+/**
+ * Activa el modo sharded: reparte el stock actual en n shards y marca el producto.
+ * Falla (ConditionalCheckFailed) si el stock cambió entretanto o ya estaba sharded
+ */
+const configurarShards = async (producto, n) => {
+    const tabla = process.env.PRODUCTOS_TABLE;
+    const stock = Number(producto.stock || 0);
+    await transactWrite([
+        ...repartir(stock, n).map((cantidad, i) => ({
+            Put: {
+                TableName: tabla,
+                Item: { ...stockShardKey(producto.tenant_id, producto.codigo, i), stock: cantidad },
+                ConditionExpression: 'attribute_not_exists(SK)'
+            }
+        })),
+        {
+            Update: {
+                TableName: tabla,
+                Key: { tenant_id: producto.tenant_id, SK: producto.SK },
+                UpdateExpression: 'SET stock_shards = :n, stock = :cero',
+                ConditionExpression: 'stock = :stock AND attribute_not_exists(stock_shards)',
+                ExpressionAttributeValues: { ':n': n, ':cero': 0, ':stock': stock }
+            }
+        }
+    ]);
+};
+
+/**
+ * Acciones que borran los shards de un producto (para la misma transacción que lo elimina)
+ */
+const accionesBorrarShards = (producto) =>
+    Array.from({ length: Number(producto.stock_shards || 0) }, (_, i) => ({
+        Delete: {
+            TableName: process.env.PRODUCTOS_TABLE,
+            Key: stockShardKey(producto.tenant_id, producto.codigo, i)
+        }
+    }));
+
+module.exports = {
+    MAX_STOCK_SHARDS,
+    esSharded,
+    leerShards,
+    sumar,
+    stockDisponible,
+    conStockDisponible,
+    ajustarStockSharded,
+    configurarShards,
+    accionesBorrarShards
+};
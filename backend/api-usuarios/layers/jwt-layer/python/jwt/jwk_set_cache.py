@@ -1,3 +1,4 @@
+import threading
 import time
 from typing import Optional
 
@@ -5,9 +6,14 @@ from .api_jwk import PyJWKSet, PyJWTSetWithTimestamp
 
 
 class JWKSetCache:
-    def __init__(self, lifespan: int) -> None:
+    def __init__(self, lifespan: int, max_stale: int = 0) -> None:
         self.jwk_set_with_timestamp: Optional[PyJWTSetWithTimestamp] = None
         self.lifespan = lifespan
+        # Seconds past ``lifespan`` during which the expired set may still be
+        # served while it is refreshed in the background. 0 disables it.
+        self.max_stale = max_stale
+        self._refresh_lock = threading.Lock()
+        self._refreshing = False
 
     def put(self, jwk_set: PyJWKSet) -> None:
         if jwk_set is not None:
@@ -22,6 +28,13 @@ class JWKSetCache:
 
         return self.jwk_set_with_timestamp.get_jwk_set()
 
+    def get_stale(self) -> Optional[PyJWKSet]:
+        """Return the cached set, even if expired, while within ``max_stale``."""
+        if self.jwk_set_with_timestamp is None or self.is_too_stale():
+            return None
+
+        return self.jwk_set_with_timestamp.get_jwk_set()
+
     def is_expired(self) -> bool:
         return (
             self.jwk_set_with_timestamp is not None
@@ -29,3 +42,25 @@ class JWKSetCache:
             and time.monotonic()
             > self.jwk_set_with_timestamp.get_timestamp() + self.lifespan
         )
+
+    def is_too_stale(self) -> bool:
+        return (
+            self.jwk_set_with_timestamp is not None
+            and self.lifespan > -1
+            and time.monotonic()
+            > self.jwk_set_with_timestamp.get_timestamp()
+            + self.lifespan
+            + self.max_stale
+        )
+
+    def begin_refresh(self) -> bool:
+        """Claim the background refresh slot; False if a refresh is running."""
+        with self._refresh_lock:
+            if self._refreshing:
+                return False
+            self._refreshing = True
+            return True
+
+    def end_refresh(self) -> None:
+        with self._refresh_lock:
+            self._refreshing = False
@@ -1,14 +1,16 @@
+import http.client
 import json
-import urllib.request
+import threading
+import time
 from functools import lru_cache
 from ssl import SSLContext
-from typing import Any, Dict, List, Optional
-from urllib.error import URLError
+from typing import Any, Dict, List, Optional, Tuple
 
 from .api_jwk import PyJWK, PyJWKSet
 from .api_jwt import decode_complete as decode_token
 from .exceptions import PyJWKClientConnectionError, PyJWKClientError
 from .jwk_set_cache import JWKSetCache
+from .jwks_transport import HTTPTransport, JWKSTransport
 
 
 class PyJWKClient:
@@ -22,6 +24,10 @@ class PyJWKClient:
         headers: Optional[Dict[str, Any]] = None,
         timeout: int = 30,
         ssl_context: Optional[SSLContext] = None,
+        max_stale: int = 0,
+        min_refresh_interval: float = 0,
+        transport: Optional[JWKSTransport] = None,
+        background_timeout: float = 5,
     ):
         if headers is None:
             headers = {}
@@ -30,6 +36,27 @@ class PyJWKClient:
         self.headers = headers
         self.timeout = timeout
         self.ssl_context = ssl_context
+        # Keep-alive connections are reused across fetches; any object with
+        # get(url, headers) -> (status, headers, body) can be plugged in.
+        self.transport = transport or HTTPTransport(timeout, ssl_context)
+        # Background refreshes use their own connection and a shorter timeout:
+        # a hung refresh must not hold the lock a foreground fetch needs. A
+        # custom transport is shared, so it should not serialize requests.
+        self._background_transport = transport or HTTPTransport(
+            min(timeout, background_timeout), ssl_context
+        )
+        # (ETag, data) of the last 200 response, replaced as one tuple since
+        # foreground and background fetches may overlap. The ETag is sent as
+        # If-None-Match so an unchanged JWKS comes back as a bodyless 304.
+        self._validator: Tuple[Optional[str], Any] = (None, None)
+        self._parsed: Tuple[Any, Optional[PyJWKSet]] = (None, None)
+        # Minimum seconds between fetches triggered by unknown kids or stale
+        # refreshes, so forged kids cannot turn every request into a fetch.
+        self.min_refresh_interval = min_refresh_interval
+        self._fetch_lock = threading.Lock()
+        self._fetch_count = 0
+        self._last_fetch_result: Tuple[Any, Optional[PyJWKClientError]] = (None, None)
+        self._last_fetch_attempt: Optional[float] = None
 
         if cache_jwk_set:
             # Init jwt set cache with default or given lifespan.
@@ -38,7 +65,13 @@ class PyJWKClient:
                 raise PyJWKClientError(
                     f'Lifespan must be greater than 0, the input is "{lifespan}"'
                 )
-            self.jwk_set_cache = JWKSetCache(lifespan)
+            # With max_stale > 0 an expired set keeps being served for up to
+            # max_stale seconds while it is refreshed in a background thread.
+            if max_stale < 0:
+                raise PyJWKClientError(
+                    f'Max stale must not be negative, the input is "{max_stale}"'
+                )
+            self.jwk_set_cache = JWKSetCache(lifespan, max_stale)
         else:
             self.jwk_set_cache = None
 
@@ -49,36 +82,111 @@ class PyJWKClient:
                 self.get_signing_key
             )  # type: ignore
 
-    def fetch_data(self) -> Any:
+    def fetch_data(self, transport: Optional[JWKSTransport] = None) -> Any:
         jwk_set: Any = None
+        self._last_fetch_attempt = time.monotonic()
+        headers = dict(self.headers)
+        etag, last_data = self._validator
+        if etag is not None and last_data is not None:
+            headers["If-None-Match"] = etag
         try:
-            r = urllib.request.Request(url=self.uri, headers=self.headers)
-            with urllib.request.urlopen(
-                r, timeout=self.timeout, context=self.ssl_context
-            ) as response:
-                jwk_set = json.load(response)
-        except (URLError, TimeoutError) as e:
+            status, response_headers, body = (transport or self.transport).get(
+                self.uri, headers
+            )
+        except (OSError, http.client.HTTPException) as e:
             raise PyJWKClientConnectionError(
                 f'Fail to fetch data from the url, err: "{e}"'
             ) from e
+
+        if status == 304 and last_data is not None:
+            # Unchanged: reuse the parsed data (and the PyJWKSet built from it).
+            jwk_set = last_data
+        elif 200 <= status < 300:
+            jwk_set = json.loads(body)
+            self._validator = (response_headers.get("etag"), jwk_set)
         else:
-            return jwk_set
-        finally:
-            if self.jwk_set_cache is not None:
-                self.jwk_set_cache.put(jwk_set)
+            raise PyJWKClientConnectionError(
+                f'Fail to fetch data from the url, err: "HTTP Error {status}"'
+            )
+
+        # A failed fetch keeps the previous set; get_stale() bounds its age.
+        if self.jwk_set_cache is not None:
+            self.jwk_set_cache.put(jwk_set)
+        return jwk_set
+
+    def _fetch_single_flight(self) -> Any:
+        """Fetch the JWKS once for all concurrent callers.
+
+        Callers that arrive while a fetch is in flight wait for it and share its
+        result (or error) instead of issuing their own request.
+        """
+        count = self._fetch_count
+        with self._fetch_lock:
+            if self._fetch_count == count:
+                try:
+                    self._last_fetch_result = (self.fetch_data(), None)
+                except PyJWKClientError as e:
+                    self._last_fetch_result = (None, e)
+                self._fetch_count += 1
+            data, error = self._last_fetch_result
+
+        if error is not None:
+            raise error
+        return data
+
+    def _refresh_allowed(self) -> bool:
+        return (
+            self._last_fetch_attempt is None
+            or time.monotonic() - self._last_fetch_attempt
+            >= self.min_refresh_interval
+        )
+
+    def _refresh_in_background(self) -> None:
+        cache = self.jwk_set_cache
+        if (
+            cache is None
+            or not self._refresh_allowed()
+            or not cache.begin_refresh()
+        ):
+            return
+
+        def refresh() -> None:
+            # Not single-flighted with foreground fetches: begin_refresh()
+            # already allows one refresh at a time, and a foreground caller
+            # (e.g. an unknown kid) never waits for this one.
+            try:
+                self.fetch_data(self._background_transport)
+            except PyJWKClientError:
+                # Keep serving the stale set; callers fetch in the foreground
+                # once it is older than max_stale.
+                pass
+            finally:
+                cache.end_refresh()
+
+        threading.Thread(target=refresh, name="jwks-refresh", daemon=True).start()
 
     def get_jwk_set(self, refresh: bool = False) -> PyJWKSet:
         data = None
         if self.jwk_set_cache is not None and not refresh:
             data = self.jwk_set_cache.get()
+            if data is None:
+                # Stale-while-revalidate: answer from the expired set and
+                # refresh it off the request path.
+                data = self.jwk_set_cache.get_stale()
+                if data is not None:
+                    self._refresh_in_background()
 
         if data is None:
-            data = self.fetch_data()
+            data = self._fetch_single_flight()
 
         if not isinstance(data, dict):
             raise PyJWKClientError("The JWKS endpoint did not return a JSON object")
 
-        return PyJWKSet.from_dict(data)
+        source, jwk_set = self._parsed
+        if source is not data or jwk_set is None:
+            jwk_set = PyJWKSet.from_dict(data)
+            self._parsed = (data, jwk_set)
+        return jwk_set
 
     def get_signing_keys(self, refresh: bool = False) -> List[PyJWK]:
         jwk_set = self.get_jwk_set(refresh)
@@ -99,6 +207,11 @@ class PyJWKClient:
 
         if not signing_key:
             # If no matching signing key from the jwk set, refresh the jwk set and try again.
+            # The kid comes from an unverified header, so refreshes are rate limited.
+            if not self._refresh_allowed():
+                raise PyJWKClientError(
+                    f'Unable to find a signing key that matches: "{kid}"'
+                )
             signing_keys = self.get_signing_keys(refresh=True)
             signing_key = self.match_kid(signing_keys, kid)
 
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""
+Compara el costo de firmar y verificar tokens HS256, EdDSA (Ed25519) y ES256.
+
+    python scripts/benchmark_jwt.py --iteraciones 5000
+
+Usa el PyJWT del layer (requiere cryptography instalado) y un payload como el
+de login_usuario. La verificación es el costo que paga cada request en los
+validadores (api-compras / authorizer); la firma solo se paga en login/refresh.
+"""
+import argparse
+import os
+import sys
+import time
+from datetime import datetime, timedelta
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layers', 'jwt-layer', 'python'))
+import jwt
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+
+def medir(fn, iteraciones):
+    fn()
+    inicio = time.perf_counter()
+    for _ in range(iteraciones):
+        fn()
+    return (time.perf_counter() - inicio) / iteraciones * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--iteraciones', type=int, default=2000)
+    args = parser.parse_args()
+
+    payload = {
+        'user_id': 'user_6f1c3e2a-0000-4000-8000-000000000000',
+        'email': 'cliente@example.com',
+        'tenant_id': 'tenant-demo',
+        'exp': datetime.utcnow() + timedelta(hours=1)
+    }
+    ed_key = ed25519.Ed25519PrivateKey.generate()
+    ec_key = ec.generate_private_key(ec.SECP256R1())
+    casos = [
+        ('HS256', 'secreto-compartido-de-32-bytes-minimo!', 'secreto-compartido-de-32-bytes-minimo!'),
+        ('EdDSA', ed_key, ed_key.public_key()),
+        ('ES256', ec_key, ec_key.public_key()),
+    ]
+
+    print(f"{args.iteraciones} iteraciones por operación")
+    print(f"{'alg':<7} {'firmar µs':>10} {'verificar µs':>13} {'largo token':>12}")
+    for alg, clave_firma, clave_verificacion in casos:
+        token = jwt.encode(payload, clave_firma, algorithm=alg, headers={'kid': 'bench'})
+        firmar = medir(lambda: jwt.encode(payload, clave_firma, algorithm=alg), args.iteraciones)
+        verificar = medir(lambda: jwt.decode(token, clave_verificacion, algorithms=[alg]), args.iteraciones)
+        print(f"{alg:<7} {firmar:>10.1f} {verificar:>13.1f} {len(token):>12}")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
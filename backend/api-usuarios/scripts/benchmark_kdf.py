@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""
+Calibra el costo del hash de contraseñas contra un presupuesto de latencia de login.
+
+    python scripts/benchmark_kdf.py --objetivo-ms 150 --memoria 1024
+    python scripts/benchmark_kdf.py --algoritmo scrypt --objetivo-ms 200 --memoria 512 1024 2048
+
+Mide la derivación de cada costo candidato en esta máquina (un hilo) y estima la
+latencia en Lambda escalando por la fracción de vCPU que corresponde a cada memoria
+(Lambda asigna 1 vCPU completa a 1769 MB). Para una medición exacta, correrlo con
+--sin-escalar dentro de una Lambda del tamaño de destino.
+
+La salida indica, por memoria, el mayor costo cuyo p99 queda bajo el objetivo y las
+variables de entorno a configurar (PASSWORD_HASHER y PBKDF2_ITERATIONS o SCRYPT_N).
+"""
+import argparse
+import os
+import statistics
+import sys
+import time
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'utils'))
+from passwords import Pbkdf2Hasher, ScryptHasher
+
+MB_POR_VCPU = 1769
+
+CANDIDATOS = {
+    'pbkdf2_sha256': [50_000, 100_000, 150_000, 210_000, 310_000, 600_000],
+    'scrypt': [2 ** 12, 2 ** 13, 2 ** 14, 2 ** 15, 2 ** 16],
+}
+
+
+def hasher_para(algoritmo, costo):
+    if algoritmo == 'scrypt':
+        return ScryptHasher(n=costo)
+    return Pbkdf2Hasher(iterations=costo)
+
+
+def medir(hasher, muestras):
+    salt = os.urandom(16)
+    hasher.encode('calentamiento', salt)
+    tiempos = []
+    for i in range(muestras):
+        inicio = time.perf_counter()
+        hasher.encode(f'password-{i}', salt)
+        tiempos.append((time.perf_counter() - inicio) * 1000)
+    tiempos.sort()
+    return {
+        'p50': statistics.median(tiempos),
+        'p99': tiempos[min(len(tiempos) - 1, int(len(tiempos) * 0.99))],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--algoritmo', choices=sorted(CANDIDATOS), default='pbkdf2_sha256')
+    parser.add_argument('--objetivo-ms', type=float, default=150, help='presupuesto de hashing por login (p99)')
+    parser.add_argument('--memoria', type=int, nargs='+', default=[512, 1024, 1769, 2048], help='MB de la Lambda')
+    parser.add_argument('--muestras', type=int, default=30)
+    parser.add_argument('--sin-escalar', action='store_true', help='no escalar por vCPU (medición dentro de Lambda)')
+    args = parser.parse_args()
+
+    variable = 'SCRYPT_N' if args.algoritmo == 'scrypt' else 'PBKDF2_ITERATIONS'
+    mediciones = {}
+    print(f"{args.algoritmo}: {args.muestras} muestras por costo (esta máquina, 1 hilo)")
+    print(f"{'costo':>10} {'p50 ms':>10} {'p99 ms':>10}")
+    for costo in CANDIDATOS[args.algoritmo]:
+        mediciones[costo] = medir(hasher_para(args.algoritmo, costo), args.muestras)
+        print(f"{costo:>10} {mediciones[costo]['p50']:>10.1f} {mediciones[costo]['p99']:>10.1f}")
+
+    print(f"\nObjetivo p99: {args.objetivo_ms:.0f} ms")
+    for memoria in args.memoria:
+        factor = 1.0 if args.sin_escalar else max(1.0, MB_POR_VCPU / memoria)
+        aptos = [c for c, m in mediciones.items() if m['p99'] * factor <= args.objetivo_ms]
+        if not aptos:
+            print(f"{memoria:>5} MB: ningún costo candidato cumple; subir memoria o el objetivo")
+            continue
+        costo = max(aptos)
+        estimado = mediciones[costo]['p99'] * factor
+        print(f"{memoria:>5} MB: PASSWORD_HASHER={args.algoritmo} {variable}={costo} (p99 estimado {estimado:.0f} ms)")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,71 @@
+#!/usr/bin/env python3
+"""
+Importación masiva de usuarios de un tenant directamente contra DynamoDB.
+
+    python scripts/importar_usuarios.py usuarios.csv --tenant tenant-1 --stage dev
+    python scripts/importar_usuarios.py usuarios.json --stage prod --reporte errores.csv
+
+El CSV debe tener columnas email,password,nombre (y opcionalmente tenant_id);
+el JSON, una lista de objetos con esos campos. Usa la misma validación, hashing
+y escritura condicional que POST /auth/registro/batch, con un pool de procesos.
+"""
+import argparse
+import csv
+import json
+import os
+import sys
+import time
+
+
+def leer_filas(ruta):
+    with open(ruta, encoding='utf-8') as f:
+        if ruta.endswith('.json'):
+            return json.load(f)
+        return list(csv.DictReader(f))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('archivo', help='CSV o JSON con los usuarios')
+    parser.add_argument('--tenant', help='tenant_id para las filas que no lo traen')
+    parser.add_argument('--stage', default='dev', help='stage de la tabla p_usuarios-<stage>')
+    parser.add_argument('--bloque', type=int, default=1000, help='filas por bloque de importación')
+    parser.add_argument('--workers', type=int, default=os.cpu_count() or 2, help='procesos de hashing')
+    parser.add_argument('--reporte', help='CSV de salida con las filas no registradas')
+    args = parser.parse_args()
+
+    os.environ.setdefault('USUARIOS_TABLE', f'p_usuarios-{args.stage}')
+    sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'utils'))
+    from importacion import importar_usuarios
+
+    filas = leer_filas(args.archivo)
+    inicio = time.time()
+    errores = []
+    registrados = 0
+    for i in range(0, len(filas), args.bloque):
+        resultados = importar_usuarios(filas[i:i + args.bloque], tenant_id=args.tenant, workers=args.workers)
+        for resultado in resultados:
+            if resultado['status'] == 201:
+                registrados += 1
+            else:
+                fila = filas[i + resultado['indice']]
+                errores.append({
+                    'fila': i + resultado['indice'] + 1,
+                    'email': fila.get('email') if isinstance(fila, dict) else '',
+                    'status': resultado['status'],
+                    'error': resultado['error']
+                })
+        print(f"{min(i + args.bloque, len(filas))}/{len(filas)} filas procesadas")
+
+    print(f"Registrados: {registrados}  No registrados: {len(errores)}  Tiempo: {time.time() - inicio:.1f}s")
+    if args.reporte and errores:
+        with open(args.reporte, 'w', newline='', encoding='utf-8') as f:
+            writer = csv.DictWriter(f, fieldnames=['fila', 'email', 'status', 'error'])
+            writer.writeheader()
+            writer.writerows(errores)
+        print(f"Reporte de errores en {args.reporte}")
+    return 0 if not errores else 1
+
+
+if __name__ == '__main__':
+    sys.exit(main())
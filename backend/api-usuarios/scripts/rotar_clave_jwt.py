@@ -0,0 +1,84 @@
+#!/usr/bin/env python3
+"""
+Genera una nueva clave de firma de tokens y mantiene publicada la anterior.
+
+    python scripts/rotar_clave_jwt.py --stage dev --alg EdDSA            # muestra los valores
+    python scripts/rotar_clave_jwt.py --stage dev --alg EdDSA --aplicar  # los guarda en SSM
+
+Parámetros SSM (leídos por serverless.yml al desplegar api-usuarios):
+    /api-usuarios/<stage>/jwt-private-key             clave privada PEM actual
+    /api-usuarios/<stage>/jwt-public-keys-anteriores  JWKs públicas que siguen en el JWKS
+
+Los consumidores no se redesplegan: al ver un kid nuevo, PyJWKClient vuelve a
+descargar el JWKS. Tras desplegar, los tokens firmados con la clave anterior siguen
+validando hasta expirar (1 hora); en la siguiente rotación la anterior se descarta.
+
+Migración desde HS256 (una sola vez; los tres servicios leen JWT_ACEPTAR_HS256):
+    1. Desplegar api-compras y api-productos con JWKS_URL (ya en serverless.yml):
+       verifican EdDSA/ES256 contra el JWKS y siguen aceptando HS256.
+    2. Ejecutar este script con --aplicar y redesplegar api-usuarios: emite EdDSA.
+    3. Pasada 1 hora (vida del access token) redesplegar los tres servicios con
+       JWT_ACEPTAR_HS256=false y quitar JWT_SECRET/JWT_SECRETS de compras y
+       productos: desde ahí los validadores no guardan ningún secreto de firma.
+"""
+import argparse
+import json
+import os
+import sys
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'layers', 'jwt-layer', 'python'))
+os.environ.setdefault('JWT_SECRET', 'no-usado')
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'src', 'utils'))
+from signing import jwk_publica
+
+import boto3
+from cryptography.hazmat.primitives import serialization
+from cryptography.hazmat.primitives.asymmetric import ec, ed25519
+
+
+def generar(alg):
+    if alg == 'ES256':
+        return ec.generate_private_key(ec.SECP256R1())
+    return ed25519.Ed25519PrivateKey.generate()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--stage', default='dev')
+    parser.add_argument('--alg', choices=['EdDSA', 'ES256'], default='EdDSA')
+    parser.add_argument('--aplicar', action='store_true', help='escribir los parámetros en SSM')
+    args = parser.parse_args()
+
+    ssm = boto3.client('ssm')
+    ruta_privada = f'/api-usuarios/{args.stage}/jwt-private-key'
+    ruta_anteriores = f'/api-usuarios/{args.stage}/jwt-public-keys-anteriores'
+
+    # La clave actual pasa a "anterior": se sigue publicando para validar sus tokens vigentes
+    anteriores = []
+    try:
+        pem_actual = ssm.get_parameter(Name=ruta_privada, WithDecryption=True)['Parameter']['Value']
+        if pem_actual:
+            actual = serialization.load_pem_private_key(pem_actual.encode('utf-8'), password=None)
+            alg_actual = 'ES256' if isinstance(actual, ec.EllipticCurvePrivateKey) else 'EdDSA'
+            anteriores.append(jwk_publica(actual, alg_actual))
+    except ssm.exceptions.ParameterNotFound:
+        pass
+
+    nueva = generar(args.alg)
+    pem = nueva.private_bytes(serialization.Encoding.PEM, serialization.PrivateFormat.PKCS8,
+                              serialization.NoEncryption()).decode('utf-8')
+    print(f"Nueva clave {args.alg} kid={jwk_publica(nueva, args.alg)['kid']}")
+    print(f"Claves anteriores publicadas: {[k['kid'] for k in anteriores]}")
+
+    if not args.aplicar:
+        print("\nEjecutar con --aplicar para guardar en SSM y luego: serverless deploy --stage", args.stage)
+        return 0
+
+    ssm.put_parameter(Name=ruta_privada, Value=pem, Type='SecureString', Overwrite=True)
+    ssm.put_parameter(Name=ruta_anteriores, Value=json.dumps(anteriores), Type='String', Overwrite=True)
+    print(f"Parámetros actualizados. Desplegar api-usuarios (JWT_ALG={args.alg}) para firmar con la nueva clave.")
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,15 @@
+import os
+import sys
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from revocaciones import compilar_filtro
+
+
+# Programada: publica en S3 el filtro Bloom de jti revocados que cargan los validadores
+def lambda_handler(event, context):
+    filtro, publicado = compilar_filtro()
+    if publicado:
+        print(f"Filtro de revocaciones publicado: {filtro.n} jti, {len(filtro.bits)} bytes, k={filtro.k}")
+    else:
+        print(f"Filtro de revocaciones sin cambios: {filtro.n} jti")
+    return {'revocados': filtro.n, 'bytes': len(filtro.bits), 'publicado': publicado}
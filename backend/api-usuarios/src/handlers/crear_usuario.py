@@ -1,10 +1,12 @@
 import os
+import sys
 import json
 import boto3
-import hashlib
-import uuid
-import jwt
-from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from usuarios import USERS_TABLE, hash_password, validar_registro, construir_usuario
+from tokens import emitir_sesion
 
 HEADERS = {
     'Content-Type': 'application/json',
@@ -12,12 +14,6 @@ HEADERS = {
 }
 
 dynamodb = boto3.resource('dynamodb')
-USERS_TABLE = os.environ['USUARIOS_TABLE']
-JWT_SECRET = os.environ['JWT_SECRET']
-
-# Función para hashear contraseña
-def hash_password(password):
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
 
 
 def lambda_handler(event, context):
@@ -33,39 +29,29 @@ def lambda_handler(event, context):
         nombre = data.get('nombre')
 
         # Validar campos
-        if not all([tenant_id, email, password, nombre]):
-            resp = {'error': 'Faltan parámetros tenant_id, email, password o nombre'}
+        error = validar_registro(data)
+        if error:
+            resp = {'error': error}
             return {'statusCode': 400, 'headers': HEADERS, 'body': json.dumps(resp)}
 
         table = dynamodb.Table(USERS_TABLE)
-        # Verificar usuario existente
-        existing = table.get_item(Key={'email': email, 'tenant_id': tenant_id})
-        if 'Item' in existing:
-            resp = {'error': 'Usuario ya existe'}
-            return {'statusCode': 409, 'headers': HEADERS, 'body': json.dumps(resp)}
 
-        # Crear usuario
-        raw_id = str(uuid.uuid4())
-        user_id = f"user_{raw_id}"
-        hashed = hash_password(password)
-        table.put_item(Item={
-            'tenant_id': tenant_id,
-            'user_id': raw_id,
-            'email': email,
-            'password': hashed,
-            'nombre': nombre
-        })
-        # Generar JWT al registrar
-        payload = {
-            'user_id': user_id,
-            'email': email,
-            'tenant_id': tenant_id,
-            'exp': datetime.utcnow() + timedelta(hours=1)
-        }
-        token = jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+        # Crear usuario solo si no existe (un put condicional, sin carrera entre registros)
+        item, user_id = construir_usuario(tenant_id, email, hash_password(password), nombre)
+        try:
+            table.put_item(
+                Item=item,
+                ConditionExpression='attribute_not_exists(email)'
+            )
+        except ClientError as e:
+            if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+                resp = {'error': 'Usuario ya existe'}
+                return {'statusCode': 409, 'headers': HEADERS, 'body': json.dumps(resp)}
+            raise
+        # Generar JWT (y refresh token) al registrar
         resp = {
             'message': 'Usuario registrado',
-            'token': token,
+            **emitir_sesion(user_id, email, tenant_id),
             'user': {'user_id': user_id, 'email': email, 'tenant_id': tenant_id}
         }
         return {
@@ -0,0 +1,52 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from importacion import importar_usuarios
+
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*'
+}
+
+# Tope por request para terminar dentro del timeout (el hashing domina: ~60 ms por contraseña
+# y vCPU con el costo por defecto); lotes mayores con scripts/importar_usuarios.py
+MAX_USUARIOS_BATCH = int(os.environ.get('MAX_USUARIOS_BATCH', '250'))
+
+
+def lambda_handler(event, context):
+    try:
+        raw_body = event.get('body', '{}')
+        data = json.loads(raw_body) if isinstance(raw_body, str) else raw_body
+        usuarios = data.get('usuarios')
+
+        if not isinstance(usuarios, list) or len(usuarios) == 0:
+            resp = {'error': 'Debe incluir una lista usuarios no vacía'}
+            return {'statusCode': 400, 'headers': HEADERS, 'body': json.dumps(resp)}
+
+        if len(usuarios) > MAX_USUARIOS_BATCH:
+            resp = {'error': f'Máximo {MAX_USUARIOS_BATCH} usuarios por lote'}
+            return {'statusCode': 400, 'headers': HEADERS, 'body': json.dumps(resp)}
+
+        resultados = importar_usuarios(usuarios, tenant_id=data.get('tenant_id'))
+        registrados = sum(1 for r in resultados if r['status'] == 201)
+        resp = {
+            'message': 'Importación procesada',
+            'total': len(resultados),
+            'registrados': registrados,
+            'conflictos': sum(1 for r in resultados if r['status'] == 409),
+            'fallidos': len(resultados) - registrados,
+            'resultados': resultados
+        }
+        return {
+            'statusCode': 200,
+            'headers': HEADERS,
+            'body': json.dumps(resp, ensure_ascii=False)
+        }
+
+    except json.JSONDecodeError:
+        return {'statusCode': 400, 'headers': HEADERS, 'body': json.dumps({'error': 'JSON inválido'})}
+    except Exception as e:
+        resp = {'error': str(e)}
+        return {'statusCode': 500, 'headers': HEADERS, 'body': json.dumps(resp)}
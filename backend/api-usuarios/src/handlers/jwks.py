@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+import hashlib
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from signing import JWKS
+
+# El documento cambia solo al redesplegar (rotación): se serializa una vez por contenedor
+BODY = json.dumps(JWKS, sort_keys=True, separators=(',', ':'))
+# ETag estable entre contenedores: hash del JWKS canónico
+ETAG = '"%s"' % hashlib.sha256(BODY.encode('utf-8')).hexdigest()[:32]
+
+# Los validadores cachean el documento; durante una rotación incluye las claves anteriores
+HEADERS = {
+    'Content-Type': 'application/json',
+    'Access-Control-Allow-Origin': '*',
+    'Cache-Control': 'public, max-age=300',
+    'ETag': ETAG
+}
+
+
+def _coincide(if_none_match):
+    """
+    If-None-Match con el ETag actual (admite lista, * y validadores débiles W/)
+    """
+    etags = [e.strip() for e in if_none_match.split(',')]
+    return '*' in etags or any((e[2:] if e.startswith('W/') else e) == ETAG for e in etags)
+
+
+# Publica las claves públicas de firma (JWKS) para validar tokens sin el secreto
+def lambda_handler(event, context):
+    headers = {k.lower(): v for k, v in (event.get('headers') or {}).items()}
+    if _coincide(headers.get('if-none-match', '')):
+        return {'statusCode': 304, 'headers': HEADERS, 'body': ''}
+    return {'statusCode': 200, 'headers': HEADERS, 'body': BODY}
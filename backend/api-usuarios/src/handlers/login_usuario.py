@@ -1,20 +1,31 @@
 import os
+import sys
 import json
 import boto3
-import hashlib
-import uuid
-import jwt
-from datetime import datetime, timedelta
+from botocore.exceptions import ClientError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from passwords import hash_password, verify_password, needs_rehash, hash_ficticio
+from rate_limit import verificar_login
+from tokens import emitir_sesion
 
 # HEADER y dinamodb init
 HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
 dynamodb = boto3.resource('dynamodb')
 USERS_TABLE = os.environ['USUARIOS_TABLE']
-JWT_SECRET = os.environ['JWT_SECRET']
 
-# Hashear contraseña
-def hash_password(password):
-    return hashlib.sha256(password.encode('utf-8')).hexdigest()
+# Migrar el hash (SHA-256 antiguo o costo menor al configurado) tras un login exitoso
+def rehash_password(table, user, password):
+    try:
+        table.update_item(
+            Key={'email': user['email'], 'tenant_id': user['tenant_id']},
+            UpdateExpression='SET password = :nuevo',
+            ConditionExpression='password = :actual',
+            ExpressionAttributeValues={':nuevo': hash_password(password), ':actual': user['password']}
+        )
+    except ClientError as e:
+        # Otro login ya lo migró o cambió la contraseña; no afecta a este login
+        print(f"Rehash omitido: {e}")
 
 
 def lambda_handler(event, context):
@@ -27,22 +38,27 @@ def lambda_handler(event, context):
         # validar campos
         if not all([tenant_id, email, password]):
             return {'statusCode':400,'headers':HEADERS,'body':json.dumps({'error':'Faltan parámetros'})}
+        # limitar intentos por (tenant, email) e IP antes de leer usuarios o hashear
+        ip = (event.get('requestContext') or {}).get('identity', {}).get('sourceIp')
+        espera = verificar_login(tenant_id, email, ip)
+        if espera is not None:
+            headers = {**HEADERS, 'Retry-After': str(espera)}
+            return {'statusCode':429,'headers':headers,'body':json.dumps({'error':'Demasiados intentos, reintente más tarde'})}
         # verificar user
         table = dynamodb.Table(USERS_TABLE)
         r = table.get_item(Key={'email':email,'tenant_id':tenant_id})
         user = r.get('Item')
-        if not user or hash_password(password)!=user.get('password'):
+        # sin usuario se verifica igual contra un hash ficticio: el tiempo de respuesta
+        # no revela qué emails están registrados
+        valida = verify_password(password, user.get('password') if user else hash_ficticio())
+        if not user or not valida:
             return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':'Credenciales inválidas'})}
-        # generar JWT
-        payload = {
-            'user_id': user['user_id'],
-            'email': user['email'],
-            'tenant_id': tenant_id,
-            'exp': datetime.utcnow() + timedelta(hours=1)
-        }
-        token = jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+        if needs_rehash(user['password']):
+            rehash_password(table, user, password)
+        # generar JWT y refresh token
+        sesion = emitir_sesion(user['user_id'], user['email'], tenant_id)
         # response
-        resp = {'message':'Login exitoso','token':token,'user':{'user_id':user['user_id'],'email':user['email'],'tenant_id':tenant_id}}
+        resp = {'message':'Login exitoso',**sesion,'user':{'user_id':user['user_id'],'email':user['email'],'tenant_id':tenant_id}}
         return {'statusCode':200,'headers':HEADERS,'body':json.dumps(resp)}
     except Exception as e:
         return {'statusCode':500,'headers':HEADERS,'body':json.dumps({'error':str(e)})}
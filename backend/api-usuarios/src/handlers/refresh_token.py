@@ -0,0 +1,27 @@
+import os
+import sys
+import json
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from tokens import emitir_access_token, rotar_refresh_token, RefreshInvalido
+
+HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+
+# Canjea un refresh token por un nuevo JWT de acceso sin verificar contraseña
+def lambda_handler(event, context):
+    try:
+        raw = event.get('body', '{}')
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        refresh_token = data.get('refresh_token')
+        if not refresh_token:
+            return {'statusCode':400,'headers':HEADERS,'body':json.dumps({'error':'Falta refresh_token'})}
+        try:
+            usuario, nuevo_refresh = rotar_refresh_token(refresh_token)
+        except RefreshInvalido as e:
+            return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':str(e)})}
+        token = emitir_access_token(usuario['user_id'], usuario['email'], usuario['tenant_id'])
+        resp = {'message':'Token renovado','token':token,'refresh_token':nuevo_refresh,'user':usuario}
+        return {'statusCode':200,'headers':HEADERS,'body':json.dumps(resp)}
+    except Exception as e:
+        return {'statusCode':500,'headers':HEADERS,'body':json.dumps({'error':str(e)})}
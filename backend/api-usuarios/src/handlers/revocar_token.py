@@ -0,0 +1,36 @@
+import os
+import sys
+import json
+from jwt import ExpiredSignatureError, InvalidTokenError
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from signing import verificar
+from tokens import revocar_refresh_token
+from revocaciones import revocar_access_token
+
+HEADERS = {'Content-Type': 'application/json', 'Access-Control-Allow-Origin': '*'}
+
+
+# Logout: revoca el access token presentado (por jti) y, si viene, la familia del refresh token
+def lambda_handler(event, context):
+    try:
+        auth_header = (event.get('headers') or {}).get('Authorization')
+        if not auth_header:
+            return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':'Token de autorización requerido'})}
+        token = auth_header.split(' ')[1] if auth_header.startswith('Bearer ') else auth_header
+        try:
+            payload = verificar(token)
+        except ExpiredSignatureError:
+            return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':'Token expirado'})}
+        except InvalidTokenError:
+            return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':'Token inválido'})}
+
+        raw = event.get('body') or '{}'
+        data = json.loads(raw) if isinstance(raw, str) else raw
+        # Tokens emitidos antes del jti no se pueden revocar; expiran solos
+        access_revocado = revocar_access_token(payload)
+        refresh_revocado = revocar_refresh_token(data['refresh_token']) if data.get('refresh_token') else False
+        resp = {'message':'Sesión revocada','access_token':access_revocado,'refresh_token':refresh_revocado}
+        return {'statusCode':200,'headers':HEADERS,'body':json.dumps(resp)}
+    except Exception as e:
+        return {'statusCode':500,'headers':HEADERS,'body':json.dumps({'error':str(e)})}
@@ -1,8 +1,11 @@
 import os
+import sys
 import json
-import jwt
 from jwt import ExpiredSignatureError, InvalidTokenError
-from datetime import datetime
+
+sys.path.append(os.path.join(os.path.dirname(__file__), '..', 'utils'))
+from signing import verificar
+from revocaciones import esta_revocado
 
 # Encabezados CORS y content-type
 HEADERS = {
@@ -24,10 +27,11 @@ def lambda_handler(event, context):
         if not token:
             return {'statusCode': 401,'headers': HEADERS,'body': json.dumps({'error':'Token de autorización requerido'})}
         
-        # Decodificar y validar JWT
-        jwt_secret = os.environ.get('JWT_SECRET')
+        # Decodificar y validar JWT (clave pública por kid, o HS256 heredado)
         try:
-            payload = jwt.decode(token, jwt_secret, algorithms=['HS256'])
+            payload = verificar(token)
+            if esta_revocado(payload.get('jti')):
+                return {'statusCode':401,'headers':HEADERS,'body':json.dumps({'error':'Token revocado'})}
             mensaje = {'message':'Token válido','valid':True,'payload':payload}
             return {'statusCode':200,'headers':HEADERS,'body':json.dumps(mensaje)}
         except ExpiredSignatureError:
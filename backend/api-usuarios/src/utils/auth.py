@@ -2,14 +2,14 @@ import os
 import jwt
 import json
 
-JWT_SECRET = os.environ['JWT_SECRET']
+from signing import verificar
 
 def validate_jwt_token(token):
     """
     Valida un token JWT y retorna el payload decodificado
     """
     try:
-        payload = jwt.decode(token, JWT_SECRET, algorithms=['HS256'])
+        payload = verificar(token)
         return payload, None
     except jwt.ExpiredSignatureError:
         return None, 'Token expirado'
@@ -0,0 +1,150 @@
+import os
+import random
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+import boto3
+from botocore.exceptions import BotoCoreError, ClientError
+
+from usuarios import USERS_TABLE, hash_password, validar_registro, construir_usuario
+
+dynamodb = boto3.resource('dynamodb')
+
+# Límite de DynamoDB por llamada
+BATCH_GET_LIMIT = 100
+MAX_REINTENTOS_BATCH = 8
+HASH_WORKERS = int(os.environ.get('HASH_WORKERS', str(os.cpu_count() or 2)))
+# PutItem condicionales en paralelo (la latencia de red domina, no la CPU)
+WRITE_WORKERS = int(os.environ.get('IMPORT_WRITE_WORKERS', '16'))
+
+def hash_passwords(passwords, workers=HASH_WORKERS):
+    """
+    Hashea contraseñas en paralelo con un pool de procesos.
+    En Lambda no hay /dev/shm para los semáforos de multiprocessing: se usa un pool
+    de hilos (hashlib libera el GIL al derivar claves)
+    """
+    if len(passwords) < 2 or workers < 2:
+        return [hash_password(p) for p in passwords]
+    chunksize = max(1, len(passwords) // (workers * 4))
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(hash_password, passwords, chunksize=chunksize))
+    except (OSError, NotImplementedError, ImportError):
+        with ThreadPoolExecutor(max_workers=workers) as executor:
+            return list(executor.map(hash_password, passwords))
+
+def _esperar(intento):
+    """
+    Backoff exponencial con jitter entre reintentos de items no procesados
+    """
+    time.sleep(random.uniform(0, min(2.0, 0.05 * (2 ** intento))))
+
+def usuarios_existentes(claves):
+    """
+    Consulta con BatchGetItem qué (email, tenant_id) ya están registrados
+    Retorna: (existentes, no verificadas); un bloque que falla no aborta el lote,
+    sus claves quedan sin verificar
+    """
+    existentes = set()
+    no_verificadas = set()
+    for i in range(0, len(claves), BATCH_GET_LIMIT):
+        bloque = claves[i:i + BATCH_GET_LIMIT]
+        request = {USERS_TABLE: {
+            'Keys': [{'email': email, 'tenant_id': tenant_id} for email, tenant_id in bloque],
+            'ProjectionExpression': 'email, tenant_id'
+        }}
+        intento = 0
+        try:
+            while request:
+                response = dynamodb.batch_get_item(RequestItems=request)
+                for item in response.get('Responses', {}).get(USERS_TABLE, []):
+                    existentes.add((item['email'], item['tenant_id']))
+                request = response.get('UnprocessedKeys') or None
+                if request:
+                    intento += 1
+                    if intento > MAX_REINTENTOS_BATCH:
+                        raise RuntimeError('BatchGetItem no procesó todas las claves')
+                    _esperar(intento)
+        except (BotoCoreError, ClientError, RuntimeError) as e:
+            print(f"Error verificando usuarios existentes: {e}")
+            no_verificadas.update(clave for clave in bloque if clave not in existentes)
+    return existentes, no_verificadas
+
+def _registrar_usuario(item):
+    """
+    PutItem condicional, igual que /auth/registro: un registro concurrente no se sobrescribe
+    Retorna: 201, 409 (ya existe) o 500
+    """
+    try:
+        # El cliente del resource serializa tipos Python nativos y es thread-safe
+        dynamodb.meta.client.put_item(TableName=USERS_TABLE, Item=item,
+                                      ConditionExpression='attribute_not_exists(email)')
+        return 201
+    except ClientError as e:
+        if e.response['Error']['Code'] == 'ConditionalCheckFailedException':
+            return 409
+        print(f"Error registrando {item['email']}: {e}")
+        return 500
+    except BotoCoreError as e:
+        print(f"Error registrando {item['email']}: {e}")
+        return 500
+
+def escribir_usuarios(items, workers=WRITE_WORKERS):
+    """
+    Escribe los items con PutItem condicional en paralelo. BatchWriteItem no admite
+    condiciones y pisaría a un usuario registrado después de usuarios_existentes
+    Retorna: status por item (201, 409 o 500), en el mismo orden
+    """
+    if not items:
+        return []
+    with ThreadPoolExecutor(max_workers=min(workers, len(items))) as executor:
+        return list(executor.map(_registrar_usuario, items))
+
+def importar_usuarios(filas, tenant_id=None, workers=HASH_WORKERS):
+    """
+    Registra usuarios en lote. tenant_id (opcional) se usa para las filas que no lo traen.
+    Retorna: lista de resultados por fila con status 201, 400, 409 o 500
+    """
+    resultados = [None] * len(filas)
+    validas = []
+    vistos = set()
+    for indice, fila in enumerate(filas):
+        if isinstance(fila, dict) and tenant_id and not fila.get('tenant_id'):
+            fila = {**fila, 'tenant_id': tenant_id}
+        error = validar_registro(fila)
+        if error:
+            resultados[indice] = {'indice': indice, 'status': 400, 'error': error}
+            continue
+        clave = (fila['email'], fila['tenant_id'])
+        if clave in vistos:
+            resultados[indice] = {'indice': indice, 'status': 409, 'error': 'Usuario repetido en el lote'}
+            continue
+        vistos.add(clave)
+        validas.append((indice, fila))
+
+    # Descartar antes los usuarios ya registrados ahorra su hashing; la escritura
+    # condicional cubre los que se registren entretanto
+    existentes, no_verificadas = usuarios_existentes([(f['email'], f['tenant_id']) for _, f in validas])
+    nuevas = []
+    for indice, fila in validas:
+        clave = (fila['email'], fila['tenant_id'])
+        if clave in existentes:
+            resultados[indice] = {'indice': indice, 'status': 409, 'error': 'Usuario ya existe'}
+        elif clave in no_verificadas:
+            resultados[indice] = {'indice': indice, 'status': 500, 'error': 'No se pudo registrar, reintente'}
+        else:
+            nuevas.append((indice, fila))
+
+    hashes = hash_passwords([fila['password'] for _, fila in nuevas], workers)
+    items = []
+    for (indice, fila), password_hash in zip(nuevas, hashes):
+        item, user_id = construir_usuario(fila['tenant_id'], fila['email'], password_hash, fila['nombre'])
+        items.append(item)
+        resultados[indice] = {'indice': indice, 'status': 201, 'user_id': user_id, 'email': fila['email']}
+
+    for (indice, fila), status in zip(nuevas, escribir_usuarios(items)):
+        if status == 409:
+            resultados[indice] = {'indice': indice, 'status': 409, 'error': 'Usuario ya existe'}
+        elif status != 201:
+            resultados[indice] = {'indice': indice, 'status': 500, 'error': 'No se pudo registrar, reintente'}
+    return resultados
@@ -0,0 +1,142 @@
+import base64
+import hashlib
+import hmac
+import os
+import secrets
+
+# Algoritmo y costos para hashes nuevos; calibrar con scripts/benchmark_kdf.py según
+# la memoria (CPU) de la Lambda. Cada hash guarda sus parámetros, así que se pueden subir
+# sin invalidar los existentes: se rehashean en el siguiente login exitoso.
+PASSWORD_HASHER = os.environ.get('PASSWORD_HASHER', 'pbkdf2_sha256')
+PBKDF2_ITERATIONS = int(os.environ.get('PBKDF2_ITERATIONS', '100000'))
+SCRYPT_N = int(os.environ.get('SCRYPT_N', str(2 ** 14)))
+SCRYPT_R = int(os.environ.get('SCRYPT_R', '8'))
+SCRYPT_P = int(os.environ.get('SCRYPT_P', '1'))
+SALT_BYTES = 16
+
+def _b64(data):
+    return base64.b64encode(data).decode('ascii').rstrip('=')
+
+def _unb64(data):
+    return base64.b64decode(data + '=' * (-len(data) % 4))
+
+class Pbkdf2Hasher:
+    """
+    PBKDF2-HMAC-SHA256: pbkdf2_sha256$<iteraciones>$<salt>$<hash>
+    """
+    algoritmo = 'pbkdf2_sha256'
+
+    def __init__(self, iterations=PBKDF2_ITERATIONS):
+        self.iterations = iterations
+
+    def derivar(self, password, salt, iterations):
+        return hashlib.pbkdf2_hmac('sha256', password.encode('utf-8'), salt, iterations)
+
+    def encode(self, password, salt=None):
+        salt = salt or os.urandom(SALT_BYTES)
+        digest = self.derivar(password, salt, self.iterations)
+        return f"{self.algoritmo}${self.iterations}${_b64(salt)}${_b64(digest)}"
+
+    def verify(self, password, encoded):
+        _, iterations, salt, digest = encoded.split('$')
+        calculado = self.derivar(password, _unb64(salt), int(iterations))
+        return hmac.compare_digest(calculado, _unb64(digest))
+
+    def needs_rehash(self, encoded):
+        return int(encoded.split('$')[1]) < self.iterations
+
+class ScryptHasher:
+    """
+    scrypt (memory-hard): scrypt$<n>$<r>$<p>$<salt>$<hash>
+    """
+    algoritmo = 'scrypt'
+
+    def __init__(self, n=SCRYPT_N, r=SCRYPT_R, p=SCRYPT_P):
+        self.n, self.r, self.p = n, r, p
+
+    def derivar(self, password, salt, n, r, p):
+        # maxmem por encima de 128 * n * r para que OpenSSL no rechace costos altos
+        return hashlib.scrypt(password.encode('utf-8'), salt=salt, n=n, r=r, p=p,
+                              maxmem=256 * n * r + 1024 * 1024, dklen=32)
+
+    def encode(self, password, salt=None):
+        salt = salt or os.urandom(SALT_BYTES)
+        digest = self.derivar(password, salt, self.n, self.r, self.p)
+        return f"{self.algoritmo}${self.n}${self.r}${self.p}${_b64(salt)}${_b64(digest)}"
+
+    def verify(self, password, encoded):
+        _, n, r, p, salt, digest = encoded.split('$')
+        calculado = self.derivar(password, _unb64(salt), int(n), int(r), int(p))
+        return hmac.compare_digest(calculado, _unb64(digest))
+
+    def needs_rehash(self, encoded):
+        _, n, r, p = encoded.split('$')[:4]
+        return (int(n), int(r), int(p)) < (self.n, self.r, self.p)
+
+class LegacySha256Hasher:
+    """
+    SHA-256 sin salt (formato original: 64 caracteres hex). Solo para verificar
+    """
+    algoritmo = 'sha256'
+
+    def verify(self, password, encoded):
+        calculado = hashlib.sha256(password.encode('utf-8')).hexdigest()
+        return hmac.compare_digest(calculado, encoded)
+
+    def needs_rehash(self, encoded):
+        return True
+
+HASHERS = {
+    Pbkdf2Hasher.algoritmo: Pbkdf2Hasher,
+    ScryptHasher.algoritmo: ScryptHasher,
+}
+
+def get_hasher(algoritmo=PASSWORD_HASHER):
+    """
+    Hasher configurado para contraseñas nuevas
+    """
+    return HASHERS[algoritmo]()
+
+def _hasher_de(encoded):
+    algoritmo = encoded.split('$', 1)[0] if '$' in encoded else LegacySha256Hasher.algoritmo
+    if algoritmo == LegacySha256Hasher.algoritmo:
+        return LegacySha256Hasher()
+    return HASHERS[algoritmo]()
+
+def hash_password(password):
+    """
+    Hashea la contraseña con el algoritmo y costo configurados
+    """
+    return get_hasher().encode(password)
+
+def verify_password(password, encoded):
+    """
+    Verifica la contraseña contra un hash de cualquier formato soportado
+    """
+    if not encoded:
+        return False
+    try:
+        return _hasher_de(encoded).verify(password, encoded)
+    except (KeyError, ValueError):
+        return False
+
+_hash_ficticio = None
+
+def hash_ficticio():
+    """
+    Hash de una contraseña aleatoria con el costo configurado (uno por contenedor).
+    El login lo verifica cuando el email no existe para tardar lo mismo que con uno real
+    """
+    global _hash_ficticio
+    if _hash_ficticio is None:
+        _hash_ficticio = hash_password(secrets.token_urlsafe(16))
+    return _hash_ficticio
+
+def needs_rehash(encoded):
+    """
+    Indica si el hash es de otro algoritmo o de menor costo que el configurado
+    """
+    hasher = _hasher_de(encoded)
+    if hasher.algoritmo != PASSWORD_HASHER:
+        return True
+    return hasher.needs_rehash(encoded)
@@ -0,0 +1,159 @@
+import os
+import threading
+import time
+from collections import OrderedDict
+
+import boto3
+
+dynamodb = boto3.resource('dynamodb')
+LOGIN_INTENTOS_TABLE = os.environ.get('LOGIN_INTENTOS_TABLE', 'p_login_intentos-dev')
+
+# Ventana deslizante compartida entre contenedores (DynamoDB)
+LOGIN_VENTANA_S = int(os.environ.get('LOGIN_VENTANA_S', '300'))
+LOGIN_LIMITE_EMAIL = int(os.environ.get('LOGIN_LIMITE_EMAIL', '10'))
+LOGIN_LIMITE_IP = int(os.environ.get('LOGIN_LIMITE_IP', '100'))
+# Intentos por IP que un contenedor acumula antes de sumarlos a DynamoDB (lejos del límite)
+LOGIN_LOTE_IP = int(os.environ.get('LOGIN_LOTE_IP', '10'))
+
+# Token bucket por contenedor: corta ráfagas sin llegar a DynamoDB
+BUCKET_EMAIL = (5, 0.1)   # (capacidad, tokens por segundo)
+BUCKET_IP = (20, 1.0)
+BUCKETS_MAX = 10000
+
+class TokenBucket:
+    """
+    Bucket de tokens con recarga continua
+    """
+    def __init__(self, capacidad, tasa):
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self.tokens = float(capacidad)
+        self.actualizado = time.monotonic()
+
+    def consumir(self):
+        ahora = time.monotonic()
+        self.tokens = min(self.capacidad, self.tokens + (ahora - self.actualizado) * self.tasa)
+        self.actualizado = ahora
+        if self.tokens < 1:
+            return False
+        self.tokens -= 1
+        return True
+
+    def espera_s(self):
+        return max(1, int((1 - self.tokens) / self.tasa) + 1)
+
+class BucketsLocales:
+    """
+    Buckets por clave con desalojo LRU para acotar la memoria del contenedor
+    """
+    def __init__(self, capacidad, tasa, max_claves=BUCKETS_MAX):
+        self.capacidad = capacidad
+        self.tasa = tasa
+        self.max_claves = max_claves
+        self._buckets = OrderedDict()
+        self._lock = threading.Lock()
+
+    def permitir(self, clave):
+        """
+        Retorna: None si hay token, o segundos sugeridos para reintentar
+        """
+        with self._lock:
+            bucket = self._buckets.pop(clave, None) or TokenBucket(self.capacidad, self.tasa)
+            self._buckets[clave] = bucket
+            if len(self._buckets) > self.max_claves:
+                self._buckets.popitem(last=False)
+            return None if bucket.consumir() else bucket.espera_s()
+
+buckets_email = BucketsLocales(*BUCKET_EMAIL)
+buckets_ip = BucketsLocales(*BUCKET_IP)
+
+def sumar_intentos(clave, cantidad=1, ventana=LOGIN_VENTANA_S):
+    """
+    Suma intentos a la ventana deslizante con un único UpdateItem (ADD atómico)
+    y estima el total: anterior ponderada por lo que queda de ella + actual
+    Retorna: (total estimado, segundos que le quedan a la ventana actual)
+    """
+    ahora = time.time()
+    actual = int(ahora // ventana)
+    response = dynamodb.Table(LOGIN_INTENTOS_TABLE).update_item(
+        Key={'clave': clave},
+        UpdateExpression='ADD #actual :cantidad SET #ttl = :ttl REMOVE #vieja',
+        ExpressionAttributeNames={
+            '#actual': f'c{actual}',
+            '#vieja': f'c{actual - 2}',
+            '#ttl': 'ttl'
+        },
+        ExpressionAttributeValues={':cantidad': cantidad, ':ttl': int(ahora) + 2 * ventana},
+        ReturnValues='ALL_NEW'
+    )
+    item = response.get('Attributes', {})
+    transcurrido = (ahora % ventana) / ventana
+    estimado = int(item.get(f'c{actual - 1}', 0)) * (1 - transcurrido) + int(item.get(f'c{actual}', 0))
+    return estimado, max(1, int(ventana * (1 - transcurrido)))
+
+def contar_intento(clave, limite, ventana=LOGIN_VENTANA_S):
+    """
+    Registra un intento en la ventana deslizante
+    Retorna: None si está bajo el límite, o segundos sugeridos para reintentar
+    """
+    estimado, restante = sumar_intentos(clave, 1, ventana)
+    return None if estimado <= limite else restante
+
+class ContadorDiferido:
+    """
+    Cuenta intentos en memoria y los suma a DynamoDB en lotes mientras el último total
+    conocido esté lejos del límite; cerca de él se escribe en cada intento. Cada
+    contenedor puede dejar sin contar a lo sumo lote - 1 intentos por clave
+    """
+    def __init__(self, limite, lote, max_claves=BUCKETS_MAX):
+        self.limite = limite
+        self.lote = lote
+        self.max_claves = max_claves
+        self._claves = OrderedDict()  # clave -> [pendientes, último estimado]
+        self._lock = threading.Lock()
+
+    def registrar(self, clave):
+        """
+        Retorna: None si se permite, o segundos sugeridos para reintentar
+        """
+        with self._lock:
+            estado = self._claves.pop(clave, None) or [0, 0]
+            self._claves[clave] = estado
+            if len(self._claves) > self.max_claves:
+                self._claves.popitem(last=False)
+            estado[0] += 1
+            if estado[0] < self.lote and estado[1] + estado[0] < self.limite - self.lote:
+                return None
+            cantidad, estado[0] = estado[0], 0
+        estimado, restante = sumar_intentos(clave, cantidad)
+        with self._lock:
+            estado[1] = estimado
+        return None if estimado <= self.limite else restante
+
+contador_ip = ContadorDiferido(LOGIN_LIMITE_IP, LOGIN_LOTE_IP)
+
+def verificar_login(tenant_id, email, ip):
+    """
+    Aplica los límites antes de tocar la tabla de usuarios. Si DynamoDB falla se
+    deja pasar (el límite local sigue activo) para no bloquear logins legítimos
+    Retorna: None si se permite, o segundos sugeridos para reintentar (429)
+    """
+    clave_email = f"email#{tenant_id}#{email.lower()}"
+    clave_ip = f"ip#{ip}" if ip else None
+
+    espera = buckets_email.permitir(clave_email)
+    if espera is None and clave_ip:
+        espera = buckets_ip.permitir(clave_ip)
+    if espera is not None:
+        return espera
+
+    # El límite por email es bajo y se cuenta en cada intento; el de IP casi siempre queda
+    # en memoria, así que un login hace normalmente una sola escritura
+    try:
+        espera = contar_intento(clave_email, LOGIN_LIMITE_EMAIL)
+        if espera is None and clave_ip:
+            espera = contador_ip.registrar(clave_ip)
+        return espera
+    except Exception as e:
+        print(f"Rate limit no disponible: {e}")
+        return None
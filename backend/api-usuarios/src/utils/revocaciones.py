@@ -0,0 +1,103 @@
+import hashlib
+import os
+import time
+
+import boto3
+from botocore.exceptions import ClientError
+
+from bloom import BloomFilter
+from filtro_revocaciones import FiltroRevocaciones
+
+dynamodb = boto3.resource('dynamodb')
+s3 = boto3.client('s3')
+TOKENS_REVOCADOS_TABLE = os.environ.get('TOKENS_REVOCADOS_TABLE', 'p_tokens_revocados-dev')
+# Blob del filtro Bloom que descargan los validadores (validar_token, api-compras, api-productos)
+REVOCACIONES_BUCKET = os.environ.get('REVOCACIONES_BUCKET', '')
+REVOCACIONES_KEY = os.environ.get('REVOCACIONES_KEY', 'revocaciones/bloom.bin')
+TASA_FALSOS_POSITIVOS = float(os.environ.get('REVOCACIONES_FP', '0.001'))
+# Sin cambios en los jti el blob solo se republica al superar esta edad, para que su
+# 'generado' no pase el REVOCACIONES_MAX_EDAD_S (600 s) con que los validadores lo descartan
+REVOCACIONES_REPUBLICAR_S = int(os.environ.get('REVOCACIONES_REPUBLICAR_S', '300'))
+# Metadata S3 (x-amz-meta-*) con el digest del conjunto de jti publicado
+METADATA_DIGEST = 'jtis-sha256'
+
+def revocar_access_token(payload, motivo='logout'):
+    """
+    Registra el jti de un access token como revocado hasta su exp
+    (pasado el exp el token ya no valida, y el TTL borra el registro)
+    """
+    jti = payload.get('jti')
+    if not jti:
+        return False
+    dynamodb.Table(TOKENS_REVOCADOS_TABLE).put_item(Item={
+        'jti': jti,
+        'user_id': payload.get('user_id'),
+        'motivo': motivo,
+        'ttl': int(payload['exp'])
+    })
+    return True
+
+_filtro = FiltroRevocaciones(REVOCACIONES_BUCKET, REVOCACIONES_KEY, lambda: s3)
+
+def _revocado_en_tabla(jti):
+    response = dynamodb.Table(TOKENS_REVOCADOS_TABLE).get_item(
+        Key={'jti': jti}, ProjectionExpression='jti', ConsistentRead=True)
+    return 'Item' in response
+
+def esta_revocado(jti):
+    """
+    True si el jti fue revocado. El filtro Bloom descarta en memoria y solo sus
+    positivos se confirman en la tabla; una revocación cuenta desde que la publica
+    compilar_filtro (cada minuto), igual que en api-compras
+    """
+    if not jti:
+        return False
+    if not REVOCACIONES_BUCKET:
+        return _revocado_en_tabla(jti)
+    return _filtro.revocado(jti, _revocado_en_tabla)
+
+def jtis_revocados():
+    """
+    jti revocados aún vigentes (el TTL de DynamoDB puede tardar en borrar los expirados)
+    """
+    table = dynamodb.Table(TOKENS_REVOCADOS_TABLE)
+    ahora = int(time.time())
+    params = {'ProjectionExpression': 'jti, #ttl', 'ExpressionAttributeNames': {'#ttl': 'ttl'}}
+    while True:
+        page = table.scan(**params)
+        for item in page.get('Items', []):
+            if int(item['ttl']) > ahora:
+                yield item['jti']
+        if 'LastEvaluatedKey' not in page:
+            break
+        params['ExclusiveStartKey'] = page['LastEvaluatedKey']
+
+def _publicado_vigente(digest):
+    """
+    True si el blob en S3 tiene el mismo conjunto de jti y aún no hay que republicarlo
+    """
+    try:
+        head = s3.head_object(Bucket=REVOCACIONES_BUCKET, Key=REVOCACIONES_KEY)
+    except ClientError:
+        return False
+    edad = time.time() - head['LastModified'].timestamp()
+    return head.get('Metadata', {}).get(METADATA_DIGEST) == digest and edad < REVOCACIONES_REPUBLICAR_S
+
+def compilar_filtro():
+    """
+    Compila los jti revocados en un filtro Bloom y lo publica en S3.
+    Si el conjunto no cambió no se reescribe el blob: su ETag se mantiene y los
+    validadores reciben 304
+    Retorna: (filtro, publicado)
+    """
+    jtis = sorted(jtis_revocados())
+    digest = hashlib.sha256('\n'.join(jtis).encode('utf-8')).hexdigest()
+    # Holgura para las revocaciones que lleguen antes de la próxima compilación
+    filtro = BloomFilter.para_capacidad(max(2 * len(jtis), 1024), TASA_FALSOS_POSITIVOS)
+    for jti in jtis:
+        filtro.agregar(jti)
+    if _publicado_vigente(digest):
+        return filtro, False
+    s3.put_object(Bucket=REVOCACIONES_BUCKET, Key=REVOCACIONES_KEY, Body=filtro.to_bytes(),
+                  ContentType='application/octet-stream', Metadata={METADATA_DIGEST: digest})
+    return filtro, True
@@ -0,0 +1,95 @@
+import base64
+import hashlib
+import json
+import os
+
+import jwt
+from jwt.algorithms import get_default_algorithms
+
+JWT_SECRET = os.environ['JWT_SECRET']
+# Llavero HS256 {"kid": "secreto"} (JSON) y kid con el que se firma; los tokens sin kid usan JWT_SECRET.
+# Rotar sin redespliegue simultáneo: agregar el kid nuevo al llavero en SSM y redesplegar los
+# tres servicios; después apuntar JWT_SECRET_KID al nuevo y quitar el anterior pasada 1 hora.
+# Los validadores eligen el secreto por el kid del header en lugar de probar cada uno
+JWT_SECRETS = json.loads(os.environ.get('JWT_SECRETS', '') or '{}')
+JWT_SECRET_KID = os.environ.get('JWT_SECRET_KID', '')
+if JWT_SECRET_KID and JWT_SECRET_KID not in JWT_SECRETS:
+    raise ValueError(f"JWT_SECRET_KID '{JWT_SECRET_KID}' no está en JWT_SECRETS")
+# Firma de tokens nuevos: EdDSA (Ed25519) o ES256 con JWT_PRIVATE_KEY (PEM); sin clave, HS256
+JWT_ALG = os.environ.get('JWT_ALG', 'HS256')
+JWT_PRIVATE_KEY = os.environ.get('JWT_PRIVATE_KEY', '')
+# JWKs públicas de claves anteriores que se siguen publicando durante una rotación
+JWT_PUBLIC_KEYS_ANTERIORES = os.environ.get('JWT_PUBLIC_KEYS_ANTERIORES', '') or '[]'
+# Aceptar tokens HS256 emitidos antes de migrar (expiran en 1 hora)
+JWT_ACEPTAR_HS256 = os.environ.get('JWT_ACEPTAR_HS256', 'true').lower() == 'true'
+
+ALGORITMOS_ASIMETRICOS = ('EdDSA', 'ES256')
+# Miembros requeridos por RFC 7638 para el thumbprint según el tipo de clave
+MIEMBROS_THUMBPRINT = {'OKP': ('crv', 'kty', 'x'), 'EC': ('crv', 'kty', 'x', 'y')}
+
+def thumbprint(jwk):
+    """
+    kid = thumbprint RFC 7638 de la clave pública (estable y sin coordinación)
+    """
+    miembros = {k: jwk[k] for k in MIEMBROS_THUMBPRINT[jwk['kty']]}
+    digest = hashlib.sha256(json.dumps(miembros, sort_keys=True, separators=(',', ':')).encode('utf-8')).digest()
+    return base64.urlsafe_b64encode(digest).decode('ascii').rstrip('=')
+
+def jwk_publica(private_key, alg):
+    """
+    JWK pública (con kid, alg y use) de una clave privada
+    """
+    jwk = get_default_algorithms()[alg].to_jwk(private_key.public_key(), as_dict=True)
+    jwk.update({'kid': thumbprint(jwk), 'alg': alg, 'use': 'sig'})
+    return jwk
+
+def _cargar_llave():
+    if JWT_ALG not in ALGORITMOS_ASIMETRICOS or not JWT_PRIVATE_KEY:
+        return None
+    from cryptography.hazmat.primitives.serialization import load_pem_private_key
+    private_key = load_pem_private_key(JWT_PRIVATE_KEY.encode('utf-8'), password=None)
+    return {'alg': JWT_ALG, 'private_key': private_key, 'jwk': jwk_publica(private_key, JWT_ALG)}
+
+# Se cargan una vez por contenedor
+LLAVE_FIRMA = _cargar_llave()
+JWKS = {'keys': ([LLAVE_FIRMA['jwk']] if LLAVE_FIRMA else []) + json.loads(JWT_PUBLIC_KEYS_ANTERIORES)}
+LLAVES_PUBLICAS = {jwk['kid']: jwt.PyJWK(jwk) for jwk in JWKS['keys']}
+
+def firmar(payload):
+    """
+    Firma el payload con la clave asimétrica configurada (kid en el header) o HS256
+    """
+    if LLAVE_FIRMA is None:
+        if JWT_SECRET_KID:
+            return jwt.encode(payload, JWT_SECRETS[JWT_SECRET_KID], algorithm='HS256',
+                              headers={'kid': JWT_SECRET_KID})
+        return jwt.encode(payload, JWT_SECRET, algorithm='HS256')
+    return jwt.encode(payload, LLAVE_FIRMA['private_key'], algorithm=LLAVE_FIRMA['alg'],
+                      headers={'kid': LLAVE_FIRMA['jwk']['kid']})
+
+def secreto_hs256(kid):
+    """
+    Secreto HS256 del kid del header
+    """
+    if kid is None:
+        return JWT_SECRET
+    secreto = JWT_SECRETS.get(kid)
+    if secreto is None:
+        raise jwt.InvalidTokenError('kid desconocido')
+    return secreto
+
+def verificar(token):
+    """
+    Verifica un token con la clave pública o el secreto HS256 de su kid.
+    Cada clave solo acepta su propio algoritmo (sin confusión de algoritmos)
+    Lanza: jwt.InvalidTokenError (o ExpiredSignatureError)
+    """
+    header = jwt.get_unverified_header(token)
+    if header.get('alg') == 'HS256':
+        if LLAVE_FIRMA is not None and not JWT_ACEPTAR_HS256:
+            raise jwt.InvalidTokenError('HS256 no aceptado')
+        return jwt.decode(token, secreto_hs256(header.get('kid')), algorithms=['HS256'])
+    llave = LLAVES_PUBLICAS.get(header.get('kid'))
+    if llave is None:
+        raise jwt.InvalidTokenError('kid desconocido')
+    return jwt.decode(token, llave.key, algorithms=[llave.algorithm_name])
@@ -0,0 +1,159 @@
+import hashlib
+import os
+import secrets
+import time
+import uuid
+from datetime import datetime, timedelta
+
+import boto3
+from botocore.exceptions import ClientError
+
+from signing import firmar
+
+dynamodb = boto3.resource('dynamodb')
+REFRESH_TOKENS_TABLE = os.environ.get('REFRESH_TOKENS_TABLE', 'p_refresh_tokens-dev')
+
+ACCESS_TOKEN_HORAS = 1
+REFRESH_TTL_DIAS = int(os.environ.get('REFRESH_TTL_DIAS', '30'))
+
+class RefreshInvalido(Exception):
+    """
+    Refresh token inexistente, expirado, revocado o reutilizado
+    """
+
+def emitir_access_token(user_id, email, tenant_id):
+    """
+    Genera el JWT de acceso (1 hora). El jti permite revocarlo antes del exp
+    """
+    payload = {
+        'jti': str(uuid.uuid4()),
+        'user_id': user_id,
+        'email': email,
+        'tenant_id': tenant_id,
+        'exp': datetime.utcnow() + timedelta(hours=ACCESS_TOKEN_HORAS)
+    }
+    return firmar(payload)
+
+def _hash(token):
+    # El token es aleatorio de 256 bits: SHA-256 basta, no hace falta un KDF lento
+    return hashlib.sha256(token.encode('utf-8')).hexdigest()
+
+def _token_item(token, familia_id, user_id, email, tenant_id, ttl):
+    return {
+        'clave': f"TOKEN#{_hash(token)}",
+        'familia_id': familia_id,
+        'user_id': user_id,
+        'email': email,
+        'tenant_id': tenant_id,
+        'estado': 'ACTIVO',
+        'ttl': ttl
+    }
+
+def crear_refresh_token(user_id, email, tenant_id):
+    """
+    Emite un refresh token opaco que inicia una nueva familia de rotación
+    Retorna: el token en claro (solo se guarda su hash)
+    """
+    token = secrets.token_urlsafe(32)
+    familia_id = str(uuid.uuid4())
+    ttl = int(time.time()) + REFRESH_TTL_DIAS * 86400
+    # El cliente del resource serializa tipos Python nativos (no pasar {'S': ...})
+    dynamodb.meta.client.transact_write_items(TransactItems=[
+        {'Put': {
+            'TableName': REFRESH_TOKENS_TABLE,
+            'Item': {'clave': f"FAMILIA#{familia_id}", 'estado': 'ACTIVA', 'user_id': user_id, 'ttl': ttl}
+        }},
+        {'Put': {
+            'TableName': REFRESH_TOKENS_TABLE,
+            'Item': _token_item(token, familia_id, user_id, email, tenant_id, ttl)
+        }}
+    ])
+    return token
+
+def emitir_sesion(user_id, email, tenant_id):
+    """
+    JWT de acceso más refresh token. Si no se puede guardar el refresh token
+    el login sigue siendo válido, solo sin refresh
+    """
+    sesion = {'token': emitir_access_token(user_id, email, tenant_id)}
+    try:
+        sesion['refresh_token'] = crear_refresh_token(user_id, email, tenant_id)
+    except ClientError as e:
+        print(f"No se pudo emitir refresh token: {e}")
+    return sesion
+
+def revocar_familia(familia_id):
+    """
+    Revoca todos los refresh tokens de la familia (reuso detectado o logout)
+    """
+    dynamodb.Table(REFRESH_TOKENS_TABLE).update_item(
+        Key={'clave': f"FAMILIA#{familia_id}"},
+        UpdateExpression='SET estado = :revocada',
+        ExpressionAttributeValues={':revocada': 'REVOCADA'}
+    )
+
+def revocar_refresh_token(token):
+    """
+    Revoca la familia del refresh token presentado (logout)
+    Retorna: False si el token no existe
+    """
+    actual = dynamodb.Table(REFRESH_TOKENS_TABLE).get_item(Key={'clave': f"TOKEN#{_hash(token)}"}).get('Item')
+    if not actual:
+        return False
+    revocar_familia(actual['familia_id'])
+    return True
+
+def rotar_refresh_token(token):
+    """
+    Canjea un refresh token por uno nuevo de la misma familia. Presentar un token ya
+    rotado revoca la familia completa (robo probable).
+    Retorna: (datos del usuario, nuevo refresh token)
+    """
+    table = dynamodb.Table(REFRESH_TOKENS_TABLE)
+    actual = table.get_item(Key={'clave': f"TOKEN#{_hash(token)}"}, ConsistentRead=True).get('Item')
+    if not actual or int(actual['ttl']) < time.time():
+        raise RefreshInvalido('Refresh token inválido o expirado')
+
+    if actual['estado'] != 'ACTIVO':
+        revocar_familia(actual['familia_id'])
+        raise RefreshInvalido('Refresh token reutilizado; sesión revocada')
+
+    nuevo = secrets.token_urlsafe(32)
+    ttl = int(time.time()) + REFRESH_TTL_DIAS * 86400
+    nuevo_item = _token_item(nuevo, actual['familia_id'], actual['user_id'], actual['email'], actual['tenant_id'], ttl)
+    try:
+        dynamodb.meta.client.transact_write_items(TransactItems=[
+            {'Update': {
+                'TableName': REFRESH_TOKENS_TABLE,
+                'Key': {'clave': actual['clave']},
+                'UpdateExpression': 'SET estado = :rotado',
+                'ConditionExpression': 'estado = :activo',
+                'ExpressionAttributeValues': {':rotado': 'ROTADO', ':activo': 'ACTIVO'}
+            }},
+            {'Update': {
+                'TableName': REFRESH_TOKENS_TABLE,
+                'Key': {'clave': f"FAMILIA#{actual['familia_id']}"},
+                'UpdateExpression': 'SET #ttl = :ttl',
+                'ConditionExpression': 'estado = :activa',
+                'ExpressionAttributeNames': {'#ttl': 'ttl'},
+                'ExpressionAttributeValues': {':ttl': ttl, ':activa': 'ACTIVA'}
+            }},
+            {'Put': {
+                'TableName': REFRESH_TOKENS_TABLE,
+                'Item': nuevo_item
+            }}
+        ])
+    except ClientError as e:
+        if e.response['Error']['Code'] != 'TransactionCanceledException':
+            raise
+        razones = [r.get('Code') for r in e.response.get('CancellationReasons', [])]
+        if razones and razones[0] == 'ConditionalCheckFailed':
+            # Dos canjes simultáneos del mismo token: también es reuso
+            revocar_familia(actual['familia_id'])
+            raise RefreshInvalido('Refresh token reutilizado; sesión revocada')
+        if len(razones) > 1 and razones[1] == 'ConditionalCheckFailed':
+            raise RefreshInvalido('Sesión revocada')
+        raise
+
+    usuario = {'user_id': actual['user_id'], 'email': actual['email'], 'tenant_id': actual['tenant_id']}
+    return usuario, nuevo
@@ -0,0 +1,32 @@
+import os
+import uuid
+
+from passwords import hash_password
+
+USERS_TABLE = os.environ.get('USUARIOS_TABLE', 'p_usuarios-dev')
+
+CAMPOS_REGISTRO = ('tenant_id', 'email', 'password', 'nombre')
+
+def validar_registro(data):
+    """
+    Valida los campos de registro de un usuario
+    Retorna: mensaje de error o None si es válido
+    """
+    if not isinstance(data, dict) or not all(data.get(campo) for campo in CAMPOS_REGISTRO):
+        return 'Faltan parámetros tenant_id, email, password o nombre'
+    return None
+
+def construir_usuario(tenant_id, email, password_hash, nombre):
+    """
+    Arma el item de usuario para la tabla
+    Retorna: (item, user_id) con el user_id que va en el JWT
+    """
+    raw_id = str(uuid.uuid4())
+    item = {
+        'tenant_id': tenant_id,
+        'user_id': raw_id,
+        'email': email,
+        'password': password_hash,
+        'nombre': nombre
+    }
+    return item, f"user_{raw_id}"
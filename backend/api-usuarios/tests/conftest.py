@@ -0,0 +1,49 @@
+import os
+import sys
+
+# Los handlers agregan src/utils al path en runtime; los tests hacen lo mismo
+RAIZ = os.path.join(os.path.dirname(__file__), '..')
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'utils'))
+sys.path.insert(0, os.path.join(RAIZ, 'src', 'handlers'))
+sys.path.insert(0, os.path.join(RAIZ, 'layers', 'jwt-layer', 'python'))
+sys.path.insert(0, os.path.join(RAIZ, '..', 'shared-layer', 'python'))
+
+# Credenciales falsas: ningún test debe llegar a AWS
+os.environ.setdefault('AWS_DEFAULT_REGION', 'us-east-1')
+os.environ.setdefault('AWS_ACCESS_KEY_ID', 'testing')
+os.environ.setdefault('AWS_SECRET_ACCESS_KEY', 'testing')
+os.environ.setdefault('REVOCACIONES_BUCKET', 'revocaciones-tokens-dev')
+os.environ.setdefault('USUARIOS_TABLE', 'p_usuarios-dev')
+os.environ.setdefault('JWT_SECRET', 'mi-jwt-secret-super-seguro-y-secreto')
+# Hashing barato y tokens HS256: los tests no miden costo ni necesitan la clave de SSM
+os.environ['PBKDF2_ITERATIONS'] = '1000'
+os.environ['HASH_WORKERS'] = '1'
+os.environ['JWT_ALG'] = 'HS256'
+
+# Los módulos crean sus clientes de boto3 al importarse: moto debe cargarse antes
+from moto import mock_aws  # noqa: E402
+import pytest  # noqa: E402
+
+
+def _tabla(dynamodb, nombre, *claves):
+    dynamodb.create_table(
+        TableName=nombre,
+        AttributeDefinitions=[{'AttributeName': c, 'AttributeType': 'S'} for c in claves],
+        KeySchema=[{'AttributeName': c, 'KeyType': t} for c, t in zip(claves, ('HASH', 'RANGE'))],
+        BillingMode='PAY_PER_REQUEST'
+    )
+
+
+@pytest.fixture
+def aws():
+    """DynamoDB y S3 simulados (moto) con las tablas y el bucket de serverless.yml"""
+    import boto3
+
+    with mock_aws():
+        dynamodb = boto3.resource('dynamodb')
+        _tabla(dynamodb, os.environ.get('USUARIOS_TABLE', 'p_usuarios-dev'), 'email', 'tenant_id')
+        _tabla(dynamodb, os.environ.get('LOGIN_INTENTOS_TABLE', 'p_login_intentos-dev'), 'clave')
+        _tabla(dynamodb, os.environ.get('REFRESH_TOKENS_TABLE', 'p_refresh_tokens-dev'), 'clave')
+        _tabla(dynamodb, os.environ.get('TOKENS_REVOCADOS_TABLE', 'p_tokens_revocados-dev'), 'jti')
+        boto3.client('s3').create_bucket(Bucket=os.environ['REVOCACIONES_BUCKET'])
+        yield dynamodb
@@ -0,0 +1,59 @@
+from botocore.exceptions import ClientError
+
+import importacion
+from usuarios import USERS_TABLE
+
+
+def _fila(email, nombre='Ana'):
+    return {'email': email, 'password': 'Secreta123!', 'nombre': nombre}
+
+
+def _error(code):
+    return ClientError({'Error': {'Code': code, 'Message': code}}, 'PutItem')
+
+
+def test_no_pisa_un_registro_concurrente(aws, monkeypatch):
+    original = importacion.usuarios_existentes
+
+    def registro_entretanto(claves):
+        # /auth/registro gana la carrera después de la verificación de existencia
+        resultado = original(claves)
+        aws.Table(USERS_TABLE).put_item(Item={'email': 'b@x.com', 'tenant_id': 't1', 'nombre': 'Original'})
+        return resultado
+
+    monkeypatch.setattr(importacion, 'usuarios_existentes', registro_entretanto)
+    resultados = importacion.importar_usuarios([_fila('a@x.com'), _fila('b@x.com', 'Importado')], tenant_id='t1')
+
+    assert [r['status'] for r in resultados] == [201, 409]
+    item = aws.Table(USERS_TABLE).get_item(Key={'email': 'b@x.com', 'tenant_id': 't1'})['Item']
+    assert item['nombre'] == 'Original'
+
+
+def test_bloque_de_verificacion_fallido_marca_solo_sus_filas(aws, monkeypatch):
+    monkeypatch.setattr(importacion, 'BATCH_GET_LIMIT', 2)
+    original = importacion.dynamodb.batch_get_item
+    llamadas = []
+
+    def segundo_bloque_falla(**kwargs):
+        llamadas.append(1)
+        if len(llamadas) == 2:
+            raise _error('InternalServerError')
+        return original(**kwargs)
+
+    monkeypatch.setattr(importacion.dynamodb, 'batch_get_item', segundo_bloque_falla)
+    filas = [_fila(f'{n}@x.com') for n in 'abcde']
+    resultados = importacion.importar_usuarios(filas, tenant_id='t1')
+    assert [r['status'] for r in resultados] == [201, 201, 500, 500, 201]
+
+
+def test_error_de_escritura_es_500_de_esa_fila(aws, monkeypatch):
+    original = importacion.dynamodb.meta.client.put_item
+
+    def put_item(**kwargs):
+        if kwargs['Item']['email'] == 'c@x.com':
+            raise _error('InternalServerError')
+        return original(**kwargs)
+
+    monkeypatch.setattr(importacion.dynamodb.meta.client, 'put_item', put_item)
+    resultados = importacion.importar_usuarios([_fila('a@x.com'), _fila('c@x.com')], tenant_id='t1')
+    assert [r['status'] for r in resultados] == [201, 500]
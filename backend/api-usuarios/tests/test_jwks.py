@@ -0,0 +1,21 @@
+import jwks
+
+
+def test_jwks_publica_etag_estable():
+    respuesta = jwks.lambda_handler({'headers': {}}, None)
+    assert respuesta['statusCode'] == 200
+    assert respuesta['headers']['ETag'] == jwks.ETAG
+    assert jwks.lambda_handler({'headers': None}, None)['headers']['ETag'] == respuesta['headers']['ETag']
+
+
+def test_if_none_match_igual_responde_304_sin_cuerpo():
+    for valor in (jwks.ETAG, f'W/{jwks.ETAG}', f'"otro", {jwks.ETAG}', '*'):
+        respuesta = jwks.lambda_handler({'headers': {'If-None-Match': valor}}, None)
+        assert respuesta['statusCode'] == 304
+        assert respuesta['body'] == ''
+
+
+def test_if_none_match_distinto_responde_el_documento():
+    respuesta = jwks.lambda_handler({'headers': {'if-none-match': '"viejo"'}}, None)
+    assert respuesta['statusCode'] == 200
+    assert respuesta['body'] == jwks.BODY
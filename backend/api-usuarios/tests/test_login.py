@@ -0,0 +1,37 @@
+import json
+
+import crear_usuario
+import login_usuario
+
+CREDENCIALES = {'tenant_id': 't1', 'email': 'nueva@x.com', 'password': 'Secreta123!'}
+
+
+def _login(ip):
+    return login_usuario.lambda_handler({
+        'body': json.dumps(CREDENCIALES),
+        'requestContext': {'identity': {'sourceIp': ip}}
+    }, None)
+
+
+def test_login_justo_despues_de_registrarse(aws):
+    # Un login fallido antes del registro no debe dejar al usuario afuera
+    assert _login('10.0.0.1')['statusCode'] == 401
+
+    registro = crear_usuario.lambda_handler({'body': json.dumps({**CREDENCIALES, 'nombre': 'Nueva'})}, None)
+    assert registro['statusCode'] == 201
+
+    response = _login('10.0.0.1')
+    assert response['statusCode'] == 200
+    assert 'token' in json.loads(response['body'])
+
+
+def test_email_inexistente_tambien_ejecuta_el_kdf(aws, monkeypatch):
+    verificados = []
+    verificar = login_usuario.verify_password
+    monkeypatch.setattr(login_usuario, 'verify_password',
+                        lambda password, encoded: verificados.append(encoded) or verificar(password, encoded))
+
+    assert _login('10.0.0.2')['statusCode'] == 401
+    # Mismo algoritmo y costo que un hash real
+    assert verificados == [login_usuario.hash_ficticio()]
+    assert not login_usuario.needs_rehash(verificados[0])
@@ -0,0 +1,40 @@
+import pytest
+
+import rate_limit
+
+
+@pytest.fixture
+def escrituras(aws):
+    """UpdateItem que salen hacia la tabla de intentos"""
+    enviados = []
+
+    def contar(**kwargs):
+        enviados.append(1)
+
+    eventos = rate_limit.dynamodb.meta.client.meta.events
+    eventos.register('before-call.dynamodb.UpdateItem', contar)
+    yield enviados
+    eventos.unregister('before-call.dynamodb.UpdateItem', contar)
+
+
+def test_un_login_lejos_del_limite_escribe_una_vez(aws, escrituras):
+    contador = rate_limit.ContadorDiferido(limite=100, lote=10)
+
+    for i in range(9):
+        assert rate_limit.contar_intento(f'email#t1#u{i}@x.com', 10) is None
+        assert contador.registrar('ip#10.1.0.1') is None
+
+    # Solo los 9 conteos por email; los de IP siguen en memoria
+    assert len(escrituras) == 9
+    # El décimo intento completa el lote y lo suma de una vez
+    assert contador.registrar('ip#10.1.0.1') is None
+    assert len(escrituras) == 10
+    item = aws.Table(rate_limit.LOGIN_INTENTOS_TABLE).get_item(Key={'clave': 'ip#10.1.0.1'})['Item']
+    assert sum(int(v) for k, v in item.items() if k[1:].isdigit()) == 10
+
+
+def test_cerca_del_limite_se_cuenta_cada_intento(aws):
+    contador = rate_limit.ContadorDiferido(limite=3, lote=10)
+
+    assert [contador.registrar('ip#10.1.0.2') for _ in range(3)] == [None] * 3
+    assert contador.registrar('ip#10.1.0.2') is not None
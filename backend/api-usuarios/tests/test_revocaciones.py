@@ -0,0 +1,109 @@
+import json
+import time
+
+import pytest
+
+import revocaciones
+import validar_token
+from signing import firmar
+
+
+def _blob(aws):
+    import boto3
+    return boto3.client('s3').get_object(Bucket=revocaciones.REVOCACIONES_BUCKET,
+                                         Key=revocaciones.REVOCACIONES_KEY)
+
+
+def _revocar(jti):
+    revocaciones.revocar_access_token({'jti': jti, 'user_id': 'u1', 'exp': int(time.time()) + 3600})
+
+
+def test_compilar_sin_cambios_no_reescribe_el_blob(aws):
+    _revocar('jti-1')
+    _, publicado = revocaciones.compilar_filtro()
+    etag = _blob(aws)['ETag']
+
+    _, publicado_de_nuevo = revocaciones.compilar_filtro()
+
+    assert publicado and not publicado_de_nuevo
+    # Mismo ETag: los validadores siguen recibiendo 304
+    assert _blob(aws)['ETag'] == etag
+
+
+def test_compilar_republica_si_cambian_los_jti(aws):
+    _revocar('jti-1')
+    revocaciones.compilar_filtro()
+    _revocar('jti-2')
+
+    filtro, publicado = revocaciones.compilar_filtro()
+
+    assert publicado and filtro.n == 2
+    assert _blob(aws)['Metadata'][revocaciones.METADATA_DIGEST]
+
+
+def test_compilar_republica_un_blob_viejo_sin_cambios(aws, monkeypatch):
+    _revocar('jti-1')
+    revocaciones.compilar_filtro()
+    # Con cualquier edad el blob ya vence: 'generado' se renueva para api-compras
+    monkeypatch.setattr(revocaciones, 'REVOCACIONES_REPUBLICAR_S', 0)
+
+    _, publicado = revocaciones.compilar_filtro()
+
+    assert publicado
+
+
+@pytest.fixture
+def filtro_nuevo(aws, monkeypatch):
+    """Filtro del contenedor sin estado previo que recarga el blob en cada consulta"""
+    filtro = revocaciones.FiltroRevocaciones(revocaciones.REVOCACIONES_BUCKET, revocaciones.REVOCACIONES_KEY,
+                                             lambda: revocaciones.s3)
+    monkeypatch.setattr(revocaciones, '_filtro', filtro)
+    actual = filtro.actual
+
+    def recargar():
+        # Como la primera carga: síncrona, para que el test vea el blob recién compilado
+        filtro._ultimo_intento = None
+        return actual()
+
+    monkeypatch.setattr(filtro, 'actual', recargar)
+    return filtro
+
+
+@pytest.fixture
+def lecturas_revocados(filtro_nuevo):
+    """GetItem que salen hacia la tabla de revocados"""
+    lecturas = []
+
+    def contar(**kwargs):
+        lecturas.append(1)
+
+    eventos = revocaciones.dynamodb.meta.client.meta.events
+    eventos.register('before-call.dynamodb.GetItem', contar)
+    yield lecturas
+    eventos.unregister('before-call.dynamodb.GetItem', contar)
+
+
+def _evento(payload):
+    return {'headers': {'Authorization': f'Bearer {firmar(payload)}'}}
+
+
+def test_validar_token_rechaza_un_token_revocado(filtro_nuevo):
+    payload = {'user_id': 'u1', 'jti': 'jti-logout', 'exp': int(time.time()) + 3600}
+    revocaciones.compilar_filtro()
+    assert validar_token.lambda_handler(_evento(payload), None)['statusCode'] == 200
+
+    revocaciones.revocar_access_token(payload)
+    revocaciones.compilar_filtro()
+    respuesta = validar_token.lambda_handler(_evento(payload), None)
+
+    assert respuesta['statusCode'] == 401
+    assert json.loads(respuesta['body'])['error'] == 'Token revocado'
+
+
+def test_validar_token_no_lee_la_tabla_si_el_filtro_descarta(lecturas_revocados):
+    _revocar('jti-otro')
+    revocaciones.compilar_filtro()
+
+    payload = {'user_id': 'u1', 'jti': 'jti-vigente', 'exp': int(time.time()) + 3600}
+    assert validar_token.lambda_handler(_evento(payload), None)['statusCode'] == 200
+    assert lecturas_revocados == []
@@ -0,0 +1,59 @@
+import json
+
+import pytest
+
+import tokens
+from tokens import RefreshInvalido
+
+
+@pytest.fixture
+def peticiones(aws):
+    """Cuerpos de TransactWriteItems tal como salen hacia DynamoDB"""
+    enviados = []
+
+    def capturar(params, **kwargs):
+        enviados.append(json.loads(params['body']))
+
+    eventos = tokens.dynamodb.meta.client.meta.events
+    eventos.register('before-call.dynamodb.TransactWriteItems', capturar)
+    yield enviados
+    eventos.unregister('before-call.dynamodb.TransactWriteItems', capturar)
+
+
+def test_crear_refresh_token_envia_valores_tipados_una_sola_vez(peticiones):
+    token = tokens.crear_refresh_token('user_1', 'a@x.com', 't1')
+
+    items = [accion['Put']['Item'] for accion in peticiones[0]['TransactItems']]
+    familia, token_item = items
+    assert familia['clave']['S'].startswith('FAMILIA#')
+    assert familia['ttl'] == {'N': familia['ttl']['N']}
+    assert token_item['estado'] == {'S': 'ACTIVO'}
+    # Guardado de verdad: el token se puede canjear
+    usuario, nuevo = tokens.rotar_refresh_token(token)
+    assert usuario == {'user_id': 'user_1', 'email': 'a@x.com', 'tenant_id': 't1'}
+    assert nuevo != token
+
+
+def test_rotar_refresh_token_envia_valores_tipados_una_sola_vez(peticiones):
+    token = tokens.crear_refresh_token('user_1', 'a@x.com', 't1')
+    tokens.rotar_refresh_token(token)
+
+    rotar, familia, put = peticiones[1]['TransactItems']
+    assert rotar['Update']['Key']['clave'] == {'S': f"TOKEN#{tokens._hash(token)}"}
+    assert rotar['Update']['ExpressionAttributeValues'][':activo'] == {'S': 'ACTIVO'}
+    assert set(familia['Update']['ExpressionAttributeValues'][':ttl']) == {'N'}
+    assert put['Put']['Item']['estado'] == {'S': 'ACTIVO'}
+
+
+def test_reuso_de_refresh_token_revoca_la_familia(aws):
+    token = tokens.crear_refresh_token('user_1', 'a@x.com', 't1')
+    _, nuevo = tokens.rotar_refresh_token(token)
+
+    with pytest.raises(RefreshInvalido):
+        tokens.rotar_refresh_token(token)
+    with pytest.raises(RefreshInvalido):
+        tokens.rotar_refresh_token(nuevo)
+
+
+def test_emitir_sesion_incluye_refresh_token(aws):
+    assert 'refresh_token' in tokens.emitir_sesion('user_1', 'a@x.com', 't1')
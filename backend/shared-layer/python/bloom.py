@@ -0,0 +1,61 @@
+import hashlib
+import math
+import struct
+import time
+from typing import Iterator, Optional
+
+# Formato del blob (api-usuarios lo publica, los validadores de token lo leen):
+# magic, bits (m), funciones hash (k), elementos (n), generado (epoch s), arreglo de bits.
+# BLM2 usa los primeros 16 bytes de SHA-256 (BLM1 usaba blake2b-128, que Node no calcula)
+CABECERA = struct.Struct('>4sIBIQ')
+MAGIC = b'BLM2'
+
+
+def _posiciones(elemento: str, m: int, k: int) -> Iterator[int]:
+    digest = hashlib.sha256(elemento.encode('utf-8')).digest()
+    h1 = int.from_bytes(digest[:8], 'little')
+    h2 = int.from_bytes(digest[8:16], 'little') | 1
+    # Generador: una consulta negativa corta en la primera posición en cero
+    return ((h1 + i * h2) % m for i in range(k))
+
+
+class BloomFilter:
+    """Filtro Bloom con doble hashing sobre SHA-256 (k posiciones con un solo hash)"""
+
+    def __init__(self, m: int, k: int, bits: Optional[bytearray] = None, n: int = 0,
+                 generado: Optional[int] = None):
+        self.m = m
+        self.k = k
+        self.bits = bits if bits is not None else bytearray((m + 7) // 8)
+        self.n = n
+        self.generado = generado if generado is not None else int(time.time())
+
+    @classmethod
+    def para_capacidad(cls, capacidad: int, tasa_falsos_positivos: float = 0.001) -> 'BloomFilter':
+        """Dimensiona m y k para la capacidad y tasa de falsos positivos dadas"""
+        capacidad = max(capacidad, 1)
+        m = max(64, int(math.ceil(-capacidad * math.log(tasa_falsos_positivos) / (math.log(2) ** 2))))
+        k = max(1, int(round(m / capacidad * math.log(2))))
+        return cls(m, k)
+
+    def agregar(self, elemento: str) -> None:
+        for pos in _posiciones(elemento, self.m, self.k):
+            self.bits[pos >> 3] |= 1 << (pos & 7)
+        self.n += 1
+
+    def __contains__(self, elemento: str) -> bool:
+        bits = self.bits
+        for pos in _posiciones(elemento, self.m, self.k):
+            if not bits[pos >> 3] & (1 << (pos & 7)):
+                return False
+        return True
+
+    def to_bytes(self) -> bytes:
+        return CABECERA.pack(MAGIC, self.m, self.k, self.n, self.generado) + bytes(self.bits)
+
+    @classmethod
+    def from_bytes(cls, data: bytes) -> 'BloomFilter':
+        magic, m, k, n, generado = CABECERA.unpack_from(data)
+        if magic != MAGIC or len(data) - CABECERA.size != (m + 7) // 8:
+            raise ValueError('Blob de filtro Bloom inválido')
+        return cls(m, k, bytearray(data[CABECERA.size:]), n, generado)
@@ -0,0 +1,94 @@
+import os
+import threading
+import time
+from typing import Any, Callable, Dict, Optional
+
+from botocore.exceptions import BotoCoreError, ClientError
+
+from bloom import BloomFilter
+
+# Cada cuánto se revalida el blob (GET condicional con ETag, en segundo plano)
+REVOCACIONES_REFRESH_S = float(os.environ.get('REVOCACIONES_REFRESH_S', '30'))
+# Un filtro más viejo que esto ya no es confiable: se consulta la tabla en cada request
+REVOCACIONES_MAX_EDAD_S = int(os.environ.get('REVOCACIONES_MAX_EDAD_S', '600'))
+# Resultados exactos de los positivos del filtro (incluye falsos positivos)
+MAX_VERIFICADOS = 4096
+
+
+class FiltroRevocaciones:
+    """Filtro de revocaciones por contenedor: carga síncrona la primera vez y luego en segundo plano"""
+
+    def __init__(self, bucket: str, key: str, cliente_s3: Callable[[], Any],
+                 refresh_s: float = REVOCACIONES_REFRESH_S):
+        self.bucket = bucket
+        self.key = key
+        self.cliente_s3 = cliente_s3
+        self.refresh_s = refresh_s
+        self.filtro: Optional[BloomFilter] = None
+        self.verificados: Dict[str, bool] = {}
+        self._etag: Optional[str] = None
+        self._ultimo_intento: Optional[float] = None
+        self._refrescando = False
+        self._lock = threading.Lock()
+
+    def _descargar(self) -> None:
+        params = {'Bucket': self.bucket, 'Key': self.key}
+        if self._etag:
+            params['IfNoneMatch'] = self._etag
+        try:
+            response = self.cliente_s3().get_object(**params)
+        except ClientError as e:
+            if e.response['Error']['Code'] in ('304', 'NotModified'):
+                return
+            raise
+        filtro = BloomFilter.from_bytes(response['Body'].read())
+        # Un jti revocado después de verificarlo como falso positivo aparece en el filtro nuevo
+        self.filtro, self.verificados = filtro, {}
+        self._etag = response.get('ETag')
+
+    def _refrescar(self) -> None:
+        try:
+            self._descargar()
+        except (BotoCoreError, ClientError, ValueError) as e:
+            print(f"No se pudo cargar el filtro de revocaciones: {e}")
+        finally:
+            with self._lock:
+                self._refrescando = False
+
+    def actual(self) -> Optional[BloomFilter]:
+        """Filtro vigente, o None si no hay uno confiable (se debe consultar la tabla)"""
+        ahora = time.monotonic()
+        primera_carga = False
+        with self._lock:
+            vencido = self._ultimo_intento is None or ahora - self._ultimo_intento >= self.refresh_s
+            if vencido and not self._refrescando:
+                primera_carga = self._ultimo_intento is None
+                self._ultimo_intento = ahora
+                self._refrescando = True
+            else:
+                vencido = False
+        if vencido:
+            if primera_carga:
+                self._refrescar()
+            else:
+                threading.Thread(target=self._refrescar, name='revocaciones', daemon=True).start()
+
+        filtro = self.filtro
+        if filtro is None or time.time() - filtro.generado > REVOCACIONES_MAX_EDAD_S:
+            return None
+        return filtro
+
+    def revocado(self, jti: str, en_tabla: Callable[[str], bool]) -> bool:
+        """El filtro descarta en memoria; solo sus positivos (o la falta de filtro) van a en_tabla"""
+        filtro = self.actual()
+        if filtro is None:
+            return en_tabla(jti)
+        if jti not in filtro:
+            return False
+
+        verificados = self.verificados
+        if jti not in verificados:
+            if len(verificados) >= MAX_VERIFICADOS:
+                verificados.clear()
+            verificados[jti] = en_tabla(jti)
+        return verificados[jti]